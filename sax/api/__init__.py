@@ -3,6 +3,9 @@
 # -----------------------------------------------------------------------------
 from __future__ import annotations
 
+import os
+from typing import Optional
+
 from flasgger import Swagger
 from flask import Flask
 
@@ -13,10 +16,25 @@ from .routes.sax_routes import sax_routes
 from .state.state import State
 
 
-def create_app():
+N_JOBS_ENV = "SAX_N_JOBS"
+
+
+def create_app(n_jobs: Optional[int] = None):
+    """
+    Create the SAX4BPM service application
+
+    :param n_jobs: number of workers of the causal discovery requests, None to run them sequentially, -1 to use all the CPUs, defaults to the
+        ``SAX_N_JOBS`` environment variable if set, else None
+    :type n_jobs: Optional[int], optional
+    :return: Flask application
+    :rtype: Flask
+    """
     # Create and configure app 
     app = Flask(__name__)    
     app.state = State()
+    if n_jobs is None and os.getenv(N_JOBS_ENV):
+        n_jobs = int(os.getenv(N_JOBS_ENV))
+    app.config["SAX_N_JOBS"] = n_jobs
 
     # Register Routes    
     app.register_blueprint(sax_routes)
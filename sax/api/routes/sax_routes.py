@@ -3,6 +3,7 @@
 # -----------------------------------------------------------------------------
 import os
 import tempfile
+from datetime import timedelta
 from pathlib import Path
 
 from flask import Blueprint, current_app, jsonify, make_response, request
@@ -10,6 +11,7 @@ from flask import Blueprint, current_app, jsonify, make_response, request
 from sax.api.exceptions.validation import ValidationException
 from sax.core.causal_process_discovery import causal_discovery as cd
 from sax.core.causal_process_discovery.causal_constants import Modality
+from sax.core.causal_process_discovery.result_cache import get_result_cache
 from sax.core.process_mining import process_mining as pm
 from sax.core.synthesis import sax_explainability as sx
 
@@ -64,16 +66,26 @@ def get_process_model(variant_names, model_type):
     result_list =  [{"from": pair[0], "to": pair[1], "items": count} for pair, count in dfg.items()]
     return result_list
 
-def get_causal_graph(variant_names, modality, prior_knowledge = False, p_value_threshold = None):
+def get_causal_graph(variant_names, modality, prior_knowledge = False, p_value_threshold = None, bootstrap = None, time_budget = None, n_jobs = None):
     imported_data = current_app.state.get_state_copy()   
     if not imported_data:
          raise ValidationException("ValidationError: No data imported yet. Call importEventLogFile first","No data imported yet. Call importEventLogFile first")
     
     modality = Modality.from_string(modality)     
 
-    causal_graph = cd.get_data_causal_representation(dataframe=imported_data,modality=modality,prior_knowledge=prior_knowledge,p_value_threshold=p_value_threshold,variants=variant_names)
-    result_list =  [{"from": pair[0], "to": pair[1], "items": count} for pair, count in causal_graph.items()]
-    return result_list
+    if bootstrap is None and time_budget is None:
+        causal_graph = cd.get_data_causal_representation(dataframe=imported_data,modality=modality,prior_knowledge=prior_knowledge,p_value_threshold=p_value_threshold,variants=variant_names)
+        return [{"from": pair[0], "to": pair[1], "items": count} for pair, count in causal_graph.items()], False
+
+    causal_model = cd.discover_causal_dependencies(dataObject=imported_data,variants=variant_names,modality=modality,prior_knowledge=prior_knowledge,
+                                                   bootstrap=None if bootstrap is None else int(bootstrap),n_jobs=n_jobs,
+                                                   time_budget=None if time_budget is None else timedelta(seconds=float(time_budget)))
+    causal_graph = cd.get_model_causal_representation(causal_model,p_value_threshold)
+    if bootstrap is None:
+        return [{"from": pair[0], "to": pair[1], "items": count} for pair, count in causal_graph.items()], causal_model.isPartial()
+    probabilities = causal_model.getEdgeProbabilities() or {}
+    intervals = causal_model.getCoefficientIntervals() or {}
+    return [{"from": pair[0], "to": pair[1], "items": count, "probability": probabilities.get(pair), "interval": intervals.get(pair)} for pair, count in causal_graph.items()], causal_model.isPartial()
 
 def get_explanations(variant_names,modality,prior_knowledge,p_threshold=None):   
     imported_data = current_app.state.get_state_copy()   
@@ -277,6 +289,16 @@ def get_causal_graph_route():
         type: number
         required: false
         description: The threshold value for p-value
+      - name: bootstrap
+        in: query
+        type: integer
+        required: false
+        description: Maximal number of bootstrap resamples used to estimate the probability of each edge, edges carry no probability if not provided
+      - name: time_budget
+        in: query
+        type: number
+        required: false
+        description: Time budget of the discovery in seconds, once it runs out the partial graph found so far is returned with the X-SAX-Partial header set to true
 
     responses:
       200:
@@ -297,6 +319,14 @@ def get_causal_graph_route():
                   items:
                     type: number
                     description: The strength of the causal relationship.
+                  probability:
+                    type: number
+                    description: The fraction of the bootstrap resamples in which the causal relationship was discovered (only with bootstrap).
+                  interval:
+                    type: array
+                    items:
+                      type: number
+                    description: The 95% confidence interval of the strength of the causal relationship (only with bootstrap).
       500:
         description: Internal Server Error
     """
@@ -305,6 +335,8 @@ def get_causal_graph_route():
     modality = request.args.get('modality')
     prior_knowledge = request.args.get('prior_knowledge', None)
     p_value_threshold = request.args.get('p_value_threshold', None)
+    bootstrap = request.args.get('bootstrap', None)
+    time_budget = request.args.get('time_budget', None)
 
     if not variant_names or not modality:
         return jsonify({"error": "variant_names and modality are required"}), 400
@@ -313,11 +345,13 @@ def get_causal_graph_route():
         variant_names = None
 
     try:
-      causal_graph = get_causal_graph(variant_names, modality,prior_knowledge,p_value_threshold)            
+      causal_graph, partial = get_causal_graph(variant_names, modality,prior_knowledge,p_value_threshold,bootstrap,time_budget,current_app.config.get("SAX_N_JOBS"))            
     except Exception as e:
       error = str(e)
       raise ValidationException(error,"Application exception") from e
-    return jsonify(causal_graph)
+    response = jsonify(causal_graph)
+    response.headers["X-SAX-Partial"] = str(partial).lower()
+    return response
 
 @sax_routes.route('/explanations', methods=['GET'])
 def get_explanations_route():
@@ -377,3 +411,38 @@ def get_explanations_route():
       error = str(e)
       raise ValidationException(error,"Application exception") from e
     return jsonify(discrepancies)
+
+@sax_routes.route('/causalCacheMetrics', methods=['GET'])
+def get_causal_cache_metrics_route():
+    """
+    Endpoint to get the hit and miss counters of the causal discovery result cache.
+
+    ---
+    responses:
+      200:
+        description: A JSON object containing the counters of the cache.
+        content:
+          application/json:
+            schema:
+              type: object
+              properties:
+                memory_hits:
+                  type: integer
+                  description: The number of results served from memory.
+                disk_hits:
+                  type: integer
+                  description: The number of results served from the cache directory.
+                misses:
+                  type: integer
+                  description: The number of results which had to be discovered.
+                stores:
+                  type: integer
+                  description: The number of results stored in the cache.
+                entries:
+                  type: integer
+                  description: The number of results kept in memory.
+                hit_rate:
+                  type: number
+                  description: The fraction of the lookups served from the cache.
+    """
+    return jsonify(get_result_cache().metrics())
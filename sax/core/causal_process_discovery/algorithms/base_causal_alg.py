@@ -1,13 +1,17 @@
 # -----------------------------------------------------------------------------
 # Copyright contributors to the SAX4BPM project
 # -----------------------------------------------------------------------------
+import copy
 from abc import abstractmethod
-from typing import List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 
+import numpy as np
+import scipy.linalg
 from pandas import DataFrame
 
 from sax.core.causal_process_discovery.prior_knowledge import PriorKnowledge
 from sax.core.process_data.discovery_result import ResultInfo
+from sax.core.utils.parallel import parallel_map
 
 
 class CausalDataException(Exception):
@@ -28,10 +32,15 @@ class CausalResultInfo(ResultInfo):
     Class containing causal discovery results. Basically this is a wrapper around causal adjacency matrix.
     """
   
-    def __init__(self, adjacencyMatrix: List[List[int]], columns: List[str]):
+    def __init__(self, adjacencyMatrix: List[List[int]], columns: List[str], edgeProbabilities: Optional[Dict[Tuple[str, str], float]] = None,
+                 coefficientIntervals: Optional[Dict[Tuple[str, str], Tuple[float, float]]] = None, bootstrapSamples: int = 0, partial: bool = False):
        super().__init__()
        self.adjacencyMatrix = adjacencyMatrix
        self.columns = columns
+       self.edgeProbabilities = edgeProbabilities
+       self.coefficientIntervals = coefficientIntervals
+       self.bootstrapSamples = bootstrapSamples
+       self.partial = partial
 
     def getAdjacencyMatrix(self) -> List[List[int]]:
         """
@@ -51,6 +60,56 @@ class CausalResultInfo(ResultInfo):
         """        
         return self.columns
     
+    def getEdgeProbabilities(self) -> Optional[Dict[Tuple[str, str], float]]:
+        """
+        Return the bootstrap probabilities of the causal edges - the fraction of the resampled fits in which each edge was discovered
+
+        :return: mapping of (cause, effect) activity pairs to the probability of the edge, None if the result was not bootstrapped
+        :rtype: Optional[Dict[Tuple[str, str], float]]
+        """
+        return self.edgeProbabilities
+
+    def getCoefficientIntervals(self) -> Optional[Dict[Tuple[str, str], Tuple[float, float]]]:
+        """
+        Return the bootstrap confidence intervals of the causal coefficients, computed over the resampled fits in which each edge was discovered
+
+        :return: mapping of (cause, effect) activity pairs to the (lower, upper) bounds of the coefficient, None if the result was not bootstrapped
+        :rtype: Optional[Dict[Tuple[str, str], Tuple[float, float]]]
+        """
+        return self.coefficientIntervals
+
+    def getBootstrapSamples(self) -> int:
+        """
+        Return the number of resampled fits the edge probabilities and coefficient intervals were estimated from
+
+        :return: number of bootstrap samples, 0 if the result was not bootstrapped
+        :rtype: int
+        """
+        return self.bootstrapSamples
+
+    def isPartial(self) -> bool:
+        """
+        Return whether the discovery ran out of its time or iteration budget, in which case the adjacency matrix is estimated from the partial causal order
+        found so far (activities left unordered have no edges among them), or some of the variants were not analyzed
+
+        :return: True if the result is partial
+        :rtype: bool
+        """
+        return self.partial
+
+    def getTotalEffects(self, data: Optional[DataFrame] = None) -> np.ndarray:
+        """
+        Return the total causal effects between all the pairs of columns - the effect of a change of each column on every downstream column, through all the
+        causal paths between them (see :func:`estimate_total_effects`)
+
+        :param data: data the result was discovered on, with the columns of the result, used by the regression fallback when the adjacency matrix is cyclic, defaults to None
+        :type data: Optional[DataFrame], optional
+        :return: total effect matrix, holding the total effect of column j on column i at [i, j] as the adjacency matrix does
+        :rtype: np.ndarray
+        """
+        X = None if data is None else data[self.columns].to_numpy(dtype=np.float64)
+        return estimate_total_effects(self.adjacencyMatrix, X)
+
     #TODO convert the result to string
     def getDiscoveryResult(self) -> str:
         """
@@ -63,6 +122,90 @@ class CausalResultInfo(ResultInfo):
     
 
 
+def causal_order(adjacency_matrix: np.ndarray) -> Optional[List[int]]:
+    """
+    Compute a causal (topological) order of the columns of an adjacency matrix
+
+    :param adjacency_matrix: adjacency matrix, holding the coefficient of column j on column i at [i, j]
+    :type adjacency_matrix: np.ndarray
+    :return: column indices ordered so that every cause precedes its effects, None if the adjacency matrix is cyclic
+    :rtype: Optional[List[int]]
+    """
+    edges = np.asarray(adjacency_matrix) != 0
+    np.fill_diagonal(edges, False)
+    in_degree = edges.sum(axis=1)
+    ready = list(np.flatnonzero(in_degree == 0))
+    order = []
+    while ready:
+        j = ready.pop()
+        order.append(int(j))
+        effects = np.flatnonzero(edges[:, j])
+        in_degree[effects] -= 1
+        ready.extend(effects[in_degree[effects] == 0])
+    return order if len(order) == len(edges) else None
+
+
+def estimate_total_effects(adjacency_matrix: np.ndarray, X: Optional[np.ndarray] = None, order: Optional[List[int]] = None) -> np.ndarray:
+    """
+    Estimate the total causal effects between all the pairs of columns of a linear causal model at once.
+
+    For an acyclic model x = B x + e, the total effects are the entries of (I - B)^-1 - I, which sums the products of the coefficients along all the causal
+    paths; the matrix is computed with a single triangular solve in the causal order. When the adjacency matrix is cyclic, the total effects are estimated from
+    the data instead, as by ``estimate_total_effect`` of the LiNGAM models: the effect of j on every other column is the coefficient of j in the regression of
+    the column on j and the parents of j, with all the columns regressed at once with a single least squares solve per source column.
+
+    :param adjacency_matrix: adjacency matrix, holding the coefficient of column j on column i at [i, j]
+    :type adjacency_matrix: np.ndarray
+    :param X: data of shape (n_samples, n_columns), required for cyclic adjacency matrices, defaults to None
+    :type X: Optional[np.ndarray], optional
+    :param order: causal order of the columns, computed from the adjacency matrix if not provided, defaults to None
+    :type order: Optional[List[int]], optional
+    :raises ValueError: if the adjacency matrix is cyclic and no data is provided
+    :return: total effect matrix, holding the total effect of column j on column i at [i, j]
+    :rtype: np.ndarray
+    """
+    B = np.asarray(adjacency_matrix, dtype=np.float64)
+    n_columns = B.shape[0]
+    if order is None:
+        order = causal_order(B)
+    if order is not None:
+        # in the causal order I - B is unit lower triangular
+        permuted = np.eye(n_columns) - B[np.ix_(order, order)]
+        inverse = scipy.linalg.solve_triangular(permuted, np.eye(n_columns), lower=True, unit_diagonal=True)
+        total_effects = np.empty_like(B)
+        total_effects[np.ix_(order, order)] = inverse
+        np.fill_diagonal(total_effects, 0)
+        return total_effects
+    if X is None:
+        raise ValueError("Total effects of a cyclic causal model can only be estimated from data")
+    return regression_total_effects(B, X)
+
+
+def regression_total_effects(adjacency_matrix: np.ndarray, X: np.ndarray) -> np.ndarray:
+    """
+    Estimate the total causal effects between all the pairs of columns by regression: the effect of j on every other column is the coefficient of j in the
+    regression of the column on j and the parents of j. The regressions of all the columns on the same source column are fitted with a single least squares
+    solve.
+
+    :param adjacency_matrix: adjacency matrix, holding the coefficient of column j on column i at [i, j]
+    :type adjacency_matrix: np.ndarray
+    :param X: data of shape (n_samples, n_columns)
+    :type X: np.ndarray
+    :return: total effect matrix, holding the total effect of column j on column i at [i, j]
+    :rtype: np.ndarray
+    """
+    B = np.asarray(adjacency_matrix)
+    X = np.asarray(X, dtype=np.float64)
+    X = X - X.mean(axis=0)
+    total_effects = np.zeros(B.shape)
+    for j in range(B.shape[0]):
+        predictors = [j] + [parent for parent in np.flatnonzero(B[j]) if parent != j]
+        coefficients, *_ = np.linalg.lstsq(X[:, predictors], X, rcond=None)
+        total_effects[:, j] = coefficients[0]
+    np.fill_diagonal(total_effects, 0)
+    return total_effects
+
+
 class BaseCausalAlgorithm(object):
     # Assisted by WCA for GP
     # Latest GenAI contribution: granite-20B-code-instruct-v2 model
@@ -118,4 +261,75 @@ class BaseCausalAlgorithm(object):
         """     
         raise NotImplementedError()
 
-    
\ No newline at end of file
+    def _create_model(self) -> Any:
+        """
+        Create the unfitted model of the algorithm, exposing ``fit(X)`` and ``adjacency_matrix_`` as the lingam models do, to be fitted on resampled data
+
+        :raises NotImplementedError:
+        """
+        raise NotImplementedError()
+
+    def run_bootstrap(self, n_sampling: int, n_jobs: Optional[int] = None, batch_size: int = 10, tolerance: Optional[float] = 0.01,
+                      confidence: float = 0.95, random_state: Optional[int] = None) -> CausalResultInfo:
+        """
+        Run the causal discovery algorithm on the data, and estimate the stability of the discovered edges by fitting the algorithm on bootstrap resamples
+        of the data (traces drawn with replacement).
+
+        The resampled fits are spread over a pool of processes in batches of ``batch_size``. The data matrix is handed to the workers once as a memory
+        mapped array instead of being copied into every task, and each worker draws its own resample from a seed, so the outcome does not depend on the
+        number of processes. After every batch the edge probabilities are compared with those of the previous batch, and the resampling stops early once no
+        probability changed by more than ``tolerance``.
+
+        :param n_sampling: maximal number of bootstrap resamples
+        :type n_sampling: int
+        :param n_jobs: number of processes fitting the resamples, None to fit them sequentially, -1 to use all the CPUs, defaults to None
+        :type n_jobs: Optional[int], optional
+        :param batch_size: number of resamples between two checks of the edge probabilities, defaults to 10
+        :type batch_size: int, optional
+        :param tolerance: largest change of the edge probabilities between two batches at which the resampling stops, None to always draw ``n_sampling`` resamples, defaults to 0.01
+        :type tolerance: Optional[float], optional
+        :param confidence: confidence level of the coefficient intervals, defaults to 0.95
+        :type confidence: float, optional
+        :param random_state: seed of the resampling, defaults to None
+        :type random_state: Optional[int], optional
+        :return: causal discovery result of the full data, along with the probabilities of its edges and the intervals of its coefficients
+        :rtype: CausalResultInfo
+        """
+        result = self.run()
+        model = self._create_model()
+        columns = list(self.data.columns)
+        X = np.ascontiguousarray(self.data.to_numpy(dtype=np.float64))
+        seeds = np.random.RandomState(random_state).randint(np.iinfo(np.int32).max, size=n_sampling)
+
+        matrices = []
+        previous = None
+        for start in range(0, n_sampling, batch_size):
+            matrices += parallel_map(_bootstrap_fit, seeds[start:start + batch_size], n_jobs, prefer="processes", arguments=(model, X))
+            probabilities = np.mean(np.stack(matrices) != 0, axis=0)
+            if tolerance is not None and previous is not None and np.max(np.abs(probabilities - previous)) <= tolerance:
+                break
+            previous = probabilities
+
+        coefficients = np.stack(matrices)
+        tail = (1 - confidence) / 2 * 100
+        edgeProbabilities = {}
+        coefficientIntervals = {}
+        # adjacency matrices hold the coefficient of the cause j on the effect i at [i, j]
+        for i, j in zip(*np.nonzero(probabilities)):
+            present = coefficients[:, i, j][coefficients[:, i, j] != 0]
+            edgeProbabilities[(columns[j], columns[i])] = float(probabilities[i, j])
+            coefficientIntervals[(columns[j], columns[i])] = (float(np.percentile(present, tail)), float(np.percentile(present, 100 - tail)))
+        result.edgeProbabilities = edgeProbabilities
+        result.coefficientIntervals = coefficientIntervals
+        result.bootstrapSamples = len(matrices)
+        return result
+
+
+def _bootstrap_fit(seed: int, model: Any, X: np.ndarray) -> np.ndarray:
+    """
+    Fit a fresh copy of the model on a resample of the rows of X drawn with replacement, and return its adjacency matrix
+    """
+    rows = np.random.RandomState(seed).randint(X.shape[0], size=X.shape[0])
+    model = copy.deepcopy(model)
+    model.fit(X[rows])
+    return model.adjacency_matrix_
@@ -0,0 +1,202 @@
+# -----------------------------------------------------------------------------
+# Copyright contributors to the SAX4BPM project
+# -----------------------------------------------------------------------------
+import time
+
+import numpy as np
+
+from sax.core.utils.parallel import parallel_map
+
+
+class CausalOrderSearchMixin:
+    """
+    Causal ordering search of DirectLiNGAM models, scoring the candidate features of each step in matrix form and spreading the candidates over a pool of
+    threads. The threads share the data matrix, and the scores are collected in the order of the candidates, so the causal order does not depend on the
+    number of threads.
+
+    The kernel measure can use a low-rank approximation of the kernel mutual information (incomplete Cholesky factors of the Gram matrices, of at most
+    ``_kernel_rank`` columns), and score the candidates on a random subsample of ``_kernel_subsample`` traces, so that it scales linearly in the number
+    of traces.
+
+    The search can be bounded by a ``_time_budget`` in seconds and by a ``_max_iterations`` number of causal ordering steps. Once the budget runs out, the
+    fit stops searching and estimates the adjacency matrix of the partial causal order found so far (see ``_partial_prior_knowledge``), and ``partial_``
+    is set.
+
+    The model class mixing this in provides ``_search_candidate``, ``_residual`` and ``_mutual_information`` as in DirectLiNGAM, the ``_n_jobs`` number of
+    threads, the ``_random_state`` seed, and the ``_covariance`` running covariance of the residualized features (None when it is not maintained by the fit).
+    """
+
+    _n_jobs = None
+    _covariance = None
+    _kernel_rank = None
+    _kernel_subsample = None
+    _time_budget = None
+    _max_iterations = None
+    _partial = False
+
+    @property
+    def partial_(self):
+        """Whether the budget ran out before the causal order was complete.
+
+        Returns
+        -------
+        partial_ : bool
+            True if the causal order and the adjacency matrix are partial.
+        """
+        return self._partial
+
+    def _budget_exhausted(self, started, iterations):
+        """Whether the time or iteration budget of the fit started at ``started`` (time.monotonic) ran out after ``iterations`` steps."""
+        if self._max_iterations is not None and iterations >= self._max_iterations:
+            return True
+        return self._time_budget is not None and time.monotonic() - started >= self._time_budget
+
+    def _partial_prior_knowledge(self, prior_knowledge, K, U):
+        """Complete the partial causal order K with the unresolved features U, and restrict the prior knowledge so that no edge is estimated among them.
+
+        The unresolved features are appended to the causal order in index order; each of them may depend on the resolved features only.
+
+        Returns
+        -------
+        causal_order : list
+            Partial causal order followed by the unresolved features.
+        prior_knowledge : array-like, shape (n_features, n_features)
+            Prior knowledge forbidding the edges between unresolved features.
+        """
+        n_features = len(K) + len(U)
+        pk = np.full((n_features, n_features), np.nan) if prior_knowledge is None else np.array(prior_knowledge, dtype=np.float64)
+        pk[np.ix_(U, U)] = 0
+        return list(K) + [int(u) for u in U], pk
+
+    def _entropies(self, U):
+        """Calculate the entropies of the columns of U using the maximum entropy approximations."""
+        k1 = 79.047
+        k2 = 7.4129
+        gamma = 0.37457
+        # log(cosh(u)) computed without overflow for large values
+        abs_u = np.abs(U)
+        log_cosh = abs_u + np.log1p(np.exp(-2 * abs_u)) - np.log(2)
+        return (1 + np.log(2 * np.pi)) / 2 - k1 * (
+            np.mean(log_cosh, axis=0) - gamma) ** 2 - k2 * (np.mean(U * np.exp((-(U ** 2)) / 2), axis=0)) ** 2
+
+    def _residual_entropies(self, R, c):
+        """Calculate the entropies of the standardized columns of the residual matrix R.
+
+        The columns of R are residuals of standardized features regressed on each other with correlations c, so
+        their standard deviations are sqrt(1 - c^2).
+        """
+        return self._entropies(R / np.sqrt(1 - c ** 2))
+
+    def _search_causal_order(self, X, U):
+        """Search the causal ordering.
+
+        All the remaining features are standardized once, and their pairwise covariances are computed as a single
+        matrix product. For every candidate feature i, the residuals of i on all the other features and of all the
+        other features on i are then formed as two (n_samples, n_remaining) blocks, and their entropies are
+        computed with batched reductions over the columns.
+        """
+        Uc, Vj = self._search_candidate(U)
+        if len(Uc) == 1:
+            return Uc[0]
+
+        U = np.asarray(U)
+        X_std = X[:, U]
+        covariance = self._covariance
+        if covariance is not None:
+            # correlations of the remaining features from the running covariance maintained by fit
+            std = np.sqrt(np.diag(covariance)[U])
+            X_std = (X_std - np.mean(X_std, axis=0)) / std
+            C = covariance[np.ix_(U, U)] / np.outer(std, std)
+        else:
+            X_std = (X_std - np.mean(X_std, axis=0)) / np.std(X_std, axis=0)
+            C = X_std.T @ X_std / X_std.shape[0]
+        H = self._entropies(X_std)
+        position = {u: k for k, u in enumerate(U.tolist())}
+        in_Vj = np.isin(U, Vj)
+
+        def score(i):
+            k = position[i]
+            others = np.arange(len(U)) != k
+            xi = X_std[:, [k]]
+            # residuals of i on each other feature, and of each other feature on i
+            ri_j = xi - X_std[:, others] * C[k, others]
+            rj_i = X_std[:, others] - xi * C[others, k]
+            H_ri_j = self._residual_entropies(ri_j, C[k, others])
+            H_rj_i = np.where(in_Vj[others], H[others], self._residual_entropies(rj_i, C[others, k]))
+            diff = (H[others] + H_ri_j) - (H[k] + H_rj_i)
+            return -1.0 * np.sum(np.minimum(0, diff) ** 2)
+
+        M_list = parallel_map(score, Uc, self._n_jobs)
+        return Uc[np.argmax(M_list)]
+
+    def _incomplete_cholesky(self, x, sigma, rank, tol=1e-6):
+        """Pivoted incomplete Cholesky factor G, with at most ``rank`` columns, of the Gaussian Gram matrix K of x (K ~ G G^T).
+
+        Only the columns of K at the chosen pivots are computed, so the cost is O(n rank^2) instead of O(n^2).
+        """
+        n = len(x)
+        G = np.zeros((n, min(rank, n)))
+        residual_diagonal = np.ones(n)
+        for k in range(G.shape[1]):
+            pivot = np.argmax(residual_diagonal)
+            if residual_diagonal[pivot] <= tol:
+                return G[:, :k]
+            kernel_column = np.exp(-1 / (2 * sigma ** 2) * (x - x[pivot]) ** 2)
+            G[:, k] = (kernel_column - G[:, :k] @ G[pivot, :k]) / np.sqrt(residual_diagonal[pivot])
+            residual_diagonal -= G[:, k] ** 2
+        return G
+
+    def _kernel_basis(self, x, param, rank):
+        """Orthonormal basis of the low-rank Gram matrix of x along with the eigenvalues of its regularized operator K (K + n kappa / 2 I)^-1."""
+        kappa, sigma = param
+        basis, singular_values, _ = np.linalg.svd(self._incomplete_cholesky(x, sigma, rank), full_matrices=False)
+        eigenvalues = singular_values ** 2
+        return basis, eigenvalues / (eigenvalues + len(x) * kappa / 2)
+
+    def _mutual_information_low_rank(self, basis1, basis2):
+        """Calculate the kernel mutual information (kernel generalized variance) from the low-rank bases of the two Gram matrices.
+
+        With R_i = K_i (K_i + n kappa / 2 I)^-1, the exact measure is -1/2 log det(I - R1 R2 R2 R1), which depends only on the
+        singular values of the small (rank1, rank2) matrix D1 U1^T U2 D2.
+        """
+        U1, D1 = basis1
+        U2, D2 = basis2
+        correlations = np.linalg.svd(D1[:, None] * (U1.T @ U2) * D2[None, :], compute_uv=False)
+        return (-1 / 2) * np.sum(np.log(1 - np.minimum(correlations ** 2, 1 - 1e-12)))
+
+    def _search_causal_order_kernel(self, X, U):
+        """Search the causal ordering by kernel method."""
+        Uc, Vj = self._search_candidate(U)
+        if len(Uc) == 1:
+            return Uc[0]
+
+        if self._kernel_subsample is not None and X.shape[0] > self._kernel_subsample:
+            # the same reproducible subsample of traces at every step
+            rows = np.random.RandomState(self._random_state).choice(X.shape[0], self._kernel_subsample, replace=False)
+            X = X[np.sort(rows)]
+
+        if X.shape[0] > 1000:
+            param = [2e-3, 0.5]
+        else:
+            param = [2e-2, 1.0]
+
+        if self._kernel_rank is not None:
+            bases = {j: self._kernel_basis(X[:, j], param, self._kernel_rank) for j in Uc}
+
+        def score(j):
+            Tkernel = 0
+            for i in U:
+                if i != j:
+                    ri_j = (
+                        X[:, i]
+                        if j in Vj and i in Uc
+                        else self._residual(X[:, i], X[:, j])
+                    )
+                    if self._kernel_rank is not None:
+                        Tkernel += self._mutual_information_low_rank(bases[j], self._kernel_basis(ri_j, param, self._kernel_rank))
+                    else:
+                        Tkernel += self._mutual_information(X[:, j], ri_j, param)
+            return Tkernel
+
+        Tkernels = parallel_map(score, Uc, self._n_jobs)
+        return Uc[np.argmin(Tkernels)]
@@ -1,24 +1,114 @@
 # -----------------------------------------------------------------------------
 # Copyright contributors to the SAX4BPM project
 # -----------------------------------------------------------------------------
+import time
 from typing import Optional
 
+import numpy as np
 from pandas import DataFrame
+from sklearn.preprocessing import scale
+from sklearn.utils import check_array
 
 import lingam
 from sax.core.causal_process_discovery.algorithms.base_causal_alg import BaseCausalAlgorithm, CausalDataException, \
     CausalResultInfo
+from sax.core.causal_process_discovery.algorithms.causal_order_search import CausalOrderSearchMixin
 from sax.core.causal_process_discovery.prior_knowledge import PriorKnowledge
 
 
+class _ParallelDirectLiNGAM(CausalOrderSearchMixin, lingam.DirectLiNGAM):
+    """
+    DirectLiNGAM model scoring the candidate features of each causal ordering step in matrix form, over a pool of threads, within an optional time or
+    iteration budget
+    """
+    def __init__(self, prior_knowledge=None, n_jobs: Optional[int]=None, kernel_rank: Optional[int]=None, kernel_subsample: Optional[int]=None,
+                 time_budget: Optional[float]=None, max_iterations: Optional[int]=None, **kwargs):
+        super().__init__(prior_knowledge=prior_knowledge, **kwargs)
+        self._n_jobs = n_jobs
+        self._kernel_rank = kernel_rank
+        self._kernel_subsample = kernel_subsample
+        self._time_budget = time_budget
+        self._max_iterations = max_iterations
+
+    def fit(self, X):
+        """
+        Fit the model to X as DirectLiNGAM does, stopping the causal ordering search once the budget runs out
+        """
+        if self._time_budget is None and self._max_iterations is None:
+            self._partial = False
+            return super().fit(X)
+
+        X = check_array(X)
+        n_features = X.shape[1]
+        if self._Aknw is not None:
+            if (n_features, n_features) != self._Aknw.shape:
+                raise ValueError("The shape of prior knowledge must be (n_features, n_features)")
+            if not self._apply_prior_knowledge_softly:
+                self._partial_orders = self._extract_partial_orders(self._Aknw)
+
+        U = np.arange(n_features)
+        K = []
+        X_ = np.copy(X)
+        if self._measure == "kernel":
+            X_ = scale(X_)
+        started = time.monotonic()
+        self._partial = False
+        for iteration in range(n_features):
+            if self._budget_exhausted(started, iteration):
+                self._partial = True
+                break
+            if self._measure == "kernel":
+                m = self._search_causal_order_kernel(X_, U)
+            else:
+                m = self._search_causal_order(X_, U)
+            for i in U:
+                if i != m:
+                    X_[:, i] = self._residual(X_[:, i], X_[:, m])
+            K.append(m)
+            U = U[U != m]
+            if (self._Aknw is not None) and (not self._apply_prior_knowledge_softly):
+                self._partial_orders = self._partial_orders[self._partial_orders[:, 0] != m]
+
+        if self._partial:
+            self._causal_order, prior_knowledge = self._partial_prior_knowledge(self._Aknw, K, U)
+            return self._estimate_adjacency_matrix(X, prior_knowledge=prior_knowledge)
+        self._causal_order = K
+        return self._estimate_adjacency_matrix(X, prior_knowledge=self._Aknw)
+
+
 class LingamImpl(BaseCausalAlgorithm):
     """DirectLINGAM causal discovery algorithm wrapper for process execution causal discovery. Make use of `DirectLINGAM algorithm <https://lingam.readthedocs.io/en/latest/reference/direct_lingam.html>`_
 
     :param BaseCausalAlgorithm: base type
     :type BaseCausalAlgorithm: BaseCausalAlgorithm
     """    
-    def __init__(self,   data: DataFrame, prior_knowledge: Optional[PriorKnowledge]=None):      
+    def __init__(self,   data: DataFrame, prior_knowledge: Optional[PriorKnowledge]=None, n_jobs: Optional[int]=None, time_budget: Optional[float]=None,
+                 max_iterations: Optional[int]=None, measure: str="pwling", kernel_rank: Optional[int]=None, kernel_subsample: Optional[int]=None):      
+        """
+        :param data: data to run the algorithm on
+        :type data: DataFrame
+        :param prior_knowledge: prior knowledge, defaults to None
+        :type prior_knowledge: Optional[PriorKnowledge], optional
+        :param n_jobs: number of threads scoring the candidate activities of each causal ordering step in parallel, None to score them sequentially, -1 to use all the CPUs, defaults to None
+        :type n_jobs: Optional[int], optional
+        :param time_budget: time budget of the causal ordering search in seconds, once it runs out the result is estimated from the partial causal order found so far and flagged as partial, defaults to None
+        :type time_budget: Optional[float], optional
+        :param max_iterations: maximal number of causal ordering steps, with the same partial outcome as the time budget, defaults to None
+        :type max_iterations: Optional[int], optional
+        :param measure: measure of independence used to search the causal order, 'pwling' or 'kernel' (slower, see the kernel rank and subsample), defaults to pwling
+        :type measure: str, optional
+        :param kernel_rank: with the kernel measure, maximal rank of the low-rank approximation of the Gram matrices, None for the exact Gram matrices, defaults to None
+        :type kernel_rank: Optional[int], optional
+        :param kernel_subsample: with the kernel measure, number of traces randomly drawn to score the candidate activities, None to use all the traces, defaults to None
+        :type kernel_subsample: Optional[int], optional
+        """
         super().__init__(data,prior_knowledge)
+        self.n_jobs = n_jobs
+        self.time_budget = time_budget
+        self.max_iterations = max_iterations
+        self.measure = measure
+        self.kernel_rank = kernel_rank
+        self.kernel_subsample = kernel_subsample
 
     def sanity_check(self): 
         """
@@ -38,11 +128,21 @@ class LingamImpl(BaseCausalAlgorithm):
         """       
         #TODO implement differently with/without prior knowledge,target variables etc.  
         self.sanity_check()     
-        if self.prior_knowledge is not None:
-            model = lingam.DirectLiNGAM(prior_knowledge=self.prior_knowledge.getPriorKnowledge())    
-        else:
-            model = lingam.DirectLiNGAM()    
+        model = self._create_model()
         model.fit(self.data)
         
-        return CausalResultInfo(model.adjacency_matrix_,list(self.data.columns))
-    
+        return CausalResultInfo(model.adjacency_matrix_,list(self.data.columns),partial=model.partial_)
+
+    def _create_model(self) -> _ParallelDirectLiNGAM:
+        """
+        Create the unfitted DirectLINGAM model configured with the prior knowledge, the number of threads, the budget and the measure of this instance
+
+        :return: unfitted model
+        :rtype: _ParallelDirectLiNGAM
+        """
+        if self.prior_knowledge is not None:
+            return _ParallelDirectLiNGAM(prior_knowledge=self.prior_knowledge.getPriorKnowledge(), n_jobs=self.n_jobs,
+                                         time_budget=self.time_budget, max_iterations=self.max_iterations,
+                                         measure=self.measure, kernel_rank=self.kernel_rank, kernel_subsample=self.kernel_subsample)
+        return _ParallelDirectLiNGAM(n_jobs=self.n_jobs, time_budget=self.time_budget, max_iterations=self.max_iterations,
+                                     measure=self.measure, kernel_rank=self.kernel_rank, kernel_subsample=self.kernel_subsample)
@@ -7,6 +7,7 @@ from pandas import DataFrame
 
 from sax.core.causal_process_discovery.algorithms.base_causal_alg import BaseCausalAlgorithm, CausalDataException, \
     CausalResultInfo
+from sax.core.causal_process_discovery.algorithms.sufficient_statistics import SufficientStatistics
 from sax.core.causal_process_discovery.prior_knowledge import PriorKnowledge
 import networkx as nx
 
@@ -18,8 +19,33 @@ class PositiveLingamImpl(BaseCausalAlgorithm):
     :param BaseCausalAlgorithm: base type
     :type BaseCausalAlgorithm: BaseCausalAlgorithm
     """    
-    def __init__(self,   data: DataFrame, prior_knowledge: Optional[PriorKnowledge]=None):      
+    def __init__(self,   data: DataFrame, prior_knowledge: Optional[PriorKnowledge]=None, n_jobs: Optional[int]=None, time_budget: Optional[float]=None,
+                 max_iterations: Optional[int]=None, measure: str="pwling", kernel_rank: Optional[int]=None, kernel_subsample: Optional[int]=None):      
+        """
+        :param data: data to run the algorithm on
+        :type data: DataFrame
+        :param prior_knowledge: prior knowledge, defaults to None
+        :type prior_knowledge: Optional[PriorKnowledge], optional
+        :param n_jobs: number of threads scoring the candidate activities of each causal ordering step in parallel, None to score them sequentially, -1 to use all the CPUs, defaults to None
+        :type n_jobs: Optional[int], optional
+        :param time_budget: time budget of the causal ordering search in seconds, once it runs out the result is estimated from the partial causal order found so far and flagged as partial, defaults to None
+        :type time_budget: Optional[float], optional
+        :param max_iterations: maximal number of causal ordering steps, with the same partial outcome as the time budget, defaults to None
+        :type max_iterations: Optional[int], optional
+        :param measure: measure of independence used to search the causal order, 'pwling', 'pwling_fast' or 'kernel' (slower, see the kernel rank and subsample), only 'pwling' can be run on sufficient statistics, defaults to pwling
+        :type measure: str, optional
+        :param kernel_rank: with the kernel measure, maximal rank of the low-rank approximation of the Gram matrices, None for the exact Gram matrices, defaults to None
+        :type kernel_rank: Optional[int], optional
+        :param kernel_subsample: with the kernel measure, number of traces randomly drawn to score the candidate activities, None to use all the traces, defaults to None
+        :type kernel_subsample: Optional[int], optional
+        """
         super().__init__(data,prior_knowledge)
+        self.n_jobs = n_jobs
+        self.time_budget = time_budget
+        self.max_iterations = max_iterations
+        self.measure = measure
+        self.kernel_rank = kernel_rank
+        self.kernel_subsample = kernel_subsample
 
     def sanity_check(self): 
         """
@@ -39,11 +65,38 @@ class PositiveLingamImpl(BaseCausalAlgorithm):
         """       
         #TODO implement differently with/without prior knowledge,target variables etc.  
         self.sanity_check()     
-        if self.prior_knowledge is not None:
-            model = positive_direct_lingam.PositiveDirectLiNGAM(prior_knowledge=self.prior_knowledge.getPriorKnowledge())    
-        else:
-            model = positive_direct_lingam.PositiveDirectLiNGAM() 
+        model = self._create_model()
         model.fit(self.data)
         
-        return CausalResultInfo(model.adjacency_matrix_,list(self.data.columns))
-    
\ No newline at end of file
+        return CausalResultInfo(model.adjacency_matrix_,list(self.data.columns),partial=model.partial_)
+
+    def run_statistics(self, statistics: SufficientStatistics) -> CausalResultInfo:
+        """
+        Runs DirectLINGAM on the sufficient statistics of the data instead of the data itself (see :meth:`PositiveDirectLiNGAM.fit_statistics`): the
+        features are standardized and regressed with the exact moments of the statistics, and only the entropies of the causal ordering search are
+        averaged over the sample of the statistics. The algorithm instance is expected to be initiated with that sample as its data.
+
+        :param statistics: sufficient statistics of the data
+        :type statistics: SufficientStatistics
+        :return: CausalResultInfo
+        :rtype: CausalResultInfo
+        """
+        self.sanity_check()
+        model = self._create_model()
+        model.fit_statistics(self.data, statistics.getMean(), statistics.getCovariance(), statistics.getCount())
+
+        return CausalResultInfo(model.adjacency_matrix_,list(self.data.columns),partial=model.partial_)
+
+    def _create_model(self) -> positive_direct_lingam.PositiveDirectLiNGAM:
+        """
+        Create the unfitted DirectLINGAM model configured with the prior knowledge, the number of threads, the budget and the measure of this instance
+
+        :return: unfitted model
+        :rtype: positive_direct_lingam.PositiveDirectLiNGAM
+        """
+        if self.prior_knowledge is not None:
+            return positive_direct_lingam.PositiveDirectLiNGAM(prior_knowledge=self.prior_knowledge.getPriorKnowledge(), n_jobs=self.n_jobs,
+                                                               time_budget=self.time_budget, max_iterations=self.max_iterations,
+                                                               measure=self.measure, kernel_rank=self.kernel_rank, kernel_subsample=self.kernel_subsample)
+        return positive_direct_lingam.PositiveDirectLiNGAM(n_jobs=self.n_jobs, time_budget=self.time_budget, max_iterations=self.max_iterations,
+                                                           measure=self.measure, kernel_rank=self.kernel_rank, kernel_subsample=self.kernel_subsample)
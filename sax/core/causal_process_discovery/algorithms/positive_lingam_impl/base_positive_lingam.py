@@ -12,15 +12,15 @@ from sklearn.linear_model import LinearRegression
 from sklearn.utils import check_array
 
 from lingam.bootstrap import BootstrapMixin
-from lingam.hsic import hsic_test_gamma
+from lingam.hsic import get_kernel_width, hsic_test_gamma
+from scipy.stats import gamma
 
 
 import scipy.optimize
 import scipy
 
-from sklearn.linear_model import LassoLarsIC, LinearRegression
-from sklearn.preprocessing import StandardScaler
-from sklearn.utils import check_array
+from sax.core.causal_process_discovery.algorithms.base_causal_alg import estimate_total_effects, regression_total_effects
+from sax.core.utils.parallel import parallel_map
 
 
 class _PositiveBaseLiNGAM(BootstrapMixin, metaclass=ABCMeta):
@@ -37,6 +37,7 @@ class _PositiveBaseLiNGAM(BootstrapMixin, metaclass=ABCMeta):
         self._random_state = random_state
         self._causal_order = None
         self._adjacency_matrix = None
+        self._n_jobs = None
 
     @abstractmethod
     def fit(self, X):
@@ -97,6 +98,39 @@ class _PositiveBaseLiNGAM(BootstrapMixin, metaclass=ABCMeta):
 
         return lr.coef_[0]
 
+    def estimate_total_effects(self, X=None):
+        """Estimate the total effects between all the pairs of variables at once.
+
+        The total effects are computed from the fitted adjacency matrix and
+        causal order as (I - B)^-1 - I, without fitting any regression. If X
+        is provided, the total effects are estimated by regression instead,
+        as by ``estimate_total_effect``, with the regressions of all the
+        destination variables of each source variable fitted at once; the
+        effects on variables preceding the source in the causal order are 0.
+
+        Parameters
+        ----------
+        X : array-like, shape (n_samples, n_features), optional (default=None)
+            Original data, where n_samples is the number of samples
+            and n_features is the number of features.
+
+        Returns
+        -------
+        total_effects : array-like, shape (n_features, n_features)
+            Total effect matrix, holding the total effect of variable j on
+            variable i at [i, j].
+        """
+        if X is None:
+            return estimate_total_effects(self._adjacency_matrix, order=self._causal_order)
+
+        # Check parameters
+        X = check_array(X)
+        total_effects = regression_total_effects(self._adjacency_matrix, X)
+        position = np.empty(len(self._causal_order), dtype=int)
+        position[self._causal_order] = np.arange(len(self._causal_order))
+        total_effects[position[:, None] < position[None, :]] = 0
+        return total_effects
+
     def get_error_independence_p_values(self, X):
         """Calculate the p-value matrix of independence between error variables.
 
@@ -127,7 +161,56 @@ class _PositiveBaseLiNGAM(BootstrapMixin, metaclass=ABCMeta):
 
         return p_values
 
-    def _estimate_adjacency_matrix(self, X, prior_knowledge=None):
+    def get_error_independence_p_values_approx(self, X, n_components=100, max_samples=None, n_jobs=None):
+        """Calculate an approximate p-value matrix of independence between error variables.
+
+        The Gaussian Gram matrix of each error variable is approximated by
+        random Fourier features, K ~ Z Z^T with Z of shape (n_samples, n_components),
+        and the HSIC gamma test of every pair is evaluated on the features
+        (see ``hsic_test_rff``). The features of each variable are computed
+        once, so the cost is O(n_features^2 n_samples n_components^2) time and
+        O(n_features n_samples n_components) memory instead of the
+        O(n_features^2 n_samples^2) of ``get_error_independence_p_values``.
+
+        Parameters
+        ----------
+        X : array-like, shape (n_samples, n_features)
+            Original data, where n_samples is the number of samples
+            and n_features is the number of features.
+        n_components : int, optional (default=100)
+            Number of random Fourier features of each error variable.
+        max_samples : int, optional (default=None)
+            If provided, the test is run on a random subsample of at most
+            max_samples samples.
+        n_jobs : int, optional (default=None)
+            Number of threads evaluating the pairs of error variables,
+            None to evaluate them sequentially, -1 to use all the CPUs.
+
+        Returns
+        -------
+        independence_p_values : array-like, shape (n_features, n_features)
+            p-value matrix of independence between error variables.
+        """
+        # Check parameters
+        X = check_array(X)
+        rng = np.random.RandomState(self._random_state)
+        if max_samples is not None and X.shape[0] > max_samples:
+            X = X[np.sort(rng.choice(X.shape[0], max_samples, replace=False))]
+        n_features = X.shape[1]
+
+        E = X - np.dot(self._adjacency_matrix, X.T).T
+        features = [_rff_features(E[:, [i]], n_components, rng) for i in range(n_features)]
+        pairs = list(itertools.combinations(range(n_features), 2))
+        tests = parallel_map(lambda pair: hsic_test_rff(features[pair[0]], features[pair[1]]), pairs, n_jobs)
+
+        p_values = np.zeros([n_features, n_features])
+        for (i, j), (_, p_value) in zip(pairs, tests):
+            p_values[i, j] = p_value
+            p_values[j, i] = p_value
+
+        return p_values
+
+    def _estimate_adjacency_matrix(self, X, prior_knowledge=None, gram=None):
         """Estimate adjacency matrix by causal order.
 
         Parameters
@@ -137,6 +220,8 @@ class _PositiveBaseLiNGAM(BootstrapMixin, metaclass=ABCMeta):
             and n_features is the number of features.
         prior_knowledge : array-like, shape (n_variables, n_variables), optional (default=None)
             Prior knowledge matrix.
+        gram : _GramMatrices, optional (default=None)
+            Gram matrices of the training data, computed from X if not provided.
 
         Returns
         -------
@@ -147,8 +232,11 @@ class _PositiveBaseLiNGAM(BootstrapMixin, metaclass=ABCMeta):
             pk = prior_knowledge.copy()
             np.fill_diagonal(pk, 0)
 
-        B = np.zeros([X.shape[1], X.shape[1]], dtype="float64")
-        for i in range(1, len(self._causal_order)):
+        # standardization and Gram matrices are computed once and shared by the regressions of all the targets
+        if gram is None:
+            gram = _GramMatrices(X)
+
+        def regress(i):
             target = self._causal_order[i]
             predictors = self._causal_order[:i]
 
@@ -158,9 +246,14 @@ class _PositiveBaseLiNGAM(BootstrapMixin, metaclass=ABCMeta):
 
             # target is exogenous variables if predictors are empty
             if len(predictors) == 0:
-                continue
+                return target, predictors, None
+
+            return target, predictors, gram.predict_adaptive_lasso(predictors, target)
 
-            B[target, predictors] = predict_adaptive_lasso(X, predictors, target)
+        B = np.zeros([X.shape[1], X.shape[1]], dtype="float64")
+        for target, predictors, coef in parallel_map(regress, range(1, len(self._causal_order)), self._n_jobs):
+            if coef is not None:
+                B[target, predictors] = coef
 
         self._adjacency_matrix = B
         return self
@@ -207,31 +300,244 @@ def predict_adaptive_lasso(X, predictors, target, gamma=1.0):
     coef : array-like, shape (n_features)
         Coefficients of predictor variable.
     """
-    # Standardize X
-    scaler = StandardScaler()
-    X_std = scaler.fit_transform(X)
-
-    # Pruning with Adaptive Lasso
-    lr = LinearRegression(positive=True)
-    lr.fit(X_std[:, predictors], X_std[:, target])
-    res = scipy.optimize.lsq_linear(X_std[:, predictors], X_std[:, target], bounds=(0,1.1))
-    coef = res['x']
-    weight = np.power(np.abs(lr.coef_), gamma)
-    reg = LassoLarsIC(criterion="bic")
-    reg.fit(X_std[:, predictors] * weight, X_std[:, target])
-    res = scipy.optimize.lsq_linear(X_std[:, predictors] * weight, X_std[:, target], bounds=(0,1.1))
-    coef = res['x']
-    pruned_idx = np.abs(coef * weight) > 0.0
+    return _GramMatrices(X).predict_adaptive_lasso(predictors, target, gamma)
+
+
+class _GramMatrices:
+    """Gram matrices of the centered and of the standardized training data.
+
+    All the least squares problems of the adaptive lasso regressions (with an intercept, or on standardized data) depend
+    on the data only through these matrices: with G = A^T A the Gram matrix of the predictors and c = A^T y, the residual
+    ||y - A b||^2 equals ||R b - d||^2 up to a constant, where R^T R = G and R^T d = c. The regressions are therefore solved
+    on (n_predictors, n_predictors) systems, whatever the number of samples.
+    """
+
+    def __init__(self, X):
+        X = np.asarray(X, dtype=np.float64)
+        X_centered = X - X.mean(axis=0)
+        self._set_gram(X_centered.T @ X_centered, X.shape[0])
+
+    @classmethod
+    def from_covariance(cls, covariance, n_samples):
+        """Gram matrices of training data of ``n_samples`` samples with the given (biased) covariance matrix."""
+        gram = cls.__new__(cls)
+        gram._set_gram(np.asarray(covariance, dtype=np.float64) * n_samples, n_samples)
+        return gram
+
+    def _set_gram(self, gram, n_samples):
+        self.gram = gram
+        scale = np.sqrt(np.diag(self.gram) / n_samples)
+        scale[scale == 0.0] = 1.0  # as StandardScaler, constant features are left unscaled
+        self.std_gram = self.gram / np.outer(scale, scale)
+
+    @staticmethod
+    def _reduced_system(gram, predictors, target, weight=None):
+        """Square root R and right hand side d of the least squares problem of the target on the predictors."""
+        G = gram[np.ix_(predictors, predictors)]
+        c = gram[predictors, target]
+        if weight is not None:
+            G = G * np.outer(weight, weight)
+            c = c * weight
+        eigenvalues, eigenvectors = np.linalg.eigh(G)
+        # c lies in the range of G, directions of zero variance do not contribute to the residual
+        keep = eigenvalues > eigenvalues.max(initial=0.0) * len(predictors) * np.finfo(np.float64).eps
+        root = np.sqrt(eigenvalues[keep])
+        R = root[:, None] * eigenvectors[:, keep].T
+        d = (eigenvectors[:, keep].T @ c) / root
+        return R, d
+
+    def predict_adaptive_lasso(self, predictors, target, gamma=1.0):
+        """Predict with Adaptive Lasso, see :func:`predict_adaptive_lasso`."""
+        predictors = np.array(predictors)
+        coef = np.zeros(len(predictors))
+
+        # constant predictors do not explain the target, they get a zero coefficient as with the positive least squares on the data
+        varying = np.diag(self.gram)[predictors] > 0.0
+        if not varying.any():
+            return coef
+        varying_predictors = predictors[varying]
+
+        # Pruning with Adaptive Lasso: positive least squares weights on standardized data
+        R, d = self._reduced_system(self.std_gram, varying_predictors, target)
+        weight = np.power(np.abs(_nonnegative_least_squares(R, d)), gamma)
+        R, d = self._reduced_system(self.std_gram, varying_predictors, target, weight)
+        pruning_coef = scipy.optimize.lsq_linear(R, d, bounds=(0, 1.1))['x'] if len(d) > 0 else np.zeros(len(varying_predictors))
+        pruned_idx = np.abs(pruning_coef * weight) > 0.0
+
+        # Calculate coefficients of the original scale
+        if pruned_idx.sum() > 0:
+            R, d = self._reduced_system(self.gram, varying_predictors[pruned_idx], target)
+            varying_coef = np.zeros(len(varying_predictors))
+            varying_coef[pruned_idx] = _nonnegative_least_squares(R, d)
+            coef[varying] = varying_coef
+
+        return coef
+
+
+def _nonnegative_least_squares(R, d):
+    """Solve min ||R b - d|| subject to b >= 0.
+
+    Reduced systems of collinear predictors have fewer rows than coefficients, on which ``scipy.optimize.nnls`` may fail to
+    converge; they are solved with ``scipy.optimize.lsq_linear`` instead.
+    """
+    if R.shape[0] < R.shape[1]:
+        return scipy.optimize.lsq_linear(R, d, bounds=(0, np.inf))['x'] if len(d) > 0 else np.zeros(R.shape[1])
+    return scipy.optimize.nnls(R, d)[0]
+
+
+def _bounded_least_squares(G, c, upper=np.inf):
+    """Closed-form bounded least squares for at most two coefficients.
+
+    Minimizes b^T G b - 2 c^T b subject to 0 <= b <= upper, which is the least squares problem with Gram matrix G and
+    right hand side c. The problem is convex, so its minimum is the stationary point, within the box, of one of the faces of
+    the box (each coefficient at its lower bound, at its upper bound or free); the stationary points of all the faces are
+    computed in closed form and the best feasible one is kept. Faces whose free coefficients are collinear are skipped, as
+    their minimum is also reached on a face of lower dimension.
+
+    Parameters
+    ----------
+    G : array-like, shape (n_coefficients, n_coefficients)
+        Gram matrix of the predictors, with n_coefficients at most 2.
+    c : array-like, shape (n_coefficients)
+        Products of the predictors with the target.
+    upper : float, optional (default=np.inf)
+        Upper bound of the coefficients.
+
+    Returns
+    -------
+    coef : array-like, shape (n_coefficients)
+        Coefficients minimizing the residual.
+    """
+    G = np.asarray(G, dtype=np.float64)
+    c = np.asarray(c, dtype=np.float64)
+    k = len(c)
+    best, best_value = np.zeros(k), 0.0
+    for state in itertools.product((0, 1, 2), repeat=k):
+        # 0: at the lower bound, 1: at the upper bound, 2: free
+        if 1 in state and not np.isfinite(upper):
+            continue
+        b = np.array([upper if s == 1 else 0.0 for s in state])
+        free = [i for i, s in enumerate(state) if s == 2]
+        if len(free) > 0:
+            rhs = c[free] - G[free] @ b
+            if len(free) == 1:
+                if G[free[0], free[0]] <= 0.0:
+                    continue
+                b[free] = rhs / G[free[0], free[0]]
+            else:
+                det = G[0, 0] * G[1, 1] - G[0, 1] * G[1, 0]
+                if det <= 1e-12 * G[0, 0] * G[1, 1]:
+                    continue
+                b[:] = (G[1, 1] * rhs[0] - G[0, 1] * rhs[1]) / det, (G[0, 0] * rhs[1] - G[1, 0] * rhs[0]) / det
+            if np.any(b[free] < 0.0) or np.any(b[free] > upper):
+                continue
+        value = b @ G @ b - 2 * c @ b
+        if value < best_value:
+            best, best_value = b, value
+    return best
+
+
+def small_adaptive_lasso(covariance, predictors, target, gamma=1.0):
+    """Predict with Adaptive Lasso from the covariance matrix, for at most two predictors.
+
+    Same estimator as :func:`predict_adaptive_lasso` (the least squares problems have the same solutions on the covariance
+    matrix as on the Gram matrix), with the bounded least squares problems solved in closed form by
+    :func:`_bounded_least_squares`.
+
+    Parameters
+    ----------
+    covariance : array-like, shape (n_features, n_features)
+        Covariance matrix of the training data.
+    predictors : array-like, shape (n_predictors)
+        Indices of predictor variable, at most 2.
+    target : int
+        Index of target variable.
+    gamma : float, optional (default=1.0)
+        Exponent of the adaptive weights.
+
+    Returns
+    -------
+    coef : array-like, shape (n_predictors)
+        Coefficients of predictor variable.
+    """
+    predictors = np.array(predictors)
+    scale = np.sqrt(np.diag(covariance))
+    scale[scale == 0.0] = 1.0  # as StandardScaler, constant features are left unscaled
+    std_covariance = covariance / np.outer(scale, scale)
+
+    # Pruning with Adaptive Lasso: positive least squares weights on standardized data
+    G = std_covariance[np.ix_(predictors, predictors)]
+    c = std_covariance[predictors, target]
+    weight = np.power(np.abs(_bounded_least_squares(G, c)), gamma)
+    pruned_idx = np.abs(_bounded_least_squares(G * np.outer(weight, weight), c * weight, 1.1) * weight) > 0.0
 
     # Calculate coefficients of the original scale
-    coef = np.zeros(reg.coef_.shape)
+    coef = np.zeros(len(predictors))
     if pruned_idx.sum() > 0:
-        lr = LinearRegression(positive=True)
-        pred = np.array(predictors)
-        lr.fit(X[:, pred[pruned_idx]], X[:, target])
-        res = scipy.optimize.lsq_linear(X[:, pred[pruned_idx]], X[:, target], bounds=(0,1.1))
-        coef_sub = lr.coef_#res['x']
+        pruned = predictors[pruned_idx]
+        coef[pruned_idx] = _bounded_least_squares(covariance[np.ix_(pruned, pruned)], covariance[pruned, target])
+    return coef
 
-        coef[pruned_idx] = coef_sub
 
-    return coef
\ No newline at end of file
+def _rff_features(X, n_components, rng):
+    """Random Fourier features of the Gaussian kernel of X, with the median distance bandwidth of lingam.hsic."""
+    width = get_kernel_width(X)
+    frequencies = rng.normal(scale=1 / width, size=(X.shape[1], n_components))
+    offsets = rng.uniform(0, 2 * np.pi, size=n_components)
+    return np.sqrt(2 / n_components) * np.cos(X @ frequencies + offsets)
+
+
+def hsic_test_rff(Z, W):
+    """HSIC gamma test on random Fourier features.
+
+    Same test as ``lingam.hsic.hsic_test_gamma`` with the Gram matrices
+    approximated by K ~ Z Z^T and L ~ W W^T: every sum over the entries of
+    the (n_samples, n_samples) centered Gram matrices is computed from the
+    (n_components, n_components) products of the centered features. The null
+    variance uses the independence of the two variables under H0, under which
+    the mean of (Kc_ab Lc_ab)^2 over a != b factorizes into the product of the
+    means of Kc_ab^2 and Lc_ab^2.
+
+    Parameters
+    ----------
+    Z, W : array-like, shape (n_samples, n_components)
+        Random Fourier features of the two variables.
+
+    Returns
+    -------
+    test_stat : float
+        the HSIC statistic.
+
+    p : float
+        the HSIC p-value.
+    """
+    n = Z.shape[0]
+    Zc = Z - Z.mean(axis=0)
+    Wc = W - W.mean(axis=0)
+
+    # test statistic m*HSICb under H1, 1/n sum(Kc * Lc)
+    test_stat = 1 / n * np.sum((Zc.T @ Wc) ** 2)
+
+    def off_diagonal_sum_of_squares(Fc):
+        return np.sum((Fc.T @ Fc) ** 2) - np.sum(np.sum(Fc ** 2, axis=1) ** 2)
+
+    var = (1 / 36) * off_diagonal_sum_of_squares(Zc) * off_diagonal_sum_of_squares(Wc) / n / (n - 1)
+    var = 1 / n / (n - 1) * var
+    # variance under H0
+    var = 72 * (n - 4) * (n - 5) / n / (n - 1) / (n - 2) / (n - 3) * var
+
+    # the diagonals of the approximate Gram matrices hold the squared norms of
+    # the features, which are only close to the 1 of the exact Gaussian kernel
+    diag_X = np.sum(Z ** 2) / n
+    diag_Y = np.sum(W ** 2) / n
+    mu_X = 1 / n / (n - 1) * (np.sum(Z.sum(axis=0) ** 2) - np.sum(Z ** 2))
+    mu_Y = 1 / n / (n - 1) * (np.sum(W.sum(axis=0) ** 2) - np.sum(W ** 2))
+    # mean under H0
+    mean = 1 / n * (diag_X - mu_X) * (diag_Y - mu_Y)
+
+    alpha = mean**2 / var
+    # threshold for hsicArr*m
+    beta = var * n / mean
+    p = gamma.sf(test_stat, alpha, scale=beta)
+
+    return test_stat, p
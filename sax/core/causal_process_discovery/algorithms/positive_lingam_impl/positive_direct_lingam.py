@@ -1,11 +1,14 @@
+import time
+
 import numpy as np
 from sklearn.preprocessing import scale
 from sklearn.utils import check_array
 
-from sax.core.causal_process_discovery.algorithms.positive_lingam_impl.base_positive_lingam import _PositiveBaseLiNGAM
+from sax.core.causal_process_discovery.algorithms.causal_order_search import CausalOrderSearchMixin
+from sax.core.causal_process_discovery.algorithms.positive_lingam_impl.base_positive_lingam import _GramMatrices, _PositiveBaseLiNGAM, small_adaptive_lasso
 
 
-class PositiveDirectLiNGAM(_PositiveBaseLiNGAM):
+class PositiveDirectLiNGAM(CausalOrderSearchMixin, _PositiveBaseLiNGAM):
     """Implementation of DirectLiNGAM Algorithm [1]_ [2]_
 
     References
@@ -17,12 +20,20 @@ class PositiveDirectLiNGAM(_PositiveBaseLiNGAM):
        Journal of Machine Learning Research 14:111-152, 2013.
     """
 
+    # largest number of features fitted by the closed-form path of ``_fit_small_system``
+    _SMALL_SYSTEM_SIZE = 3
+
     def __init__(
         self,
         random_state=None,
         prior_knowledge=None,
         apply_prior_knowledge_softly=False,
         measure="pwling",
+        n_jobs=None,
+        kernel_rank=None,
+        kernel_subsample=None,
+        time_budget=None,
+        max_iterations=None,
     ):
         """Construct a DirectLiNGAM model.
 
@@ -43,11 +54,31 @@ class PositiveDirectLiNGAM(_PositiveBaseLiNGAM):
         measure : {'pwling', 'kernel', 'pwling_fast'}, optional (default='pwling')
             Measure to evaluate independence: 'pwling' [2]_ or 'kernel' [1]_.
             For fast execution with GPU, 'pwling_fast' can be used (culingam is required).
+        n_jobs : int, optional (default=None)
+            Number of threads scoring the candidate features of each causal ordering step in parallel,
+            None or 1 to score them sequentially, -1 to use all the CPUs. The result does not depend on it.
+        kernel_rank : int, optional (default=None)
+            With the 'kernel' measure, maximal rank of the incomplete Cholesky approximation of the Gram matrices,
+            None to compute the exact kernel mutual information.
+        kernel_subsample : int, optional (default=None)
+            With the 'kernel' measure, number of traces randomly drawn (with ``random_state`` as seed) to score the
+            candidate features, None to use all the traces.
+        time_budget : float, optional (default=None)
+            Time budget of the causal ordering search in seconds. Once it runs out, the adjacency matrix
+            is estimated for the partial causal order found so far, and ``partial_`` is set.
+        max_iterations : int, optional (default=None)
+            Maximal number of causal ordering steps, with the same partial outcome as ``time_budget``.
         """
         super().__init__(random_state)
         self._Aknw = prior_knowledge
         self._apply_prior_knowledge_softly = apply_prior_knowledge_softly
         self._measure = measure
+        self._covariance = None
+        self._n_jobs = n_jobs
+        self._kernel_rank = kernel_rank
+        self._kernel_subsample = kernel_subsample
+        self._time_budget = time_budget
+        self._max_iterations = max_iterations
 
         if self._Aknw is not None:
             self._Aknw = check_array(self._Aknw)
@@ -67,9 +98,74 @@ class PositiveDirectLiNGAM(_PositiveBaseLiNGAM):
         self : object
             Returns the instance itself.
         """
+        if self._fits_small_system(X):
+            return self._fit_small_system(np.asarray(X, dtype=np.float64))
+
         # Check parameters
         X = check_array(X)
-        n_features = X.shape[1]
+
+        # Causal discovery
+        X_ = np.array(X, dtype=np.float64)
+        if self._measure == "kernel":
+            X_ = scale(X_)
+        K, U = self._search_causal_order_all(X_, np.atleast_2d(np.cov(X_, rowvar=False, bias=True)))
+
+        if self._partial:
+            self._causal_order, prior_knowledge = self._partial_prior_knowledge(self._Aknw, K, U)
+            return self._estimate_adjacency_matrix(X, prior_knowledge=prior_knowledge)
+        self._causal_order = K
+        return self._estimate_adjacency_matrix(X, prior_knowledge=self._Aknw)
+
+    def fit_statistics(self, X, mean, covariance, n_samples):
+        """Fit the model to the statistics of the training data instead of the training data itself.
+
+        The features are standardized and residualized with the exact mean and covariance matrix of the training data, and
+        the adjacency matrix is estimated from the covariance matrix alone, as the adaptive lasso regressions depend on the
+        data only through it (see ``_GramMatrices``). Only the entropies of the pwling measure are averaged over X, a sample
+        of the training data; when X holds all the training data the fit agrees with ``fit`` up to floating point error.
+
+        Parameters
+        ----------
+        X : array-like, shape (n_sampled, n_features)
+            Sample of the training data.
+        mean : array-like, shape (n_features)
+            Mean of the training data.
+        covariance : array-like, shape (n_features, n_features)
+            Biased covariance matrix of the training data.
+        n_samples : int
+            Number of samples of the training data.
+
+        Returns
+        -------
+        self : object
+            Returns the instance itself.
+        """
+        if self._measure != "pwling":
+            raise ValueError("Only the pwling measure can be fitted to the statistics of the training data")
+        X = check_array(X)
+        covariance = np.atleast_2d(np.array(covariance, dtype=np.float64))
+        K, U = self._search_causal_order_all(X - np.asarray(mean, dtype=np.float64), covariance.copy())
+
+        prior_knowledge = self._Aknw
+        if self._partial:
+            self._causal_order, prior_knowledge = self._partial_prior_knowledge(self._Aknw, K, U)
+        else:
+            self._causal_order = K
+        return self._estimate_adjacency_matrix(X, prior_knowledge=prior_knowledge, gram=_GramMatrices.from_covariance(covariance, n_samples))
+
+    def _search_causal_order_all(self, X_, covariance):
+        """Search the causal order of all the features of X_, residualizing X_ in place as the features are ordered.
+
+        ``covariance`` is the covariance matrix of X_, maintained as the running covariance of the residualized features.
+
+        Returns
+        -------
+        K : list
+            Causal order of the features ordered within the budget.
+        U : array-like
+            Features left unordered once the budget ran out, empty if the causal order is complete (see ``partial_``).
+        """
+        n_features = X_.shape[1]
 
         # Check prior knowledge
         if self._Aknw is not None:
@@ -82,23 +178,34 @@ class PositiveDirectLiNGAM(_PositiveBaseLiNGAM):
                 if not self._apply_prior_knowledge_softly:
                     self._partial_orders = self._extract_partial_orders(self._Aknw)
 
-        # Causal discovery
         U = np.arange(n_features)
         K = []
-        X_ = np.copy(X)
-        if self._measure == "kernel":
-            X_ = scale(X_)
-
-        for _ in range(n_features):
+        # running covariance of the residualized features, and a preallocated buffer for the residual updates
+        self._covariance = covariance
+        update = np.empty_like(X_)
+        coefficients = np.zeros(n_features)
+        started = time.monotonic()
+        self._partial = False
+
+        for iteration in range(n_features):
+            if self._budget_exhausted(started, iteration):
+                self._partial = True
+                break
             if self._measure == "kernel":
                 m = self._search_causal_order_kernel(X_, U)
             elif self._measure == "pwling_fast":
                 m = self._search_causal_order_gpu(X_.astype(np.float64), U.astype(np.int32))
             else:
                 m = self._search_causal_order(X_, U)
-            for i in U:
-                if i != m:
-                    X_[:, i] = self._residual(X_[:, i], X_[:, m])
+            # regress all the remaining features on the chosen one at once, as a rank-one update:
+            # x_i <- x_i - (cov(x_i, x_m) / var(x_m)) x_m, and cov <- cov - cov[:, m] cov[m, :] / var(x_m)
+            coefficients.fill(0)
+            remaining = U[U != m]
+            if len(remaining) > 0 and self._covariance[m, m] > 0:
+                coefficients[remaining] = self._covariance[remaining, m] / self._covariance[m, m]
+                np.multiply(X_[:, [m]], coefficients, out=update)
+                np.subtract(X_, update, out=X_)
+                self._covariance -= self._covariance[m, m] * np.outer(coefficients, coefficients)
             K.append(m)
             U = U[U != m]
             # Update partial orders
@@ -106,9 +213,75 @@ class PositiveDirectLiNGAM(_PositiveBaseLiNGAM):
                 self._partial_orders = self._partial_orders[
                     self._partial_orders[:, 0] != m
                 ]
+        return K, U
+
+    def _fits_small_system(self, X):
+        """Whether X is fitted by the closed-form path: few finite features, the pwling measure, hard prior knowledge and no budget."""
+        return (np.ndim(X) == 2 and 2 <= np.shape(X)[1] <= self._SMALL_SYSTEM_SIZE and np.shape(X)[0] > 1 and self._measure == "pwling"
+                and not self._apply_prior_knowledge_softly and self._time_budget is None and self._max_iterations is None
+                and np.isfinite(np.asarray(X, dtype=np.float64)).all())
+
+    def _fit_small_system(self, X):
+        """Fit the model to X of at most ``_SMALL_SYSTEM_SIZE`` features in closed form.
+
+        The causal order is searched with the pwling measure as in ``_search_causal_order``, but all the pairwise residuals
+        of a step are formed at once as a (n_samples, n_remaining, n_remaining) block from the covariance matrix, and the
+        positive coefficients are estimated by ``small_adaptive_lasso`` on the covariance matrix. The result agrees with the
+        general fit up to floating point error, without its validation and solver overhead.
+        """
+        n_samples, n_features = X.shape
+        if self._Aknw is not None:
+            if (n_features, n_features) != self._Aknw.shape:
+                raise ValueError(
+                    "The shape of prior knowledge must be (n_features, n_features)"
+                )
+            self._partial_orders = self._extract_partial_orders(self._Aknw)
+
+        X_ = X - X.mean(axis=0)
+        covariance = X_.T @ X_ / n_samples
+        residual_covariance = covariance.copy()
+        U = np.arange(n_features)
+        K = []
+        while len(U) > 0:
+            Uc, _ = self._search_candidate(U)
+            m = Uc[0]
+            if len(Uc) > 1:
+                std = np.sqrt(np.diag(residual_covariance)[U])
+                Z = X_[:, U] / std
+                C = residual_covariance[np.ix_(U, U)] / np.outer(std, std)
+                np.fill_diagonal(C, 0)
+                # R[:, i, j]: residual of i regressed on j, of standard deviation sqrt(1 - C[i, j]^2)
+                R = Z[:, :, None] - Z[:, None, :] * C
+                H = self._entropies(Z)
+                H_r = self._entropies(R / np.sqrt(1 - C ** 2))
+                diff = (H[None, :] + H_r) - (H[:, None] + H_r.T)
+                scores = -1.0 * np.sum(np.minimum(0, diff) ** 2, axis=1)
+                candidates = np.isin(U, Uc)
+                m = U[candidates][np.argmax(scores[candidates])]
+            remaining = U[U != m]
+            if len(remaining) > 0 and residual_covariance[m, m] > 0:
+                coefficients = residual_covariance[remaining, m] / residual_covariance[m, m]
+                X_[:, remaining] -= X_[:, [m]] * coefficients
+                residual_covariance[np.ix_(remaining, remaining)] -= residual_covariance[m, m] * np.outer(coefficients, coefficients)
+                residual_covariance[remaining, m] = residual_covariance[m, remaining] = 0
+            K.append(int(m))
+            U = remaining
+            if self._Aknw is not None:
+                self._partial_orders = self._partial_orders[self._partial_orders[:, 0] != m]
 
         self._causal_order = K
-        return self._estimate_adjacency_matrix(X, prior_knowledge=self._Aknw)
+        self._partial = False
+        if self._Aknw is not None:
+            pk = self._Aknw.copy()
+            np.fill_diagonal(pk, 0)
+        B = np.zeros([n_features, n_features], dtype="float64")
+        for i in range(1, n_features):
+            target = K[i]
+            predictors = [p for p in K[:i] if self._Aknw is None or pk[target, p] != 0]
+            if len(predictors) > 0:
+                B[target, predictors] = small_adaptive_lasso(covariance, predictors, target)
+        self._adjacency_matrix = B
+        return self
 
     def _extract_partial_orders(self, pk):
         """Extract partial orders from prior knowledge."""
@@ -204,33 +377,6 @@ class PositiveDirectLiNGAM(_PositiveBaseLiNGAM):
                 Vj.append(i)
         return Uc, Vj
 
-    def _search_causal_order(self, X, U):
-        """Search the causal ordering."""
-        Uc, Vj = self._search_candidate(U)
-        if len(Uc) == 1:
-            return Uc[0]
-
-        M_list = []
-        for i in Uc:
-            M = 0
-            for j in U:
-                if i != j:
-                    xi_std = (X[:, i] - np.mean(X[:, i])) / np.std(X[:, i])
-                    xj_std = (X[:, j] - np.mean(X[:, j])) / np.std(X[:, j])
-                    ri_j = (
-                        xi_std
-                        if i in Vj and j in Uc
-                        else self._residual(xi_std, xj_std)
-                    )
-                    rj_i = (
-                        xj_std
-                        if j in Vj and i in Uc
-                        else self._residual(xj_std, xi_std)
-                    )
-                    M += np.min([0, self._diff_mutual_info(xi_std, xj_std, ri_j, rj_i)]) ** 2
-            M_list.append(-1.0 * M)
-        return Uc[np.argmax(M_list)]
-
     def _search_causal_order_gpu(self, X, U):
         """Accelerated Causal ordering.
 
@@ -275,29 +421,3 @@ class PositiveDirectLiNGAM(_PositiveBaseLiNGAM):
         sigma_D = np.linalg.svd(D_kappa, compute_uv=False)
 
         return (-1 / 2) * (np.sum(np.log(sigma_K)) - np.sum(np.log(sigma_D)))
-
-    def _search_causal_order_kernel(self, X, U):
-        """Search the causal ordering by kernel method."""
-        Uc, Vj = self._search_candidate(U)
-        if len(Uc) == 1:
-            return Uc[0]
-
-        if X.shape[0] > 1000:
-            param = [2e-3, 0.5]
-        else:
-            param = [2e-2, 1.0]
-
-        Tkernels = []
-        for j in Uc:
-            Tkernel = 0
-            for i in U:
-                if i != j:
-                    ri_j = (
-                        X[:, i]
-                        if j in Vj and i in Uc
-                        else self._residual(X[:, i], X[:, j])
-                    )
-                    Tkernel += self._mutual_information(X[:, j], ri_j, param)
-            Tkernels.append(Tkernel)
-
-        return Uc[np.argmin(Tkernels)]
\ No newline at end of file
@@ -0,0 +1,154 @@
+# -----------------------------------------------------------------------------
+# Copyright contributors to the SAX4BPM project
+# -----------------------------------------------------------------------------
+from typing import List, Optional
+
+import numpy as np
+import pandas as pd
+
+from sax.core.utils.helper_utils import precedence_counts
+
+
+class SufficientStatistics:
+    """
+    Mergeable statistics of a data matrix with a row per trace and a named column per activity, from which the positive DirectLiNGAM model is fitted
+    without the matrix itself (see :meth:`PositiveLingamImpl.run_statistics`). Rows are accumulated as they are appended, and the statistics of two
+    disjoint sets of rows merge into the statistics of their union.
+
+    The number of rows, the mean and the centered cross-products of the columns (merged as by Chan et al., which is exact and avoids the cancellation of
+    raw sums of squares on timestamps), and the precedence counts of the columns used to assess prior knowledge, are exact. The entropy approximation
+    of the pwling measure averages nonlinear functions (log cosh u and u exp(-u^2/2)) of the standardized residuals, which depend on the moments of all the
+    rows and on the causal order found so far, so these averages cannot be accumulated; they are taken over a uniform reservoir sample of at most
+    ``sample_size`` rows instead, which holds all the rows as long as they fit.
+    """
+
+    def __init__(self, columns: List[str], sample_size: int = 2048, random_state: Optional[int] = None):
+        """
+        Create empty statistics
+
+        :param columns: names of the columns
+        :type columns: List[str]
+        :param sample_size: maximal number of rows kept in the reservoir sample, defaults to 2048
+        :type sample_size: int, optional
+        :param random_state: seed of the reservoir sampling, defaults to None
+        :type random_state: Optional[int], optional
+        """
+        n_columns = len(columns)
+        self._columns = list(columns)
+        self._sample_size = sample_size
+        self._random = np.random.RandomState(random_state)
+        self._count = 0
+        self._mean = np.zeros(n_columns)
+        self._cross_products = np.zeros((n_columns, n_columns))
+        self._precedence_counts = np.zeros((n_columns, n_columns), dtype=np.int64)
+        self._sample = np.empty((0, n_columns))
+
+    def update(self, values: np.ndarray) -> 'SufficientStatistics':
+        """
+        Accumulate new rows, with their columns in the order of the columns of the statistics. Rows with missing values are left out.
+
+        :param values: rows to accumulate
+        :type values: np.ndarray
+        :return: the statistics themselves
+        :rtype: SufficientStatistics
+        """
+        values = np.asarray(values, dtype=np.float64).reshape(-1, len(self._columns))
+        values = values[np.isfinite(values).all(axis=1)]
+        if len(values) == 0:
+            return self
+        batch = SufficientStatistics(self._columns, self._sample_size)
+        batch._count = len(values)
+        batch._mean = values.mean(axis=0)
+        centered = values - batch._mean
+        batch._cross_products = centered.T @ centered
+        batch._precedence_counts = precedence_counts(values)
+        if len(values) > self._sample_size:
+            values = values[np.sort(self._random.choice(len(values), self._sample_size, replace=False))]
+        batch._sample = values
+        return self.merge(batch)
+
+    def merge(self, other: 'SufficientStatistics') -> 'SufficientStatistics':
+        """
+        Merge the statistics of other rows into these statistics. The columns of the other statistics are matched by name.
+
+        :param other: statistics of other rows, with the same columns
+        :type other: SufficientStatistics
+        :raises ValueError: if the columns of the statistics differ
+        :return: the statistics themselves
+        :rtype: SufficientStatistics
+        """
+        if sorted(other._columns) != sorted(self._columns):
+            raise ValueError(f"Cannot merge statistics of columns {other._columns} into statistics of columns {self._columns}")
+        if other._count == 0:
+            return self
+        index = [other._columns.index(column) for column in self._columns]
+        count = self._count + other._count
+        delta = other._mean[index] - self._mean
+        self._cross_products = self._cross_products + other._cross_products[np.ix_(index, index)] + np.outer(delta, delta) * (self._count * other._count / count)
+        self._mean = self._mean + delta * (other._count / count)
+        self._precedence_counts = self._precedence_counts + other._precedence_counts[np.ix_(index, index)]
+
+        # a uniform sample of the union: the number of rows drawn from each side is hypergeometric, and each side is a uniform sample of its own rows
+        size = min(self._sample_size, count)
+        drawn = self._random.hypergeometric(self._count, other._count, size) if self._count > 0 else 0
+        drawn = min(drawn, len(self._sample))
+        mine = self._sample[np.sort(self._random.choice(len(self._sample), drawn, replace=False))]
+        others = other._sample[:, index]
+        others = others[np.sort(self._random.choice(len(others), min(size - drawn, len(others)), replace=False))]
+        self._sample = np.concatenate([mine, others])
+        self._count = count
+        return self
+
+    def getColumns(self) -> List[str]:
+        """
+        Return the names of the columns
+
+        :return: List of column names
+        :rtype: List[str]
+        """
+        return self._columns
+
+    def getCount(self) -> int:
+        """
+        Return the number of accumulated rows
+
+        :return: number of rows
+        :rtype: int
+        """
+        return self._count
+
+    def getMean(self) -> np.ndarray:
+        """
+        Return the mean of the columns over all the accumulated rows
+
+        :return: mean of each column
+        :rtype: np.ndarray
+        """
+        return self._mean.copy()
+
+    def getCovariance(self) -> np.ndarray:
+        """
+        Return the (biased) covariance matrix of the columns over all the accumulated rows, as ``np.cov(X, rowvar=False, bias=True)``
+
+        :return: covariance matrix
+        :rtype: np.ndarray
+        """
+        return self._cross_products / self._count if self._count else np.zeros_like(self._cross_products)
+
+    def getPrecedenceFractions(self) -> np.ndarray:
+        """
+        Return the precedence fractions of the columns over all the accumulated rows, as :func:`sax.core.utils.helper_utils.precedence_fractions`
+
+        :return: matrix F where F[j, i] is the fraction of rows in which column i is greater or equal than column j
+        :rtype: np.ndarray
+        """
+        return self._precedence_counts / self._count if self._count else np.zeros(self._precedence_counts.shape)
+
+    def getSample(self) -> pd.DataFrame:
+        """
+        Return the reservoir sample - a uniform sample of at most ``sample_size`` of the accumulated rows, all of them if they fit
+
+        :return: sampled rows, with the named columns
+        :rtype: pd.DataFrame
+        """
+        return pd.DataFrame(self._sample, columns=self._columns)
@@ -3,11 +3,16 @@
 # -----------------------------------------------------------------------------
 import collections
 import collections
+import copy
+import logging
+import time
+from concurrent.futures import Future
+from datetime import timedelta
 from itertools import chain
 import pandas as pd
 from typing import Dict
-from typing import List, Set
-from typing import Optional
+from typing import List, Set, Tuple
+from typing import Optional, Union
 
 
 import graphviz
@@ -16,16 +21,22 @@ import numpy as np
 from lingam.utils import make_dot
 
 from sax.core.causal_process_discovery.algorithms.base_causal_alg import CausalResultInfo
+from sax.core.causal_process_discovery.algorithms.sufficient_statistics import SufficientStatistics
 from sax.core.causal_process_discovery.causal_constants import DEFAULT_MODALITY, DEFAULT_VARIANT, Algorithm, Modality
 from sax.core.causal_process_discovery.modalities.chain_anchor import ChainAnchorTransformer
 from sax.core.causal_process_discovery.modalities.parent_anchor import ParentAnchorTransformer
+from sax.core.causal_process_discovery.result_cache import data_fingerprint, get_result_cache, result_key
 
 from sax.core.utils.constants import Constants
+from sax.core.utils.parallel import parallel_map
+from sax.core.utils.rendering import get_render_service
 from sax.core.process_data.raw_event_data import RawEventData
-import sax.core.process_mining.process_mining as pm
+from sax.core.process_data.sampling import apply_with_sample
 
+logger = logging.getLogger(__name__)
 
-def discover_causal_dependencies(dataObject:RawEventData,variants: Optional[List[str]] = None, algorithm: Optional[Algorithm] = DEFAULT_VARIANT, modality: Optional[Modality] = DEFAULT_MODALITY,prior_knowledge: Optional[bool]=True, threshold: Optional[float]=0.5,depth: int =1) -> CausalResultInfo:
+def discover_causal_dependencies(dataObject:RawEventData,variants: Optional[List[str]] = None, algorithm: Optional[Algorithm] = DEFAULT_VARIANT, modality: Optional[Modality] = DEFAULT_MODALITY,prior_knowledge: Optional[bool]=True, threshold: Optional[float]=0.5,depth: int =1, sample: Optional[Union[int, timedelta]] = None, service_times: Optional[bool]=False,
+                                 bootstrap: Optional[int] = None, n_jobs: Optional[int] = None, time_budget: Optional[timedelta] = None, cache: Optional[bool] = True) -> CausalResultInfo:
     """
     Create causal execution dependency model for the given event log represented by the dataobject
 
@@ -39,58 +50,82 @@ def discover_causal_dependencies(dataObject:RawEventData,variants: Optional[List
     :type modality: Optional[Modality], optional
     :param prior_knowledge: whether to use prior knowledge, defaults to False
     :type prior_knowledge: Optional[bool], optional
+    :param sample: if provided, perform causal discovery on a variant-stratified sample of the event log, bounded either by a number of cases or by a time budget, defaults to None
+    :type sample: Optional[Union[int, timedelta]], optional
+    :param service_times: whether to discover dependencies among the service times of the activities (paired from their start and complete lifecycle events) instead of their completion times, requires an event log with lifecycle transitions, defaults to False
+    :type service_times: Optional[bool], optional
+    :param bootstrap: if provided, the maximal number of bootstrap resamples (traces drawn with replacement) fitted on each analyzed subset of the log, to estimate the probability of each discovered edge and the confidence interval of its coefficient (see :meth:`CausalResultInfo.getEdgeProbabilities`); the resampling stops early once the edge probabilities stabilize, defaults to None
+    :type bootstrap: Optional[int], optional
+    :param n_jobs: number of processes, spread over the groups of variants when the log holds several of them, otherwise over the bootstrap resamples (or the pairs of activities of the parent modality) of the single group; None to run sequentially, -1 to use all the CPUs, defaults to None
+    :type n_jobs: Optional[int], optional
+    :param time_budget: if provided, bounds the duration of the discovery - the groups of variants are analyzed until the budget runs out, each within the remaining budget, and the best partial result found so far is returned, flagged as partial (see :meth:`CausalResultInfo.isPartial`), defaults to None
+    :type time_budget: Optional[timedelta], optional
+    :param cache: whether to serve the result from the process-wide result cache (see :func:`sax.core.causal_process_discovery.result_cache.get_result_cache`), keyed on the content of the event log and the discovery parameters; discoveries on a sample or within a time budget are not cached, defaults to True
+    :type cache: Optional[bool], optional
     :raises TypeError: in case the event log is not of appropriate format
     :return: causal dependency model representation
     :rtype: CausalResultInfo
     """           
-    if variants is None:
-        return _discover_causal_dependencies_unification(dataObject=dataObject,algorithm=algorithm,modality=modality,prior_knowledge=prior_knowledge,threshold=threshold,depth=depth)
-    else:
-        # Handle case where variants is provided
-        return _discover_causal_dependencies_unification_variant_specific(dataObject=dataObject,variants=variants,algorithm=algorithm,modality=modality,prior_knowledge=prior_knowledge,threshold=threshold,depth=depth)
+    if cache and sample is None and time_budget is None:
+        try:
+            key = result_key(data_fingerprint(dataObject, lifecycle=bool(service_times)), variants=None if variants is None else list(variants), algorithm=algorithm,
+                             modality=modality, prior_knowledge=prior_knowledge, threshold=threshold, depth=depth, service_times=bool(service_times), bootstrap=bootstrap)
+        except TypeError:
+            # the event log holds values which cannot be hashed, the result is not cached
+            key = None
+        if key is not None:
+            return get_result_cache().get_or_compute(key, lambda: discover_causal_dependencies(dataObject, variants, algorithm, modality, prior_knowledge, threshold,
+                                                                                                depth, sample, service_times, bootstrap, n_jobs, time_budget, cache=False))
+    deadline = None if time_budget is None else time.monotonic() + time_budget.total_seconds()
+
+    def _discover(eventData: RawEventData) -> CausalResultInfo:
+        # pair the lifecycle events once, the interval table is shared by all the discoveries on subsets of the log
+        intervals = eventData.getActivityIntervals() if service_times else None
+        if variants is None:
+            return _discover_causal_dependencies_unification(dataObject=eventData,algorithm=algorithm,modality=modality,prior_knowledge=prior_knowledge,threshold=threshold,depth=depth,intervals=intervals,bootstrap=bootstrap,n_jobs=n_jobs,deadline=deadline)
+        else:
+            # Handle case where variants is provided
+            return _discover_causal_dependencies_unification_variant_specific(dataObject=eventData,variants=variants,algorithm=algorithm,modality=modality,prior_knowledge=prior_knowledge,threshold=threshold,depth=depth,intervals=intervals,bootstrap=bootstrap,n_jobs=n_jobs,deadline=deadline)
+
+    result, _ = apply_with_sample(dataObject, sample, _discover)
+    return result
 
 
 
-def _discover_causal_dependencies_unification(dataObject:RawEventData,algorithm: Optional[Algorithm] = DEFAULT_VARIANT, modality: Optional[Modality] = DEFAULT_MODALITY,prior_knowledge: Optional[bool]=True, threshold: Optional[float]=0.5,depth: int =1) -> CausalResultInfo:
+def _discover_causal_dependencies_unification(dataObject:RawEventData,algorithm: Optional[Algorithm] = DEFAULT_VARIANT, modality: Optional[Modality] = DEFAULT_MODALITY,prior_knowledge: Optional[bool]=True, threshold: Optional[float]=0.5,depth: int =1, intervals: Optional[pd.DataFrame]=None, bootstrap: Optional[int]=None, n_jobs: Optional[int]=None,
+                                                deadline: Optional[float]=None) -> CausalResultInfo:
     variants_dict = __get_variants_dict__(rawEventData=dataObject)
-    results_per_variant =  __results_per_variants__(rawEventData=dataObject, variants_dict=variants_dict,modality=modality ,prior_knowledge=prior_knowledge, threshold=threshold,algorithm=algorithm)
+    results_per_variant =  __results_per_variants__(rawEventData=dataObject, variants_dict=variants_dict,modality=modality ,prior_knowledge=prior_knowledge, threshold=threshold,algorithm=algorithm,intervals=intervals,bootstrap=bootstrap,n_jobs=n_jobs,deadline=deadline)
     general_graph = __unification_of_results__(results=results_per_variant)
 
-
-    return CausalResultInfo((nx.to_numpy_array(general_graph)).T, list(general_graph.nodes()))
+    partial = any(result.isPartial() for result in results_per_variant)
+    return __aggregate_bootstrap__(CausalResultInfo((nx.to_numpy_array(general_graph)).T, list(general_graph.nodes()), partial=partial), results_per_variant)
 
 
 
 
-def _discover_causal_dependencies_unification_variant_specific(dataObject:RawEventData, variants:List[str],algorithm: Optional[Algorithm] = DEFAULT_VARIANT, modality: Optional[Modality] = DEFAULT_MODALITY,prior_knowledge: Optional[bool]=True, threshold: Optional[float]=0.5,depth: int =1) -> CausalResultInfo:
-    results_per_variants = []
+def _discover_causal_dependencies_unification_variant_specific(dataObject:RawEventData, variants:List[str],algorithm: Optional[Algorithm] = DEFAULT_VARIANT, modality: Optional[Modality] = DEFAULT_MODALITY,prior_knowledge: Optional[bool]=True, threshold: Optional[float]=0.5,depth: int =1, intervals: Optional[pd.DataFrame]=None, bootstrap: Optional[int]=None, n_jobs: Optional[int]=None,
+                                                               deadline: Optional[float]=None) -> CausalResultInfo:
+    # the variant groups are scanned once, and the discoveries of all the requested groups are dispatched together
+    variants_dict = __get_variants_dict__(rawEventData=dataObject)
+    variant_specific_dict = {}
     for variant_str in variants:
         variant = variant_str.split(",")
         variant_sorted = sorted(variant)
         variant_set_str = str(variant_sorted)
-        variants_dict = __get_variants_dict__(rawEventData=dataObject)
-        variant_specific_dict = {}
         variant_specific_dict[variant_set_str] = variants_dict[variant_set_str]
-        results_per_variant =  __results_per_variants__(rawEventData=dataObject, variants_dict=variant_specific_dict,modality=modality ,prior_knowledge=prior_knowledge, threshold=threshold,algorithm=algorithm)
-        results_per_variants.append(results_per_variant)
-        #general_graph = __unification_of_results__(results=results_per_variant)
-        #results_per_variants.append(CausalResultInfo((nx.to_numpy_array(general_graph)).T, list(general_graph.nodes())))
-
-
-    results_per_variants = [
-    x
-    for xs in results_per_variants
-    for x in xs
-    ]   
+    results_per_variants =  __results_per_variants__(rawEventData=dataObject, variants_dict=variant_specific_dict,modality=modality ,prior_knowledge=prior_knowledge, threshold=threshold,algorithm=algorithm,intervals=intervals,bootstrap=bootstrap,n_jobs=n_jobs,deadline=deadline)
 
     if len(results_per_variants)>=1:
         general_graph = __unification_of_results__(results=results_per_variants)
 
-    return CausalResultInfo((nx.to_numpy_array(general_graph)).T, list(general_graph.nodes()))
+    partial = any(result.isPartial() for result in results_per_variants)
+    return __aggregate_bootstrap__(CausalResultInfo((nx.to_numpy_array(general_graph)).T, list(general_graph.nodes()), partial=partial), results_per_variants)
 
 
 
-def _discover_causal_dependencies(dataObject:RawEventData,variant: Optional[Algorithm] = DEFAULT_VARIANT, modality: Optional[Modality] = DEFAULT_MODALITY,prior_knowledge: Optional[bool]=True, threshold: Optional[float]=0.5,depth: int =1) -> CausalResultInfo:
+def _discover_causal_dependencies(dataObject:RawEventData,variant: Optional[Algorithm] = DEFAULT_VARIANT, modality: Optional[Modality] = DEFAULT_MODALITY,prior_knowledge: Optional[bool]=True, threshold: Optional[float]=0.5,depth: int =1, intervals: Optional[pd.DataFrame]=None,
+                                  bootstrap: Optional[int]=None, n_jobs: Optional[int]=None, time_budget: Optional[float]=None) -> CausalResultInfo:
     """
     Internal method -create causal execution dependency model for the given event log
 
@@ -102,6 +137,14 @@ def _discover_causal_dependencies(dataObject:RawEventData,variant: Optional[Algo
     :type modality: Optional[Modality], optional
     :param prior_knowledge: whether to use prior knowledge, defaults to False
     :type prior_knowledge: Optional[bool], optional
+    :param intervals: activity interval table, if provided the service times of the activities are analyzed instead of their completion times, defaults to None
+    :type intervals: Optional[pd.DataFrame], optional
+    :param bootstrap: if provided, the maximal number of bootstrap resamples used to estimate the probabilities of the discovered edges, defaults to None
+    :type bootstrap: Optional[int], optional
+    :param n_jobs: number of processes fitting the bootstrap resamples, defaults to None
+    :type n_jobs: Optional[int], optional
+    :param time_budget: time budget of the discovery in seconds, defaults to None
+    :type time_budget: Optional[float], optional
     :raises TypeError: in case the event log is not of appropriate format
     :return: causal dependency model representation
     :rtype: CausalResultInfo
@@ -112,14 +155,127 @@ def _discover_causal_dependencies(dataObject:RawEventData,variant: Optional[Algo
     if modality == Modality.CHAIN:
         
         #check the required modality and invoke the relevant transformer with provided algorithm       
-        result = ChainAnchorTransformer().apply(dataObject,variant,prior_knowledge,threshold)
+        result = ChainAnchorTransformer().apply(dataObject,variant,prior_knowledge,threshold,intervals,bootstrap,n_jobs,time_budget)
     else : #modality parent
-        result  = ParentAnchorTransformer().apply(dataObject,variant,prior_knowledge,depth, threshold) 
+        result  = ParentAnchorTransformer().apply(dataObject,variant,prior_knowledge,depth, threshold,intervals,bootstrap,n_jobs,time_budget) 
 
     return result     
 
 
 
+class IncrementalChainDiscovery:
+    """
+    Incremental causal discovery of the chain modality. As traces are appended to the event log, their chained durations (see
+    :meth:`ChainAnchorTransformer.chain_durations`) are folded into mergeable sufficient statistics, kept per activity-set group of variants (see
+    :class:`SufficientStatistics`), and the causal dependencies are re-derived from the statistics alone, without rescanning the traces seen before. As
+    :func:`discover_causal_dependencies`, the result unifies the causal dependencies discovered for each group.
+
+    The moments and the precedence counts of the statistics are exact, so the prior knowledge and the adjacency matrix of a given causal order are the
+    same as on the whole log; the entropies of the causal ordering search are averaged over a reservoir sample of ``sample_size`` traces per group, so the
+    result is the same as the discovery on the whole log as long as the traces of each group fit in the sample.
+    """
+
+    def __init__(self, algorithm: Optional[Algorithm] = DEFAULT_VARIANT, prior_knowledge: Optional[bool] = True, threshold: Optional[float] = 0.5,
+                 sample_size: int = 2048, random_state: Optional[int] = None):
+        """
+        :param algorithm: Algorithm to use for causal discovery, only POSITIVE_LINGAM can be fitted to sufficient statistics, defaults to POSITIVE_LINGAM
+        :type algorithm: Optional[Algorithm], optional
+        :param prior_knowledge: whether to use prior knowledge, defaults to True
+        :type prior_knowledge: Optional[bool], optional
+        :param threshold: precedence threshold of the prior knowledge, defaults to 0.5
+        :type threshold: Optional[float], optional
+        :param sample_size: number of traces of each group kept in the reservoir sample of its statistics, defaults to 2048
+        :type sample_size: int, optional
+        :param random_state: seed of the reservoir sampling, defaults to None
+        :type random_state: Optional[int], optional
+        :raises ValueError: if the algorithm cannot be fitted to sufficient statistics
+        """
+        if algorithm != Algorithm.POSITIVE_LINGAM:
+            raise ValueError(f"Algorithm {algorithm} cannot be applied to sufficient statistics, use {Algorithm.POSITIVE_LINGAM}")
+        self._algorithm = algorithm
+        self._prior_knowledge = prior_knowledge
+        self._threshold = threshold
+        self._sample_size = sample_size
+        self._random = np.random.RandomState(random_state)
+        self._statistics: Dict[str, SufficientStatistics] = {}
+        self._events: Dict[str, int] = {}
+
+    def update(self, dataObject: RawEventData) -> 'IncrementalChainDiscovery':
+        """
+        Fold newly appended traces into the statistics of their groups. The event log is expected to hold complete traces which were not folded before.
+
+        :param dataObject: event log of the appended traces
+        :type dataObject: RawEventData
+        :raises TypeError: in case the event log is not of appropriate format
+        :return: the discovery itself
+        :rtype: IncrementalChainDiscovery
+        """
+        if type(dataObject) not in [RawEventData]: raise TypeError("the method can be applied only to an object of type RawEventData!")
+        event_groups, keys = __case_groups__(dataObject)
+        events = __standard_events__(dataObject)
+        transformer = ChainAnchorTransformer()
+        for key, rows in zip(keys, __split_rows__(event_groups, len(keys))):
+            durations = transformer.chain_durations(__group_event_data__(events, rows))
+            statistics = self._statistics.get(key)
+            if statistics is None:
+                statistics = SufficientStatistics(list(durations.columns), self._sample_size, self._random.randint(np.iinfo(np.int32).max))
+                self._statistics[key] = statistics
+            statistics.update(durations[statistics.getColumns()].to_numpy(dtype=np.float64))
+            self._events[key] = self._events.get(key, 0) + len(rows)
+        return self
+
+    def merge(self, other: 'IncrementalChainDiscovery') -> 'IncrementalChainDiscovery':
+        """
+        Merge the statistics of another discovery, folded from other traces (for instance by another process), into the statistics of this discovery
+
+        :param other: discovery of other traces
+        :type other: IncrementalChainDiscovery
+        :return: the discovery itself
+        :rtype: IncrementalChainDiscovery
+        """
+        for key, statistics in other._statistics.items():
+            if key in self._statistics:
+                self._statistics[key].merge(statistics)
+            else:
+                self._statistics[key] = copy.deepcopy(statistics)
+            self._events[key] = self._events.get(key, 0) + other._events[key]
+        return self
+
+    def getStatistics(self) -> Dict[str, SufficientStatistics]:
+        """
+        Return the statistics of the groups folded so far
+
+        :return: mapping of the activity-set group keys (as in ``__get_variants_dict__``) to the statistics of their chained durations
+        :rtype: Dict[str, SufficientStatistics]
+        """
+        return self._statistics
+
+    def getResult(self, n_jobs: Optional[int] = None) -> CausalResultInfo:
+        """
+        Derive the causal dependency model of all the traces folded so far from the statistics of their groups
+
+        :param n_jobs: number of processes the groups are spread over, None to analyze them sequentially, -1 to use all the CPUs, defaults to None
+        :type n_jobs: Optional[int], optional
+        :return: causal dependency model representation
+        :rtype: CausalResultInfo
+        """
+        # as in the discovery on the whole log, groups of too few events are left out and groups which cannot be analyzed are skipped
+        groups = [(key, statistics) for key, statistics in self._statistics.items() if self._events[key] > 4]
+
+        def discover_group(group):
+            key, statistics = group
+            try:
+                return ChainAnchorTransformer().apply_statistics(statistics, self._algorithm, self._prior_knowledge, self._threshold)
+            except Exception:
+                logger.warning("Causal discovery failed on the statistics of the group of variants %s, the group is left out", key, exc_info=True)
+                return None
+
+        results = [result for result in parallel_map(discover_group, groups, n_jobs, prefer="processes") if result is not None]
+        general_graph = __unification_of_results__(results=results)
+        return CausalResultInfo((nx.to_numpy_array(general_graph)).T, list(general_graph.nodes()))
+
+
+
 def get_data_causal_representation(dataframe: RawEventData, modality,prior_knowledge,p_value_threshold,variants: Optional[List[str]] = None):
         """
         The purpose of this function is to take a raw event log as input and output a dictionary representation of the causal model discovered from this event log.
@@ -224,22 +380,31 @@ def view_causal_dependencies(dependencies: CausalResultInfo, p_value_threshold:
                     dot.body[i] = f'{line[:-1]} [shape=diamond]\n'
 
     return dot
+
+def _build_causal_graph(dependencies: CausalResultInfo, format: str, p_value_threshold: float = None) -> graphviz.Digraph:
+    dot = view_causal_dependencies(dependencies, p_value_threshold)
+    dot.format = format
+    return dot
+
+def render_causal_dependencies(dependencies: CausalResultInfo, p_value_threshold: float = None, format: str = "svg") -> Future:
+    """
+    Render the causal dependency model graph to image bytes in the background, without opening a viewer. Images are cached by the content of the model and the render options.
+
+    :param dependencies: causal dependency model representation
+    :type dependencies: CausalResultInfo
+    :param p_value_threshold: threshold for displaying causal relationships, no edges with coefficients less than specified will be displayed, defaults to None
+    :type p_value_threshold: float, optional
+    :param format: image format (svg, png...), defaults to svg
+    :type format: str, optional
+    :return: future holding the image bytes
+    :rtype: Future
+    """
+    return get_render_service().render(dependencies, _build_causal_graph, format, p_value_threshold=p_value_threshold)
         
         
 
 def __get_variants_dict__(rawEventData:RawEventData) -> Dict[str,List[str]]:
-    variants_dict = {}
-
-    for sub_variant in rawEventData.getVariants():
-        variant_list = sub_variant.split(',')
-        variant_sorted = sorted(variant_list)
-        variant_set_str = str(variant_sorted)
-        if not variant_set_str in variants_dict.keys():
-            variants_dict[variant_set_str] = [variant_list]
-        else:
-            variants_dict[variant_set_str].append(variant_list)
-
-    return variants_dict
+    return rawEventData.getVariantGroups()
 
 
 def __create_graph__(result, strength=0.48):
@@ -262,35 +427,146 @@ def __create_graph__(result, strength=0.48):
     return new_graph
 
 
-def __results_per_variants__(rawEventData : RawEventData, variants_dict: Dict[str, List[str]], modality:Optional[Modality] = Modality.CHAIN, prior_knowledge:Optional[bool]=True,threshold: Optional[float]=0.5,algorithm: Optional[Algorithm] = DEFAULT_VARIANT)-> List[CausalResultInfo]:
-    results = []
+def __case_groups__(rawEventData: RawEventData) -> Tuple[np.ndarray, List[str]]:
+    """
+    Label each event of the event log with the activity-set group of its case, in a single vectorized pass. The activities of every case are counted in a
+    case x activity matrix built with one bincount, and the groups are the distinct rows of the matrix; the key of a group is the sorted list of its
+    activities with their repetitions, as in ``__get_variants_dict__``.
+
+    :param rawEventData: event log
+    :type rawEventData: RawEventData
+    :return: the group code of each event (row of the event log dataframe), and the key of each group code
+    :rtype: Tuple[np.ndarray, List[str]]
+    """
     current_mapping = rawEventData.getMandatoryProperties()
-    for variant in variants_dict:
-        variants_combined = []
-        #find activities from other 
-        for second_variant in variants_dict: 
-            if variant == second_variant:
-                for sub_variant in variants_dict[second_variant]:
-                    sub_variant_str = ','.join(sub_variant)                    
-                    or_variant = rawEventData.filterVariants([sub_variant_str])
-                    variant_df = or_variant.getData()
-                    columns = variants_dict[variant][0]
-                    variant_df = variant_df.reset_index()
-                    #why do i need this?
-                    variant_df = variant_df[variant_df[current_mapping[Constants.ACTIVITY_KEY]].isin(columns)][[current_mapping[Constants.CASE_ID_KEY], current_mapping[Constants.ACTIVITY_KEY], \
-                                                                                                                current_mapping[Constants.TIMESTAMP_KEY], current_mapping[Constants.TIMESTAMP_KEY]]]
-                    variants_combined.append(variant_df)
-        combined_df = pd.concat(variants_combined, ignore_index=True)
-        combined_df.columns = [Constants.CASE_ID_KEY, Constants.ACTIVITY_KEY, Constants.TIMESTAMP_KEY, Constants.START_BASE_COLUMN]
-        combined_event = pm.create_from_dataframe(combined_df,False,case_id=Constants.CASE_ID_KEY, activity_key=Constants.ACTIVITY_KEY, timestamp_key=Constants.TIMESTAMP_KEY, starttime_column=Constants.START_BASE_COLUMN)
-        if len(combined_df) > len(combined_df.columns):
-            try:
-                result_single = _discover_causal_dependencies(combined_event, modality=modality, prior_knowledge=prior_knowledge, threshold=threshold,variant=algorithm)
-                results.append(result_single)
-            except Exception:
-                pass
+    data = rawEventData.getData()
+    case_codes, cases = pd.factorize(data[current_mapping[Constants.CASE_ID_KEY]])
+    activity_codes, activities = pd.factorize(data[current_mapping[Constants.ACTIVITY_KEY]])
+    names = [str(activity) for activity in activities]
+    # number the activities in sorted order, so that the rows of the count matrix read as sorted activity lists
+    order = sorted(range(len(names)), key=names.__getitem__)
+    rank = np.empty(len(names), dtype=np.int64)
+    rank[order] = np.arange(len(names))
+    counts = np.bincount(case_codes * len(names) + rank[activity_codes], minlength=len(cases) * len(names)).reshape(len(cases), len(names))
+    rows, case_groups = np.unique(counts, axis=0, return_inverse=True)
+    sorted_names = [names[index] for index in order]
+    keys = [str([name for name, count in zip(sorted_names, row) for _ in range(count)]) for row in rows.tolist()]
+    return case_groups.reshape(-1)[case_codes], keys
+
+
+def __split_rows__(codes: np.ndarray, n_codes: int, ranks: Optional[np.ndarray] = None) -> List[np.ndarray]:
+    """
+    Split the positions of the rows by their code with a single stable sort, keeping the rows of each code in their original order (or in the order of
+    their ranks, if provided)
+    """
+    order = np.argsort(codes, kind="stable") if ranks is None else np.lexsort((ranks, codes))
+    return np.split(order, np.cumsum(np.bincount(codes, minlength=n_codes))[:-1])
+
+
+def __standard_events__(rawEventData: RawEventData) -> pd.DataFrame:
+    """
+    Extract the case id, activity and timestamp columns of the event log once, in the standard column names, along with the start time of each case taken
+    from its first event as the discovery expects, for slicing the events of the groups
+    """
+    current_mapping = rawEventData.getMandatoryProperties()
+    data = rawEventData.getData()
+    events = pd.DataFrame({
+        Constants.CASE_ID_KEY: data[current_mapping[Constants.CASE_ID_KEY]].astype("string").array,
+        Constants.ACTIVITY_KEY: data[current_mapping[Constants.ACTIVITY_KEY]].astype("string").array,
+        Constants.TIMESTAMP_KEY: pd.to_datetime(data[current_mapping[Constants.TIMESTAMP_KEY]], utc=True).array,
+    })
+    events[Constants.STARTTIME_COLUMN] = events.groupby(Constants.CASE_ID_KEY, sort=False)[Constants.TIMESTAMP_KEY].transform("min")
+    return events
+
+
+def __group_event_data__(events: pd.DataFrame, group_rows: np.ndarray) -> RawEventData:
+    """
+    Build the event log of a group of cases from the rows of its events (see ``__standard_events__``), without formatting and importing the events again
+    """
+    group_df = events.iloc[group_rows].reset_index(drop=True)
+    mandatory_properties = {key: key for key in (Constants.CASE_ID_KEY, Constants.ACTIVITY_KEY, Constants.TIMESTAMP_KEY, Constants.STARTTIME_COLUMN)}
+    return RawEventData(group_df, mandatory_properties, {})
+
+
+def __successor_sets__(result: CausalResultInfo, strength=0.48) -> Dict[str, Set[str]]:
+    """
+    Successors of every activity in the graph of the result, as ``__create_graph__`` builds it (the edges of coefficients below the strength are left
+    out), read directly from the adjacency matrix without building the graph
+    """
+    columns = result.getColumns()
+    np_matrix = np.array(result.getAdjacencyMatrix()).T
+    successors = {column: set() for column in columns}
+    for source, target in zip(*np.nonzero(~(np_matrix < strength) & (np_matrix != 0))):
+        successors[columns[source]].add(columns[target])
+    return successors
 
-    return results
+
+def __results_per_variants__(rawEventData : RawEventData, variants_dict: Dict[str, List[str]], modality:Optional[Modality] = Modality.CHAIN, prior_knowledge:Optional[bool]=True,threshold: Optional[float]=0.5,algorithm: Optional[Algorithm] = DEFAULT_VARIANT, intervals: Optional[pd.DataFrame]=None,
+                             bootstrap: Optional[int]=None, n_jobs: Optional[int]=None, deadline: Optional[float]=None)-> List[CausalResultInfo]:
+    """
+    Discover the causal dependencies of every activity-set group of variants. The events are labelled with their group in a single pass
+    (see ``__case_groups__``) and sliced by group with one sort, and the discoveries of the groups are dispatched to a pool of ``n_jobs`` processes;
+    with a single group, the processes are left to the discovery of the group itself (bootstrap resamples, pairs of activities).
+    """
+    event_groups, keys = __case_groups__(rawEventData)
+    # within a group the events are ordered by the variant of their case as listed in the variants dictionary, since the parent modality reads the pairs
+    # of activities in the order of the variants
+    variant_ranks = {",".join(sub_variant): rank for variant in variants_dict for rank, sub_variant in enumerate(variants_dict[variant])}
+    case_ranks = rawEventData.getCaseVariants().map(variant_ranks)
+    event_ranks = rawEventData.getData()[rawEventData.getCaseIdColumnName()].map(case_ranks).fillna(-1).to_numpy(dtype=np.int64)
+    group_rows = dict(zip(keys, __split_rows__(event_groups, len(keys), event_ranks)))
+    if intervals is not None:
+        # label the activity instances with the group of their case as well, so that each group is handed its own intervals
+        case_ids = rawEventData.getData()[rawEventData.getCaseIdColumnName()].astype("string").to_numpy()
+        case_index = pd.Index(case_ids)
+        first_events = ~case_index.duplicated()
+        interval_codes = pd.Index(case_ids[first_events]).get_indexer(intervals[Constants.CASE_ID_KEY].astype("string").to_numpy())
+        interval_groups = np.where(interval_codes >= 0, event_groups[first_events][interval_codes], len(keys))
+        group_intervals = dict(zip(keys, __split_rows__(interval_groups, len(keys) + 1)))
+    events = __standard_events__(rawEventData)
+    groups = []
+    for variant in variants_dict:
+        rows = group_rows.get(variant, np.zeros(0, dtype=np.int64))
+        interval_rows = None if intervals is None else intervals.iloc[group_intervals.get(variant, np.zeros(0, dtype=np.int64))]
+        # the events of the group are sliced here, so that the workers are sent the events of their group only
+        groups.append((variant, variants_dict[variant][0], __group_event_data__(events, rows) if len(rows) > 4 else None, interval_rows))
+    group_jobs = n_jobs if len(groups) > 1 else None
+
+    def discover_group(group):
+        key, columns, group_data, group_intervals = group
+        remaining = None if deadline is None else deadline - time.monotonic()
+        if remaining is not None and remaining <= 0:
+            # out of time budget - the activities of the group are kept, without any causal dependency
+            return CausalResultInfo(np.zeros((len(columns), len(columns))), columns, partial=True)
+        if group_data is None:
+            return None
+        try:
+            return _discover_causal_dependencies(group_data, modality=modality, prior_knowledge=prior_knowledge, threshold=threshold,variant=algorithm,
+                                                 intervals=group_intervals,bootstrap=bootstrap,n_jobs=None if group_jobs is not None else n_jobs,time_budget=remaining)
+        except Exception:
+            logger.warning("Causal discovery failed on the group of variants %s, the group is left out", key, exc_info=True)
+            return None
+
+    return [result for result in parallel_map(discover_group, groups, group_jobs, prefer="processes") if result is not None]
+
+def __aggregate_bootstrap__(result: CausalResultInfo, results: List[CausalResultInfo]) -> CausalResultInfo:
+    """
+    Attach to the unified result the bootstrap statistics of the per-variant results it was built from. An edge between two activities may be discovered
+    in several groups of variants; its probability is the highest of its probabilities in those groups, along with the coefficient interval of the same
+    group. The number of bootstrap samples is the smallest among the groups.
+    """
+    bootstrapped = [single for single in results if single.getEdgeProbabilities() is not None]
+    if not bootstrapped:
+        return result
+    result.edgeProbabilities = {}
+    result.coefficientIntervals = {}
+    for single in bootstrapped:
+        for edge, probability in single.getEdgeProbabilities().items():
+            if probability > result.edgeProbabilities.get(edge, -1):
+                result.edgeProbabilities[edge] = probability
+                result.coefficientIntervals[edge] = single.getCoefficientIntervals()[edge]
+    result.bootstrapSamples = min(single.getBootstrapSamples() for single in bootstrapped)
+    return result
 
 # Step 1: XOR Check
 def xor_check(family_of_sets):
@@ -394,19 +670,17 @@ def __unification_of_results__(results: List[CausalResultInfo]) -> nx.DiGraph:
     OR_counter = 0
 
     # 3) Iterate over all the nodes in the original (unified) set
+    # the successors of every node in the graph of each result, computed once per result
+    successors_per_result = [__successor_sets__(result, 0.4) for result in results]
     for node in all_columns:
         # Collect child sets from each graph
         child_sets = []
-        for result in results:
-            current_graph = __create_graph__(result, 0.4)
-            if node in current_graph.nodes():
-                successors_list = list(current_graph.successors(node))
-                if len(successors_list) == 0:
-                    continue
-                # Convert to a set for easier logic
-                successors_set = set(successors_list)
-                if successors_set not in child_sets:
-                    child_sets.append(successors_set)
+        for successors in successors_per_result:
+            successors_set = successors.get(node)
+            if not successors_set:
+                continue
+            if successors_set not in child_sets:
+                child_sets.append(set(successors_set))
 
         # If node has no children in any graph, skip
         if not child_sets:
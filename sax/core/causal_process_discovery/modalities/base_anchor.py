@@ -2,11 +2,14 @@
 # Copyright contributors to the SAX4BPM project
 # -----------------------------------------------------------------------------
 from abc import abstractmethod
-from typing import Optional
+from typing import Optional, Tuple
+
+import pandas as pd
 
 from ...causal_process_discovery.algorithms.base_causal_alg import CausalResultInfo
 from ...causal_process_discovery.causal_constants import DEFAULT_VARIANT, Algorithm
 from ...process_data.raw_event_data import RawEventData
+from ...utils.constants import Constants
 
 
 class BaseAnchor:
@@ -15,7 +18,8 @@ class BaseAnchor:
     """    
  
     @abstractmethod
-    def apply(self, dataObject: RawEventData,variant: Optional[Algorithm] = DEFAULT_VARIANT,prior_knowledge: Optional[bool]=False, threshold: Optional[float]=0.5) -> CausalResultInfo:
+    def apply(self, dataObject: RawEventData,variant: Optional[Algorithm] = DEFAULT_VARIANT,prior_knowledge: Optional[bool]=False, threshold: Optional[float]=0.5, intervals: Optional[pd.DataFrame]=None,
+              bootstrap: Optional[int]=None, n_jobs: Optional[int]=None, time_budget: Optional[float]=None) -> CausalResultInfo:
         """
         Apply the chosen algorithm variant with the current modality on the process data object.
 
@@ -23,8 +27,44 @@ class BaseAnchor:
         :type dataObject: RawEventData
         :param variant: the chosen algorithm variant to apply, defaults to LINGAM
         :type variant: Optional[Algorithm], optional
+        :param intervals: activity interval table (see :meth:`RawEventData.getActivityIntervals`), if provided the service times of the activities are analyzed instead of their completion times, defaults to None
+        :type intervals: Optional[pd.DataFrame], optional
+        :param bootstrap: if provided, the maximal number of bootstrap resamples used to estimate the probabilities of the discovered edges (see :meth:`BaseCausalAlgorithm.run_bootstrap`), defaults to None
+        :type bootstrap: Optional[int], optional
+        :param n_jobs: number of processes fitting the bootstrap resamples, defaults to None
+        :type n_jobs: Optional[int], optional
+        :param time_budget: time budget of the discovery in seconds, once it runs out the partial result found so far is returned, flagged as partial, defaults to None
+        :type time_budget: Optional[float], optional
         :return: causal discovery result
         :rtype: CausalResultInfo
         """    
         return NotImplementedError
-        
\ No newline at end of file
+
+    def _service_times(self, dataObject: RawEventData, intervals: pd.DataFrame) -> Tuple[pd.DataFrame, pd.DataFrame]:
+        """
+        Build the service time table of the event log cases from the activity interval table: a row per case holding the duration in seconds of each activity
+        (the last instance of repeated activities, as for completion times). Cases missing the interval of any of the activities are left out. Since the
+        precedence of the activities cannot be read from their durations, the completion times of the same activity instances are returned alongside, to be
+        used for assessing prior knowledge.
+
+        :param dataObject: event log
+        :type dataObject: RawEventData
+        :param intervals: activity interval table
+        :type intervals: pd.DataFrame
+        :return: service times and completion times (in seconds from the earliest completion) indexed by case id, with a column per activity
+        :rtype: Tuple[pd.DataFrame, pd.DataFrame]
+        """
+        data = dataObject.getData()
+        cases = data[dataObject.getCaseIdColumnName()].unique()
+        activities = data[dataObject.getMandatoryProperties()[Constants.ACTIVITY_KEY]].unique()
+        selected = intervals[intervals[Constants.CASE_ID_KEY].isin(cases) & intervals[Constants.ACTIVITY_KEY].isin(activities)]
+        selected = selected.sort_values(Constants.TIMESTAMP_KEY, kind="stable").assign(
+            completion=(selected[Constants.TIMESTAMP_KEY] - selected[Constants.TIMESTAMP_KEY].min()).dt.total_seconds())
+        tables = []
+        for values in (Constants.DURATION_KEY, "completion"):
+            table = selected.pivot_table(index=Constants.CASE_ID_KEY, columns=Constants.ACTIVITY_KEY, values=values, aggfunc="last")
+            table.columns.name = None
+            tables.append(table)
+        service_times, completion_times = tables
+        complete_cases = service_times.notna().all(axis=1)
+        return service_times[complete_cases], completion_times[complete_cases]
@@ -1,16 +1,19 @@
 # -----------------------------------------------------------------------------
 # Copyright contributors to the SAX4BPM project
 # -----------------------------------------------------------------------------
-from typing import Optional
+from typing import List, Optional
 
+import numpy as np
 import pandas as pd
 
 from sax.core.utils.constants import Constants
+from sax.core.utils.timestamps import to_nanoseconds
 from sax.core.causal_process_discovery.algorithms.positive_lingam import PositiveLingamImpl
 from ...causal_process_discovery.algorithms.positive_lingam_impl.positive_direct_lingam import PositiveDirectLiNGAM
 from .base_anchor import BaseAnchor
 from ...causal_process_discovery.algorithms.base_causal_alg import CausalResultInfo
 from ...causal_process_discovery.algorithms.lingam import LingamImpl
+from ...causal_process_discovery.algorithms.sufficient_statistics import SufficientStatistics
 from ...causal_process_discovery.causal_constants import DEFAULT_VARIANT, Algorithm
 from ...causal_process_discovery.prior_knowledge import PriorKnowledge
 from ...process_data.raw_event_data import RawEventData
@@ -23,7 +26,8 @@ class ChainAnchorTransformer(BaseAnchor):
     The chain modality is described here <>
     '''    
 
-    def apply(self, dataObject: RawEventData,variant: Optional[Algorithm] = DEFAULT_VARIANT,prior_knowledge: Optional[bool]=False, threshold: Optional[float]=0.5) -> CausalResultInfo:
+    def apply(self, dataObject: RawEventData,variant: Optional[Algorithm] = DEFAULT_VARIANT,prior_knowledge: Optional[bool]=False, threshold: Optional[float]=0.5, intervals: Optional[pd.DataFrame]=None,
+              bootstrap: Optional[int]=None, n_jobs: Optional[int]=None, time_budget: Optional[float]=None) -> CausalResultInfo:
         """
         Transform raw event log in tabular form (the provided event log) to row format, so that each trace is represented by a row and each activity column value holds the accimulated duration
         from trace start time. After the transformation, applies the chosen causal discovery algorithm variant to discover causal execution dependencies
@@ -35,12 +39,66 @@ class ChainAnchorTransformer(BaseAnchor):
         :type variant: Optional[Algorithm], optional
         :param prior_knowledge: whether to apply prior knowledge, defaults to False
         :type prior_knowledge: Optional[bool], optional
+        :param intervals: activity interval table (see :meth:`RawEventData.getActivityIntervals`), if provided each activity column holds the service time of the activity instead of its accumulated duration, defaults to None
+        :type intervals: Optional[pd.DataFrame], optional
+        :param bootstrap: if provided, the maximal number of bootstrap resamples used to estimate the probabilities of the discovered edges, defaults to None
+        :type bootstrap: Optional[int], optional
+        :param n_jobs: number of processes fitting the bootstrap resamples, defaults to None
+        :type n_jobs: Optional[int], optional
+        :param time_budget: time budget of the causal ordering search in seconds, once it runs out the result is estimated from the partial causal order found so far and flagged as partial, defaults to None
+        :type time_budget: Optional[float], optional
         :raises TypeError: _description_
         :return: _description_
         :rtype: CausalResultInfo
         """
         if type(dataObject) not in [RawEventData]: raise TypeError("the method can be applied only to an object of type RawEventData!")
         
+        if intervals is not None:
+            service_times, completion_times = self._service_times(dataObject, intervals)
+            return self._run_algorithm(service_times.reset_index(drop=True), variant, prior_knowledge, threshold, completion_times.reset_index(drop=True), bootstrap, n_jobs, time_budget)
+
+        time_difference_df = self.chain_durations(dataObject)
+        return self._run_algorithm(time_difference_df, variant, prior_knowledge, threshold, bootstrap=bootstrap, n_jobs=n_jobs, time_budget=time_budget)
+
+    def apply_statistics(self, statistics: SufficientStatistics, variant: Optional[Algorithm] = DEFAULT_VARIANT, prior_knowledge: Optional[bool]=False,
+                         threshold: Optional[float]=0.5, time_budget: Optional[float]=None) -> CausalResultInfo:
+        """
+        Apply the chosen causal discovery algorithm variant to the sufficient statistics of the chained durations of the traces (see
+        :meth:`chain_durations`) instead of the durations themselves, so that statistics accumulated over appended traces are analyzed without the traces.
+        Prior knowledge is assessed on the accumulated precedence counts of the activities.
+
+        :param statistics: sufficient statistics of the chained durations
+        :type statistics: SufficientStatistics
+        :param variant: algorithm variant to apply, only POSITIVE_LINGAM can be fitted to sufficient statistics, defaults to POSITIVE_LINGAM
+        :type variant: Optional[Algorithm], optional
+        :param prior_knowledge: whether to apply prior knowledge, defaults to False
+        :type prior_knowledge: Optional[bool], optional
+        :param threshold: precedence threshold of the prior knowledge, defaults to 0.5
+        :type threshold: Optional[float], optional
+        :param time_budget: time budget of the causal ordering search in seconds, once it runs out the result is estimated from the partial causal order found so far and flagged as partial, defaults to None
+        :type time_budget: Optional[float], optional
+        :raises ValueError: if the algorithm variant cannot be fitted to sufficient statistics
+        :return: causal discovery result
+        :rtype: CausalResultInfo
+        """
+        if variant != Algorithm.POSITIVE_LINGAM:
+            raise ValueError(f"Algorithm {variant} cannot be applied to sufficient statistics, use {Algorithm.POSITIVE_LINGAM}")
+        sample = statistics.getSample()
+        args = {"data": sample, "time_budget": time_budget}
+        if prior_knowledge:
+            args["prior_knowledge"] = PriorKnowledge(sample, threshold=threshold, fractions=statistics.getPrecedenceFractions())
+        return PositiveLingamImpl(**args).run_statistics(statistics)
+
+    def chain_durations(self, dataObject: RawEventData) -> pd.DataFrame:
+        """
+        Transform the event log to the chained durations of its traces: a row per trace and a column per activity, holding the time in seconds from the
+        anchor of the trace to the activity (see :meth:`_time_differences`)
+
+        :param dataObject: event log
+        :type dataObject: RawEventData
+        :return: chained durations of the traces
+        :rtype: pd.DataFrame
+        """
         dataObject = dataObject.transposeToTabular()      
         
           
@@ -49,30 +107,51 @@ class ChainAnchorTransformer(BaseAnchor):
         start_time_column_name = dataObject.getMandatoryProperties()[Constants.STARTTIME_COLUMN] 
         caseIdColumnName = dataObject.getCaseIdColumnName()              
 
-        # Drop the 'Id' column to create activities_df       
-        activities_df = df.drop(caseIdColumnName, axis=1).copy()          
-        activities_df = activities_df.apply(pd.to_datetime, utc=True)     
-        start_times = activities_df[start_time_column_name].copy()     
-        activities_df= activities_df.drop(start_time_column_name,axis=1)
-
-        first_activity_time = start_times.dt.to_period('Y').dt.to_timestamp()#.tz_localize(None)#.dt.floor(freq = 'MS')  
-        first_activity_time = pd.to_datetime(first_activity_time, utc=True)                 
-
-        # Create a new DataFrame for storing time differences
-        time_difference_df = activities_df.copy()
-        for col in activities_df.columns:
-             time_difference_df[col] = (activities_df[col] - first_activity_time).dt.total_seconds()
-                     
-        #time_difference_df = time_difference_df.sub(time_difference_df.min(axis=1), axis=0)
+        activity_columns = [column for column in df.columns if column not in (caseIdColumnName, start_time_column_name)]
+        time_difference = self._time_differences(df, start_time_column_name, activity_columns)
+        #the matrix is handed to the algorithm as is, the data frame only names its columns
+        return pd.DataFrame(time_difference, columns=activity_columns, copy=False)
+
+    def _time_differences(self, df: pd.DataFrame, start_time_column_name: str, activity_columns: List[str]) -> np.ndarray:
+        """
+        Build the chained durations of the traces: the time in seconds from the anchor of each trace (the start of the year of the trace start time) to
+        each of its activities. The timestamps are taken as int64 nanoseconds since the epoch, the anchors are floored at once through datetime64[Y], and
+        the anchor vector is subtracted from the whole matrix in a single operation.
+
+        :param df: transposed event log, with a row per trace and a timestamp column per activity
+        :type df: pd.DataFrame
+        :param start_time_column_name: name of the trace start time column
+        :type start_time_column_name: str
+        :param activity_columns: names of the activity columns
+        :type activity_columns: List[str]
+        :return: float64 matrix of seconds with a row per trace and a column per activity, NaN where the trace does not hold the activity
+        :rtype: np.ndarray
+        """
+        times = np.column_stack([to_nanoseconds(df[column]) for column in activity_columns]) if activity_columns else np.empty((len(df), 0), dtype=np.int64)
+        start_times = to_nanoseconds(df[start_time_column_name])
+        anchors = start_times.view("datetime64[ns]").astype("datetime64[Y]").astype("datetime64[ns]").view(np.int64)
+        time_difference = (times - anchors[:, None]) / 1e9
+        time_difference[(times == _NAT) | (start_times == _NAT)[:, None]] = np.nan
+        return time_difference
+
+    def _run_algorithm(self, time_difference_df: pd.DataFrame, variant: Algorithm, prior_knowledge: bool, threshold: float, precedence_df: Optional[pd.DataFrame] = None,
+                       bootstrap: Optional[int] = None, n_jobs: Optional[int] = None, time_budget: Optional[float] = None) -> CausalResultInfo:
         #create and run the algorithm        
-        args = {"data": time_difference_df}
+        args = {"data": time_difference_df, "time_budget": time_budget}
         if prior_knowledge:
-            args["prior_knowledge"] = PriorKnowledge(time_difference_df, threshold=threshold)
+            #prior knowledge is assessed on the order of the activities - when analyzing service times, on their completion times
+            args["prior_knowledge"] = PriorKnowledge(time_difference_df if precedence_df is None else precedence_df, threshold=threshold)
         
         if variant == Algorithm.LINGAM:
             algorithm = LingamImpl(**args)
         elif variant == Algorithm.POSITIVE_LINGAM:
             algorithm = PositiveLingamImpl(**args)
-        result  = algorithm.run()       
+        if bootstrap is None:
+            result  = algorithm.run()       
+        else:
+            result = algorithm.run_bootstrap(bootstrap, n_jobs=n_jobs)
+
+        return result
+
 
-        return result  
\ No newline at end of file
+_NAT = np.datetime64("NaT").view(np.int64)
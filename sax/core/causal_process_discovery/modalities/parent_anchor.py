@@ -1,7 +1,12 @@
 # -----------------------------------------------------------------------------
 # Copyright contributors to the SAX4BPM project
 # -----------------------------------------------------------------------------
-from typing import Optional
+import hashlib
+import logging
+import time
+from collections import OrderedDict
+from threading import Lock
+from typing import List, Optional, Tuple, Union
 
 import numpy as np
 import pandas as pd
@@ -14,6 +19,13 @@ from ...causal_process_discovery.causal_constants import DEFAULT_VARIANT, Algori
 from ...causal_process_discovery.modalities.base_anchor import BaseAnchor
 from ...causal_process_discovery.prior_knowledge import PriorKnowledge
 from ...process_data.raw_event_data import RawEventData
+from ...utils.parallel import parallel_map
+
+logger = logging.getLogger(__name__)
+
+_PAIR_CACHE_SIZE = 4096
+_pair_cache: "OrderedDict[tuple, tuple]" = OrderedDict()
+_pair_cache_lock = Lock()
 
 
 class ParentAnchorTransformer(BaseAnchor):
@@ -21,8 +33,15 @@ class ParentAnchorTransformer(BaseAnchor):
     Parent Causal Modality - methods to apply causal discovery on event log with PARENT modality
     '''    
 
+    def __init__(self, batch_size: Union[int, str] = "auto"):
+        """
+        :param batch_size: number of pair fits dispatched at once to each worker when the pairs are fitted in parallel, "auto" to adapt it to the duration of the fits, defaults to "auto"
+        :type batch_size: Union[int, str], optional
+        """
+        self.batch_size = batch_size
     
-    def apply(self, dataObject: RawEventData,variant: Optional[Algorithm] = DEFAULT_VARIANT,prior_knowledge: Optional[bool]=False, depth: int=1,threshold: Optional[float]=0.5) -> CausalResultInfo:
+    def apply(self, dataObject: RawEventData,variant: Optional[Algorithm] = DEFAULT_VARIANT,prior_knowledge: Optional[bool]=False, depth: int=1,threshold: Optional[float]=0.5, intervals: Optional[pd.DataFrame]=None,
+              bootstrap: Optional[int]=None, n_jobs: Optional[int]=None, time_budget: Optional[float]=None) -> CausalResultInfo:
         # Assisted by WCA for GP
         # Latest GenAI contribution: granite-20B-code-instruct-v2 model
         """
@@ -41,6 +60,18 @@ class ParentAnchorTransformer(BaseAnchor):
             whether to apply prior knowledge, defaults to False
         depth : int, optional
             depth of the distance between activities to consider as pair, defaults to 1
+        intervals : Optional[pd.DataFrame], optional
+            activity interval table (see RawEventData.getActivityIntervals), if provided the service times of the pair of activities and of their parent
+            activity are analyzed instead of the time differences from the parent activity, defaults to None
+        bootstrap : Optional[int], optional
+            if provided, the maximal number of bootstrap resamples of each pair of activities, used to estimate the probability of the edge between them,
+            defaults to None
+        n_jobs : Optional[int], optional
+            number of processes fitting the pairs of activities in parallel (the bootstrap resamples of each pair are then fitted sequentially within its
+            process), None to fit them sequentially, -1 to use all the CPUs, defaults to None
+        time_budget : Optional[float], optional
+            time budget in seconds, once it runs out no more pairs of activities are fitted, and the result holding the coefficients of the pairs
+            fitted so far is flagged as partial, defaults to None
 
         Raises
         ------
@@ -55,20 +86,39 @@ class ParentAnchorTransformer(BaseAnchor):
 
         if type(dataObject) not in [RawEventData]: raise TypeError("the method can be applied only to an object of type RawEventData!")
        
-        transposed = dataObject.transposeToTabular()    
-        #change the id field name
-        transposed_df = transposed.getData()
-        caseColumnName = transposed.getMandatoryProperties()[Constants.CASE_ID_KEY]
-        #rename the current column name to constant
-        transposed_df.rename(columns={caseColumnName: Constants.CASE_ID_KEY}, inplace=True)
+        completion_df = None
+        if intervals is not None:
+            #service times of the activities, indexed by case id, along with their completion times for assessing prior knowledge
+            transposed_df, completion_df = self._service_times(dataObject, intervals)
+            transposed_df.index.name = None
+            transposed_df.insert(0, Constants.CASE_ID_KEY, transposed_df.index)
+            transposed = dataObject
+        else:
+            transposed = dataObject.transposeToTabular()    
+            #change the id field name
+            transposed_df = transposed.getData()
+            caseColumnName = transposed.getMandatoryProperties()[Constants.CASE_ID_KEY]
+            #rename the current column name to constant
+            transposed_df.rename(columns={caseColumnName: Constants.CASE_ID_KEY}, inplace=True)
 
         #variants = dataObject.getVariants()
         # apply the name of the variant to each caseid
         variants_keys = dataObject.getVariantsKeys()
         transposed_df = self._join_keys(transposed_df,variants_keys)
+        # the times of the activities of all the traces as a single float matrix, along with the variant code of each trace
+        codes = transposed_df['variant'].to_numpy()
+        time_columns = [column for column in transposed_df.columns if column not in (Constants.CASE_ID_KEY, 'variant')]
+        column_index = {column: index for index, column in enumerate(time_columns)}
+        if completion_df is None:
+            seconds = self._to_seconds(transposed_df[time_columns])
+            completion = None
+        else:
+            seconds = transposed_df[time_columns].to_numpy(dtype=np.float64)
+            completion = completion_df.loc[transposed_df.index, time_columns].to_numpy(dtype=np.float64)
         # iterate over the variants. va
-        # For the first variant create the first global adjacency matrix
+        # collect the datasets of all the distinct pairs, and fit them at once
         tuples_map={}
+        tasks = []
         start_time_column_name = transposed.getMandatoryProperties()[Constants.STARTTIME_COLUMN]
         for key, value in variants_keys.items():
             
@@ -88,57 +138,56 @@ class ParentAnchorTransformer(BaseAnchor):
                 if first_activity == second_activity:
                     #handle rework
                     continue                
-                coefficient = self._apply_lingam(transposed_df,start_time_column_name,variant,first_activity, second_activity,prior_knowledge,threshold)
-                tuples_map[child_tuple] = coefficient
+                if first_activity not in column_index or second_activity not in column_index:
+                    #no service times for this pair
+                    continue
+                tuples_map[child_tuple] = 0
+                dataset = self._pair_dataset(seconds,column_index,codes,start_time_column_name,first_activity,second_activity,completion)
+                if dataset is not None:
+                    tasks.append((child_tuple, dataset))
+
+        edge_stats = {} if bootstrap is not None else None
+        fitted, partial = self._fit_pairs(tasks, (variant, prior_knowledge, threshold, bootstrap), n_jobs, time_budget)
+        for child_tuple, (coefficient, stats) in fitted.items():
+            tuples_map[child_tuple] = coefficient
+            if edge_stats is not None and stats is not None:
+                edge_stats[child_tuple] = stats
         global_adj_matrix,list_columns= self._build_global_adj_matrix(tuples_map)
         #return result object built from global matrix
-        return CausalResultInfo(global_adj_matrix,list_columns)
+        result = CausalResultInfo(global_adj_matrix,list_columns,partial=partial)
+        if edge_stats is not None:
+            result.edgeProbabilities = {edge: probability for edge, (probability, _, _) in edge_stats.items() if probability > 0}
+            result.coefficientIntervals = {edge: interval for edge, (probability, interval, _) in edge_stats.items() if probability > 0}
+            result.bootstrapSamples = min((samples for _, _, samples in edge_stats.values()), default=0)
+        return result
     
-    def _get_variant(self,row,variant_map):
-        # Assisted by WCA for GP
-        # Latest GenAI contribution: granite-20B-code-instruct-v2 model
-        """
-        Get the process variant the given trace belongs to
-
-        Parameters
-        ----------
-        row : pd.Series
-            Row of the transposed data frame
-        variant_map : dict
-            Dictionary containing the variants and the caseIDs of the traces belonging to this variant
-
-        Returns
-        -------
-        str
-            Variant of the case
-        """
-
-        for variant, case_ids in variant_map.items():
-            if row[Constants.CASE_ID_KEY] in case_ids:
-                return variant
-        return None
-
     def _join_keys(self,transposed_df,variants_keys)-> pd.DataFrame:    
-        # Assisted by WCA for GP
-        # Latest GenAI contribution: granite-20B-code-instruct-v2 model
         """
-        For each trace in the dataframe compute which variant it belongs to and assign the name of the variant of each trace in the 'variant' column
+        For each trace in the dataframe compute which variant it belongs to and assign the integer code of the variant of each trace in the 'variant' column.
+        The variants are coded by their position in the variants dictionary, and the activities of each variant are kept in ``self._variant_activities``.
+
+        An inverted index from case id to variant code is built once from the variants dictionary, and the codes of all the traces are looked up at once.
+        Traces which belong to none of the variants are assigned the code -1.
 
         Parameters
         ----------
         transposed_df : pd.DataFrame
             Transposed data frame
         variants_keys : dict
-            Dictionary containing the variants and their respective keys
+            Dictionary containing the variants and the caseIDs of the traces belonging to each variant
 
         Returns
         -------
         pd.DataFrame
-            Data frame with variant names for each trace
+            Data frame with variant codes for each trace
         """
-   
-        # Apply the _get_variant method to each row in transposed_df        
-        transposed_df['variant'] = transposed_df.apply(lambda row: self._get_variant(row, variants_keys), axis=1)      
+        self._variant_activities = [key.rstrip(",").split(",") for key in variants_keys]
+        case_ids = [case_id for case_ids in variants_keys.values() for case_id in case_ids]
+        codes = np.repeat(np.arange(len(variants_keys)), [len(case_ids) for case_ids in variants_keys.values()])
+        # unknown cases are looked up at position -1, the trailing -1 code
+        codes = np.append(codes, -1)
+        positions = pd.Index(case_ids).get_indexer(transposed_df[Constants.CASE_ID_KEY])
+        transposed_df['variant'] = codes[positions]
         return transposed_df
     
 
@@ -178,39 +227,79 @@ class ParentAnchorTransformer(BaseAnchor):
                 j+=1
         return result
     
-    def _calculate_df(self, transposed_df, first_activity, second_activity, parent_activity):     
-        # Assisted by WCA for GP
-        # Latest GenAI contribution: granite-20B-code-instruct-v2 model
+    def _to_seconds(self, times_df):
         """
-        Given the dataframe, build a sub-dataframe composed only of the given three columns, and then calculate the time difference between the parent activity and each of the two activities 
-        for each trace.
+        Convert the timestamps of the transposed dataframe into a float matrix of seconds elapsed since the earliest timestamp, parsing each column once.
 
         Parameters
         ----------
-        transposed_df : pandas.DataFrame
-            Transposed dataframe containing the events
-        first_activity : str
-            First activity in the tuple
-        second_activity : str
-            Second activity in the tuple
-        parent_activity : str
-            Parent activity in the tuple
+        times_df : pandas.DataFrame
+            Timestamps of the activities of each trace
+
+        Returns
+        -------
+        np.ndarray
+            Matrix of seconds with a row per trace and a column per activity, NaN where the trace does not hold the activity
+        """
+        times_df = times_df.apply(pd.to_datetime, utc=True)
+        origin = times_df.min().min()
+        return np.column_stack([(times_df[column] - origin).dt.total_seconds().to_numpy(dtype=np.float64) for column in times_df.columns])
+
+    def _calculate_service_df(self, values, rows, parent_index, first_index, second_index):
+        """
+        Given the service times matrix, build the sub-matrix composed of the service times of the parent activity and of the two activities for the given
+        traces. When the parent is the start of the case, which has no service time, the parent column is left empty.
+
+        Parameters
+        ----------
+        values : np.ndarray
+            Service times (or completion times) of the activities of each trace
+        rows : np.ndarray
+            Indices of the traces
+        parent_index : Optional[int]
+            Column of the parent activity, None if it has no column
+        first_index : int
+            Column of the first activity in the tuple
+        second_index : int
+            Column of the second activity in the tuple
 
         Returns
         -------
-        pandas.DataFrame
-            Dataframe containing the time differences
+        np.ndarray
+            Matrix holding the parent, first and second activity columns
         """
-   
-        subset_df = transposed_df[[parent_activity, first_activity, second_activity]]
-        subset_df_clean = subset_df.apply(pd.to_datetime, utc=True) 
-        first_activity_time = subset_df_clean.min(axis=1)      
-   
-        # Create a new DataFrame for storing time differences
-        time_difference_df = subset_df_clean.copy()
-        for col in subset_df_clean.columns:
-            time_difference_df[col] = (subset_df_clean[col] - first_activity_time).dt.total_seconds()*1000
-        return time_difference_df
+        block = np.full((len(rows), 3), np.nan)
+        if parent_index is not None:
+            block[:, 0] = values[rows, parent_index]
+        block[:, 1] = values[rows, first_index]
+        block[:, 2] = values[rows, second_index]
+        return block
+
+    def _calculate_df(self, seconds, rows, parent_index, first_index, second_index):
+        """
+        Given the seconds matrix, build the sub-matrix composed only of the given three columns for the given traces, and then calculate the time difference
+        (in milliseconds) between the earliest of the three activities and each of them for each trace.
+
+        Parameters
+        ----------
+        seconds : np.ndarray
+            Times of the activities of each trace in seconds
+        rows : np.ndarray
+            Indices of the traces
+        parent_index : int
+            Column of the parent activity
+        first_index : int
+            Column of the first activity in the tuple
+        second_index : int
+            Column of the second activity in the tuple
+
+        Returns
+        -------
+        np.ndarray
+            Matrix containing the time differences
+        """
+        block = seconds[np.ix_(rows, [parent_index, first_index, second_index])]
+        return (block - np.nanmin(block, axis=1, keepdims=True)) * 1000
 
     def _get_parent_string(self, start_time_column, string_list, first_activity,second_activity):
         # Assisted by WCA for GP
@@ -245,72 +334,120 @@ class ParentAnchorTransformer(BaseAnchor):
                 else: return start_time_column
         return None  # Return None if the tuple is not found
 
-    def _apply_lingam(self,transposed_df,start_time_column_name, alg_variant, first_activity,second_activity,prior_knowledge, threshold: Optional[float]=0.5):  
+    def _pair_dataset(self,seconds,column_index,codes,start_time_column_name,first_activity,second_activity,completion: Optional[np.ndarray]=None):
         # Assisted by WCA for GP
         # Latest GenAI contribution: granite-20B-code-instruct-v2 model
         """
-        Apply Lingam algorithm on the given sub-data frame specified by the first activity and second activity column names. The time difference is calculated on 
-        per variant basis (for all variants which have those activities) vrs parent activity in this variant. After time diff calculations, the chosen causal discovery algorithm
-        is applied on this dataframe to produce adjacency matrix
+        Build the sub-data frame specified by the first activity and second activity columns, on which the causal discovery algorithm is applied. The time
+        difference is calculated on per variant basis (for all variants which have those activities) vrs parent activity in this variant. The sub-data frame
+        of every variant is sliced from the seconds matrix by fancy indexing, and the slices of all the variants are stacked once.
 
         Parameters
         ----------
-        transposed_df : pd.DataFrame
-            data frame containing the event log data
+        seconds : np.ndarray
+            times of the activities of each trace in seconds (or their service times), with a row per trace
+        column_index : dict
+            column of each activity (and of the start time) in the seconds matrix
+        codes : np.ndarray
+            variant code of each trace
         start_time_column_name : str
             name of the start time column - the column holding start time of each process case
-        alg_variant : Algorithm
-            algorithm variant to apply
         first_activity : str
             name of the first activity
         second_activity : str
             name of the second activity
-        prior_knowledge : bool
-            whether to apply prior knowledge
+        completion : Optional[np.ndarray], optional
+            completion times of the activities of each trace, provided when the seconds matrix holds service times, defaults to None
 
         Returns
         -------
-        float
-            coefficient of the causal relationship between the two activities
+        Optional[Tuple[pd.DataFrame, pd.DataFrame, tuple]]
+            the sub-data frame, the sub-data frame to assess prior knowledge on (the completion times when analyzing service times), and the codes of the
+            contributing variants; None if no variant holds the pair
         """
-        
-        # retrieve a sub df with all variants where those activities are not NaN
-        subset_df_clean = transposed_df.dropna(subset=[first_activity, second_activity])
-        # retrive a list of variants for those cases
-        result_list = subset_df_clean['variant'].unique()
-        result_df = pd.DataFrame()
-        # iterate over the variants
-        for variant in result_list:
+        first_index, second_index = column_index[first_activity], column_index[second_activity]
+        # retrieve the traces of all variants where those activities are not NaN
+        rows = np.flatnonzero(~np.isnan(seconds[:, first_index]) & ~np.isnan(seconds[:, second_index]) & (codes >= 0))
+        blocks = []
+        precedence_blocks = []
+        variants = []
+        # iterate over the variants of those traces
+        for variant in pd.unique(codes[rows]):
         # for each variants retrieve the name of parent activity (the activity preceeding the first activity or the second activity if the order is opposite) 
-            activity_list = variant.rstrip(",").split(",")
+            activity_list = self._variant_activities[variant]
             parent_activity = self._get_parent_string(start_time_column_name,activity_list,first_activity,second_activity)
             if parent_activity is None: continue         
-            #take the variant sub df from the overall transposed df
-            subset_variant_df = subset_df_clean[subset_df_clean['variant'] == variant]   
-            # calculate sub df given the parent activity and the two activities columns                      
-            new_df = self._calculate_df(subset_variant_df,first_activity,second_activity,parent_activity)
-            new_column_names = ['Parent', first_activity, second_activity]
-            new_df.columns = new_column_names
-            # combine all dfs and apply lingam
-            result_df = pd.concat([result_df, new_df], ignore_index=True)        
-        # retrieve coefficient for our main columns
-        num_rows = result_df.shape[0]
-        #Given the two columns of time difference, apply Lingam    
-        args = {"data": result_df}
-        if prior_knowledge:
-            args["prior_knowledge"] = PriorKnowledge(result_df, threshold=threshold)
-        if num_rows > 0: 
-            if alg_variant == Algorithm.LINGAM:
-                algorithm = LingamImpl(**args)
-            elif variant == Algorithm.POSITIVE_LINGAM:
-                algorithm = PositiveLingamImpl(**args)
-            try:
-                result  = algorithm.run()     
-                adjacency_matrix = result.getAdjacencyMatrix()
-                return adjacency_matrix[2,1]             
-            except Exception as e:
-                print(e)                                
-        return 0
+            variant_rows = rows[codes[rows] == variant]
+            variants.append(",".join(activity_list))
+            # calculate sub matrix given the parent activity and the two activities columns                      
+            if completion is None:
+                blocks.append(self._calculate_df(seconds,variant_rows,column_index[parent_activity],first_index,second_index))
+            else:
+                parent_index = column_index.get(parent_activity)
+                blocks.append(self._calculate_service_df(seconds,variant_rows,parent_index,first_index,second_index))
+                precedence_blocks.append(self._calculate_service_df(completion,variant_rows,parent_index,first_index,second_index))
+        if not blocks:
+            return None
+        # combine all variants
+        new_column_names = ['Parent', first_activity, second_activity]
+        result_df = pd.DataFrame(np.concatenate(blocks), columns=new_column_names)
+        precedence_result_df = result_df
+        if completion is not None:
+            precedence_result_df = pd.DataFrame(np.concatenate(precedence_blocks), columns=new_column_names)
+            if result_df['Parent'].isna().any():
+                #some of the variants start with the pair - the pair is analyzed without the parent service time
+                result_df = result_df.drop(columns='Parent')
+                precedence_result_df = precedence_result_df.drop(columns='Parent')
+        return result_df, precedence_result_df, tuple(variants)
+
+    def _fit_pairs(self, tasks: List[Tuple[tuple, tuple]], parameters: tuple, n_jobs: Optional[int]=None, time_budget: Optional[float]=None) -> Tuple[dict, bool]:
+        """
+        Fit the causal discovery algorithm on the datasets of the pairs of activities. Pairs fitted before on the same data, contributing variants and
+        parameters (e.g. by a run with a different depth) are served from a process-wide cache, and the others are fitted over a pool of ``n_jobs``
+        processes, dispatched in batches of ``self.batch_size`` pairs. With a time budget, the pairs are submitted in rounds until the budget runs out.
+
+        Parameters
+        ----------
+        tasks : List[Tuple[tuple, tuple]]
+            the pairs of activities along with their datasets, as built by ``_pair_dataset``
+        parameters : tuple
+            algorithm variant, prior knowledge flag, prior knowledge threshold and number of bootstrap resamples
+        n_jobs : Optional[int], optional
+            number of processes, None to fit the pairs sequentially, defaults to None
+        time_budget : Optional[float], optional
+            time budget in seconds, defaults to None
+
+        Returns
+        -------
+        Tuple[dict, bool]
+            the coefficient and bootstrap statistics of each fitted pair, and whether some pairs were left unfitted
+        """
+        deadline = None if time_budget is None else time.monotonic() + time_budget
+        fitted = {}
+        pending = []
+        for pair, (data, precedence, variants) in tasks:
+            key = (pair, variants, parameters, _fingerprint(data), _fingerprint(precedence))
+            with _pair_cache_lock:
+                if key in _pair_cache:
+                    _pair_cache.move_to_end(key)
+                    fitted[pair] = _pair_cache[key]
+                    continue
+            pending.append((pair, key, (data, precedence, pair) + parameters))
+
+        # without a budget all the pairs are submitted at once
+        round_size = len(pending) if deadline is None else 16
+        for start in range(0, len(pending), max(round_size, 1)):
+            if deadline is not None and time.monotonic() >= deadline:
+                return fitted, True
+            submitted = pending[start:start + round_size]
+            outcomes = parallel_map(_fit_pair, [task for _, _, task in submitted], n_jobs, prefer="processes", batch_size=self.batch_size)
+            with _pair_cache_lock:
+                for (pair, key, _), outcome in zip(submitted, outcomes):
+                    fitted[pair] = outcome
+                    _pair_cache[key] = outcome
+                while len(_pair_cache) > _PAIR_CACHE_SIZE:
+                    _pair_cache.popitem(last=False)
+        return fitted, False
          
 
  
@@ -350,4 +487,41 @@ class ParentAnchorTransformer(BaseAnchor):
             adjacency_matrix[j, i] = value  # Swap i and j
 
         return adjacency_matrix, list(unique_elements)
-        
\ No newline at end of file
+
+
+def _fingerprint(df: pd.DataFrame) -> tuple:
+    values = df.to_numpy(dtype=np.float64)
+    return (tuple(df.columns), values.shape, hashlib.sha1(np.ascontiguousarray(values).tobytes()).hexdigest())
+
+
+def _fit_pair(task: tuple) -> tuple:
+    # Assisted by WCA for GP
+    # Latest GenAI contribution: granite-20B-code-instruct-v2 model
+    """
+    Apply the chosen causal discovery algorithm on the dataset of a pair of activities, and return the coefficient of the second activity on the first one
+    along with the bootstrap probability, interval and number of resamples of this edge (None when not bootstrapping). Failures are logged and give a
+    zero coefficient.
+    """
+    result_df, precedence_result_df, (first_activity, second_activity), alg_variant, prior_knowledge, threshold, bootstrap = task
+    #Given the two columns of time difference, apply Lingam    
+    args = {"data": result_df}
+    if prior_knowledge:
+        args["prior_knowledge"] = PriorKnowledge(precedence_result_df, threshold=threshold)
+    if alg_variant == Algorithm.LINGAM:
+        algorithm = LingamImpl(**args)
+    elif alg_variant == Algorithm.POSITIVE_LINGAM:
+        algorithm = PositiveLingamImpl(**args)
+    try:
+        if bootstrap is None:
+            result  = algorithm.run()     
+            stats = None
+        else:
+            result = algorithm.run_bootstrap(bootstrap)
+            edge = (first_activity, second_activity)
+            stats = (result.getEdgeProbabilities().get(edge, 0.0), result.getCoefficientIntervals().get(edge), result.getBootstrapSamples())
+        adjacency_matrix = result.getAdjacencyMatrix()
+        #coefficient of the second activity on the first one, the last two columns
+        return adjacency_matrix[-1,-2], stats
+    except Exception:
+        logger.warning("Causal discovery failed on the pair of activities (%s, %s), its coefficient is set to 0", first_activity, second_activity, exc_info=True)
+    return 0, None
@@ -1,25 +1,32 @@
 # -----------------------------------------------------------------------------
 # Copyright contributors to the SAX4BPM project
 # -----------------------------------------------------------------------------
+from typing import Optional
+
 import graphviz
 import numpy as np
 
 from pandas import DataFrame
 
+from sax.core.utils.helper_utils import precedence_fractions
+
 
 class PriorKnowledge:
     """
     Prior knowledge representation for a particular event log. This object should be created and passed to the causal dependency discovery algorithm in case the user intends
     to run the algorithm with prior knowledge. The rules for creation of prior knowledge matrix are described here https://lingam.readthedocs.io/en/stable/tutorial/pk_direct.html
     """    
-    def __init__(self,data: DataFrame, threshold=0.5):
+    def __init__(self,data: DataFrame, threshold=0.5, fractions: Optional[np.ndarray]=None):
         '''
         This class allows adding any prior knoweledge to the causal discovery process 
+
+        If provided, ``fractions`` are the precedence fractions of the columns of the data (see :func:`sax.core.utils.helper_utils.precedence_fractions`)
+        computed beforehand, for instance from accumulated counts, and the data is only used for naming the columns
         '''
-        self.prior_knowledge = self._assesPriorKnowledge(data, threshold=threshold)
+        self.prior_knowledge = self._assesPriorKnowledge(data, threshold=threshold, fractions=fractions)
         self.data = data
 
-    def _assesPriorKnowledge(self,data: DataFrame,threshold = 0.5):      
+    def _assesPriorKnowledge(self,data: DataFrame,threshold = 0.5, fractions: Optional[np.ndarray]=None):      
         # Assisted by WCA for GP
         # Latest GenAI contribution: granite-20B-code-instruct-v2 model
         '''
@@ -29,6 +36,8 @@ class PriorKnowledge:
         ----------
         data : pandas.DataFrame
             Event log data
+        fractions : np.ndarray, optional
+            Precedence fractions of the columns of the data, computed from the data if not provided
 
         Returns
         -------
@@ -36,12 +45,12 @@ class PriorKnowledge:
             Prior knowledge matrix
         '''
         prior_knowledge = np.eye(len(data.columns)) -1
-        for ind1, column1 in enumerate(data.columns):
-            for ind2, column2 in enumerate(data.columns):
-                if column1!=column2 :
-                    residuals = data[column1] - data[column2]
-                    if ((residuals >= 0).sum()/ len(residuals))>=threshold:                        
-                        prior_knowledge[ind2][ind1] = 0
+        #fraction of traces in which each column does not precede each other column, computed in blocks and cached per frame
+        if fractions is None:
+            fractions = precedence_fractions(data)
+        columns = np.asarray(data.columns, dtype=object)
+        distinct = np.not_equal.outer(columns, columns)
+        prior_knowledge[distinct & (fractions >= threshold)] = 0
         return prior_knowledge
     
     def getPriorKnowledge(self):
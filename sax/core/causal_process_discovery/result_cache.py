@@ -0,0 +1,312 @@
+# -----------------------------------------------------------------------------
+# Copyright contributors to the SAX4BPM project
+# -----------------------------------------------------------------------------
+import copy
+import hashlib
+import os
+from importlib import metadata
+import tempfile
+from collections import OrderedDict
+from threading import Lock
+from typing import Any, Callable, Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+from sax.core.causal_process_discovery.algorithms.base_causal_alg import CausalResultInfo
+
+CACHE_DIR_ENV = "SAX_CAUSAL_CACHE_DIR"
+CACHE_SIZE_ENV = "SAX_CAUSAL_CACHE_SIZE"
+CACHE_DISK_SIZE_ENV = "SAX_CAUSAL_CACHE_DISK_SIZE"
+_FORMAT_VERSION = 1
+# bump whenever a change of the discovery algorithms changes their results, so that results cached by older versions are not served
+_ALGORITHM_VERSION = 1
+
+
+def _package_version(package: str) -> str:
+    try:
+        return metadata.version(package)
+    except metadata.PackageNotFoundError:
+        return "unknown"
+
+
+def _versions() -> tuple:
+    """
+    Versions the cached results depend on - the archive format, the discovery algorithms, this package and the lingam package
+    """
+    return (_FORMAT_VERSION, _ALGORITHM_VERSION, _package_version("sax4bpm"), _package_version("lingam"))
+
+
+def data_fingerprint(dataObject, lifecycle: bool = False) -> str:
+    """
+    Compute a content hash of an event log, to be used as part of a cache key. The hash covers the events of the log along with the names of its
+    mandatory properties, and, when ``lifecycle`` is set, the events of all the lifecycle transitions (from which the activity intervals are paired).
+
+    :param dataObject: event log
+    :type dataObject: RawEventData
+    :param lifecycle: whether to include the events of all the lifecycle transitions, defaults to False
+    :type lifecycle: bool, optional
+    :return: hex digest of the event log content
+    :rtype: str
+    """
+    digest = hashlib.sha256(repr(sorted(dataObject.getMandatoryProperties().items())).encode())
+    frames = [dataObject.getData()]
+    if lifecycle and dataObject._lifecycleData is not None:
+        frames.append(dataObject._lifecycleData)
+    for frame in frames:
+        digest.update(repr(list(frame.columns)).encode())
+        digest.update(pd.util.hash_pandas_object(frame, index=False).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+def result_key(fingerprint: str, **parameters) -> str:
+    """
+    Build the cache key of a causal discovery result from the fingerprint of the event log and the discovery parameters, along with the versions of the
+    discovery algorithms and of the packages implementing them, so that results of older versions are never served
+
+    :param fingerprint: fingerprint of the event log, see :func:`data_fingerprint`
+    :type fingerprint: str
+    :return: hex digest identifying the result
+    :rtype: str
+    """
+    description = repr((_versions(), fingerprint, sorted((name, repr(value)) for name, value in parameters.items())))
+    return hashlib.sha256(description.encode()).hexdigest()
+
+
+def _edge_arrays(edges: Optional[Dict[tuple, Any]], width: int) -> tuple:
+    items = list((edges or {}).items())
+    names = np.array([list(edge) for edge, _ in items], dtype=str).reshape(len(items), 2)
+    values = np.array([[np.nan] * width if value is None else np.ravel(value) for _, value in items], dtype=np.float64).reshape(len(items), width)
+    return names, values
+
+
+def _edge_dict(names: np.ndarray, values: np.ndarray, scalar: bool) -> dict:
+    return {(str(cause), str(effect)): (float(value[0]) if scalar else (None if np.isnan(value).all() else tuple(float(bound) for bound in value)))
+            for (cause, effect), value in zip(names, values)}
+
+
+def serialize_result(result: CausalResultInfo, file) -> None:
+    """
+    Write a causal discovery result as a compressed npz archive of plain arrays (adjacency matrix, column names, partial flag and bootstrap statistics),
+    readable without unpickling
+
+    :param result: causal discovery result
+    :type result: CausalResultInfo
+    :param file: path or binary file object to write to
+    """
+    probability_edges, probabilities = _edge_arrays(result.getEdgeProbabilities(), 1)
+    interval_edges, intervals = _edge_arrays(result.getCoefficientIntervals(), 2)
+    np.savez_compressed(file,
+                        adjacency=np.asarray(result.getAdjacencyMatrix(), dtype=np.float64),
+                        columns=np.array(result.getColumns(), dtype=str),
+                        partial=np.array(result.isPartial()),
+                        bootstrapped=np.array(result.getEdgeProbabilities() is not None),
+                        bootstrap_samples=np.array(result.getBootstrapSamples()),
+                        probability_edges=probability_edges, probabilities=probabilities,
+                        interval_edges=interval_edges, intervals=intervals)
+
+
+def deserialize_result(file) -> CausalResultInfo:
+    """
+    Read a causal discovery result written by :func:`serialize_result`
+
+    :param file: path or binary file object to read from
+    :return: causal discovery result
+    :rtype: CausalResultInfo
+    """
+    with np.load(file, allow_pickle=False) as archive:
+        bootstrapped = bool(archive["bootstrapped"])
+        return CausalResultInfo(archive["adjacency"], [str(column) for column in archive["columns"]],
+                                edgeProbabilities=_edge_dict(archive["probability_edges"], archive["probabilities"], True) if bootstrapped else None,
+                                coefficientIntervals=_edge_dict(archive["interval_edges"], archive["intervals"], False) if bootstrapped else None,
+                                bootstrapSamples=int(archive["bootstrap_samples"]), partial=bool(archive["partial"]))
+
+
+class CausalResultCache:
+    """
+    Cache of causal discovery results. Results are kept in memory, least recently used results are evicted first, and, if a directory is provided, they are
+    also persisted to it as compact npz archives (see :func:`serialize_result`), so that they survive restarts and are shared by all the processes using
+    the same directory. Archives are written to a temporary file and moved into place atomically, so concurrent readers never see a partial archive.
+    The directory holds at most ``max_disk_entries`` archives, the least recently used archives are removed first. Partial results
+    (see :meth:`CausalResultInfo.isPartial`) are not cached.
+    """
+
+    def __init__(self, max_entries: int = 128, directory: Optional[str] = None, max_disk_entries: int = 1024):
+        """
+        Create a result cache
+
+        :param max_entries: maximal number of results kept in memory, defaults to 128
+        :type max_entries: int, optional
+        :param directory: directory persisting the results, None to keep them in memory only, defaults to None
+        :type directory: Optional[str], optional
+        :param max_disk_entries: maximal number of results kept in the directory, defaults to 1024
+        :type max_disk_entries: int, optional
+        """
+        self._max_entries = max_entries
+        self._directory = directory
+        self._max_disk_entries = max_disk_entries
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+        self._cache: "OrderedDict[str, CausalResultInfo]" = OrderedDict()
+        self._lock = Lock()
+        self._metrics = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "stores": 0}
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self._directory, key + ".npz")
+
+    def _remember(self, key: str, result: CausalResultInfo):
+        with self._lock:
+            self._cache[key] = result
+            self._cache.move_to_end(key)
+            while len(self._cache) > self._max_entries:
+                self._cache.popitem(last=False)
+
+    def get(self, key: str) -> Optional[CausalResultInfo]:
+        """
+        Look up a result, first in memory and then on disk
+
+        :param key: result key, see :func:`result_key`
+        :type key: str
+        :return: a copy of the cached result, None if it is not cached
+        :rtype: Optional[CausalResultInfo]
+        """
+        with self._lock:
+            result = self._cache.get(key)
+            if result is not None:
+                self._cache.move_to_end(key)
+                self._metrics["memory_hits"] += 1
+                return copy.deepcopy(result)
+        if self._directory is not None:
+            try:
+                result = deserialize_result(self._path(key))
+            except (OSError, ValueError, KeyError):
+                # missing or unreadable archive
+                result = None
+            if result is not None:
+                self._touch(key)
+                self._remember(key, result)
+                with self._lock:
+                    self._metrics["disk_hits"] += 1
+                return copy.deepcopy(result)
+        with self._lock:
+            self._metrics["misses"] += 1
+        return None
+
+    def put(self, key: str, result: CausalResultInfo):
+        """
+        Store a result, in memory and on disk
+
+        :param key: result key, see :func:`result_key`
+        :type key: str
+        :param result: causal discovery result, partial results are not stored
+        :type result: CausalResultInfo
+        """
+        if result.isPartial():
+            return
+        result = copy.deepcopy(result)
+        self._remember(key, result)
+        if self._directory is not None:
+            handle, temporary_path = tempfile.mkstemp(dir=self._directory, suffix=".tmp")
+            try:
+                with os.fdopen(handle, "wb") as archive:
+                    serialize_result(result, archive)
+                os.replace(temporary_path, self._path(key))
+            except BaseException:
+                os.remove(temporary_path)
+                raise
+            self._evict_archives()
+        with self._lock:
+            self._metrics["stores"] += 1
+
+    def _touch(self, key: str):
+        # the modification time of an archive records its last use
+        try:
+            os.utime(self._path(key))
+        except OSError:
+            pass
+
+    def _evict_archives(self):
+        """
+        Remove the least recently used archives of the directory beyond ``max_disk_entries``. Archives removed concurrently by another process are skipped.
+        """
+        archives = []
+        for entry in os.scandir(self._directory):
+            if entry.name.endswith(".npz"):
+                try:
+                    archives.append((entry.stat().st_mtime, entry.path))
+                except OSError:
+                    continue
+        archives.sort()
+        for _, path in archives[:max(len(archives) - self._max_disk_entries, 0)]:
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+
+    def get_or_compute(self, key: str, compute: Callable[[], CausalResultInfo]) -> CausalResultInfo:
+        """
+        Return the cached result of the key, computing and storing it on a miss
+
+        :param key: result key, see :func:`result_key`
+        :type key: str
+        :param compute: function computing the result
+        :type compute: Callable[[], CausalResultInfo]
+        :return: causal discovery result
+        :rtype: CausalResultInfo
+        """
+        result = self.get(key)
+        if result is None:
+            result = compute()
+            self.put(key, result)
+        return result
+
+    def metrics(self) -> Dict[str, float]:
+        """
+        Return the hit and miss counters of this cache since it was created (or cleared)
+
+        :return: number of memory hits, disk hits, misses and stored results, along with the hit rate and the number of results kept in memory
+        :rtype: Dict[str, float]
+        """
+        with self._lock:
+            metrics = dict(self._metrics)
+            metrics["entries"] = len(self._cache)
+        lookups = metrics["memory_hits"] + metrics["disk_hits"] + metrics["misses"]
+        metrics["hit_rate"] = (metrics["memory_hits"] + metrics["disk_hits"]) / lookups if lookups else 0.0
+        return metrics
+
+    def clear(self):
+        """
+        Remove all the results from memory and from disk, and reset the counters
+        """
+        with self._lock:
+            self._cache.clear()
+            self._metrics = {name: 0 for name in self._metrics}
+            if self._directory is not None:
+                for name in os.listdir(self._directory):
+                    if name.endswith(".npz"):
+                        os.remove(os.path.join(self._directory, name))
+
+    def __len__(self):
+        return len(self._cache)
+
+
+_default_cache = None
+_default_cache_lock = Lock()
+
+
+def get_result_cache() -> CausalResultCache:
+    """
+    Get the process-wide result cache used by :func:`sax.core.causal_process_discovery.causal_discovery.discover_causal_dependencies`. It keeps up to
+    ``SAX_CAUSAL_CACHE_SIZE`` results in memory (128 by default), and persists them to the ``SAX_CAUSAL_CACHE_DIR`` directory if
+    this environment variable is set, so that processes configured with the same directory share their results. The directory keeps up to
+    ``SAX_CAUSAL_CACHE_DISK_SIZE`` results (1024 by default).
+
+    :return: the default result cache
+    :rtype: CausalResultCache
+    """
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = CausalResultCache(max_entries=int(os.getenv(CACHE_SIZE_ENV, "128")), directory=os.getenv(CACHE_DIR_ENV) or None,
+                                               max_disk_entries=int(os.getenv(CACHE_DISK_SIZE_ENV, "1024")))
+        return _default_cache
@@ -0,0 +1,324 @@
+# -----------------------------------------------------------------------------
+# Copyright contributors to the SAX4BPM project
+# -----------------------------------------------------------------------------
+from typing import Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from sax.core.utils.constants import Constants
+
+
+class EventFilter:
+    """
+    Base class for lazy event log filters. A filter does not touch the event log when it is created, it only describes a predicate.
+    The predicate is evaluated by :meth:`mask` into a boolean array over the events of the log, so that several filters can be combined
+    (with ``&``, ``|`` and ``~``) into a single mask which is applied to the dataframe once, on materialization.
+    Case-level filters (start/end activities, variants, case attributes) evaluate their predicate per case and broadcast the result to all
+    events of the case.
+    """
+
+    def mask(self, dataObject) -> np.ndarray:
+        """
+        Evaluate the filter predicate over the events of the given event log
+
+        :param dataObject: event log
+        :type dataObject: RawEventData
+        :return: boolean array with an entry per event (row) of the event log dataframe
+        :rtype: np.ndarray
+        """
+        raise NotImplementedError()
+
+    def __and__(self, other: 'EventFilter') -> 'EventFilter':
+        return _CombinedFilter(np.logical_and, [self, other])
+
+    def __or__(self, other: 'EventFilter') -> 'EventFilter':
+        return _CombinedFilter(np.logical_or, [self, other])
+
+    def __invert__(self) -> 'EventFilter':
+        return _NegatedFilter(self)
+
+
+class _CombinedFilter(EventFilter):
+    def __init__(self, operator, filters: List[EventFilter]):
+        self.operator = operator
+        self.filters = filters
+
+    def mask(self, dataObject) -> np.ndarray:
+        result = self.filters[0].mask(dataObject)
+        for event_filter in self.filters[1:]:
+            result = self.operator(result, event_filter.mask(dataObject))
+        return result
+
+
+class _NegatedFilter(EventFilter):
+    def __init__(self, event_filter: EventFilter):
+        self.event_filter = event_filter
+
+    def mask(self, dataObject) -> np.ndarray:
+        return ~self.event_filter.mask(dataObject)
+
+
+def _case_codes(dataObject):
+    """
+    Factorize the case id column of the event log into integer codes
+
+    :return: per-event case codes and the number of distinct cases
+    :rtype: Tuple[np.ndarray, int]
+    """
+    codes, uniques = pd.factorize(dataObject.getData()[dataObject.getCaseIdColumnName()])
+    return codes, len(uniques)
+
+
+def _broadcast_case_mask(codes: np.ndarray, case_mask: np.ndarray) -> np.ndarray:
+    """
+    Broadcast a per-case boolean array to all events of the cases
+    """
+    event_mask = np.zeros(len(codes), dtype=bool)
+    valid = codes >= 0
+    event_mask[valid] = case_mask[codes[valid]]
+    return event_mask
+
+
+class _BoundaryActivitiesFilter(EventFilter):
+    """
+    Retains (or drops) the cases whose first or last activity, in timestamp order, is one of the provided activities
+    """
+    _last = False
+
+    def __init__(self, activities: Iterable[str], retain: bool = True):
+        self.activities = list(activities)
+        self.retain = retain
+
+    def mask(self, dataObject) -> np.ndarray:
+        df = dataObject.getData()
+        mandatory_properties = dataObject.getMandatoryProperties()
+        codes, num_cases = _case_codes(dataObject)
+        timestamps = df[mandatory_properties[Constants.TIMESTAMP_KEY]].to_numpy()
+        matches = df[mandatory_properties[Constants.ACTIVITY_KEY]].isin(self.activities).to_numpy()
+
+        # sort the events by case and timestamp (stable), then take the first or last event of each case segment
+        order = np.lexsort((timestamps, codes))
+        sorted_codes = codes[order]
+        if self._last:
+            boundary = np.r_[sorted_codes[1:] != sorted_codes[:-1], True] if len(order) else np.zeros(0, dtype=bool)
+        else:
+            boundary = np.r_[True, sorted_codes[1:] != sorted_codes[:-1]] if len(order) else np.zeros(0, dtype=bool)
+        boundary &= sorted_codes >= 0
+        case_mask = np.zeros(num_cases, dtype=bool)
+        case_mask[sorted_codes[boundary]] = matches[order][boundary]
+        if not self.retain:
+            case_mask = ~case_mask
+        return _broadcast_case_mask(codes, case_mask)
+
+
+class StartActivitiesFilter(_BoundaryActivitiesFilter):
+    """
+    Filter cases having a start activity in the provided list
+
+    :param activities: collection of start activities
+    :type activities: Iterable[str]
+    :param retain: if True, we retain the traces containing the given start activities, if false, we drop the traces
+    :type retain: bool, optional
+    """
+    _last = False
+
+
+class EndActivitiesFilter(_BoundaryActivitiesFilter):
+    """
+    Filter cases having an end activity in the provided list
+
+    :param activities: collection of end activities
+    :type activities: Iterable[str]
+    :param retain: if True, we retain the traces containing the given end activities, if false, we drop the traces
+    :type retain: bool, optional
+    """
+    _last = True
+
+
+class VariantsFilter(EventFilter):
+    """
+    Filter cases belonging to the provided variants
+
+    :param variant_keys: list of variant names (comma-separated activities in the order of occurence), as returned by ``RawEventData.getVariants``
+    :type variant_keys: List[str]
+    :param retain: if True, we retain the traces of the given variants, if false, we drop the traces
+    :type retain: bool, optional
+    """
+
+    def __init__(self, variant_keys: List[str], retain: bool = True):
+        self.variant_keys = list(variant_keys)
+        self.retain = retain
+
+    def mask(self, dataObject) -> np.ndarray:
+        variants = dataObject.getVariantsKeys()
+        chosen_ids = set()
+        for variant_key in self.variant_keys:
+            if variant_key not in variants:
+                raise KeyError(f"Variant key '{variant_key}' not found in variants")
+            chosen_ids.update(variants[variant_key])
+        event_mask = dataObject.getData()[dataObject.getCaseIdColumnName()].isin(chosen_ids).to_numpy()
+        return event_mask if self.retain else ~event_mask
+
+
+class TimeWindowFilter(EventFilter):
+    """
+    Filter the event log on a time window. Follows the modes of the pm4py time range filter:
+
+    - ``traces_contained``: retain the cases whose events are all within the window
+    - ``traces_intersecting``: retain the cases having at least one event within the window
+    - ``events``: retain only the events within the window
+
+    :param start: start of the time window (inclusive), unbounded if None
+    :type start: Optional[pd.Timestamp]
+    :param end: end of the time window (inclusive), unbounded if None
+    :type end: Optional[pd.Timestamp]
+    :param mode: filtering mode, defaults to ``traces_contained``
+    :type mode: str, optional
+    """
+    MODES = ("traces_contained", "traces_intersecting", "events")
+
+    def __init__(self, start=None, end=None, mode: str = "traces_contained"):
+        if mode not in self.MODES:
+            raise ValueError(f"Unsupported time window mode: {mode}, use one of {self.MODES}")
+        self.start = None if start is None else pd.to_datetime(start, utc=True)
+        self.end = None if end is None else pd.to_datetime(end, utc=True)
+        self.mode = mode
+
+    def mask(self, dataObject) -> np.ndarray:
+        timestamps = pd.to_datetime(dataObject.getData()[dataObject.getMandatoryProperties()[Constants.TIMESTAMP_KEY]], utc=True)
+        in_window = np.ones(len(timestamps), dtype=bool)
+        if self.start is not None:
+            in_window &= (timestamps >= self.start).to_numpy()
+        if self.end is not None:
+            in_window &= (timestamps <= self.end).to_numpy()
+        if self.mode == "events":
+            return in_window
+
+        codes, num_cases = _case_codes(dataObject)
+        valid = codes >= 0
+        # number of events of each case falling within the window against the total number of events of the case
+        inside = np.bincount(codes[valid], weights=in_window[valid], minlength=num_cases)
+        if self.mode == "traces_intersecting":
+            case_mask = inside > 0
+        else:
+            case_mask = inside == np.bincount(codes[valid], minlength=num_cases)
+        return _broadcast_case_mask(codes, case_mask)
+
+
+class CaseAttributeFilter(EventFilter):
+    """
+    Filter cases having at least one event where the given attribute has one of the provided values
+
+    :param attribute: name of the attribute column in the event log dataframe
+    :type attribute: str
+    :param values: attribute values to look for
+    :type values: Iterable
+    :param retain: if True, we retain the matching traces, if false, we drop them
+    :type retain: bool, optional
+    """
+
+    def __init__(self, attribute: str, values: Iterable, retain: bool = True):
+        self.attribute = attribute
+        self.values = list(values)
+        self.retain = retain
+
+    def mask(self, dataObject) -> np.ndarray:
+        df = dataObject.getData()
+        if self.attribute not in df.columns:
+            raise ValueError(f"{self.attribute} column is not in the dataframe!")
+        codes, num_cases = _case_codes(dataObject)
+        matches = df[self.attribute].isin(self.values).to_numpy()
+        valid = codes >= 0
+        case_mask = np.bincount(codes[valid], weights=matches[valid], minlength=num_cases) > 0
+        if not self.retain:
+            case_mask = ~case_mask
+        return _broadcast_case_mask(codes, case_mask)
+
+
+class FilteredEventData:
+    """
+    Lazy filtered view over a RawEventData event log. The view accumulates filters and pushes them down as a single boolean mask over the
+    event log dataframe, which is evaluated only when the view is materialized. Each filter is evaluated against the original event log,
+    so the resulting view is the conjunction of all the accumulated filters.
+
+    Views are immutable, each filter method returns a new view, so that views can be chained and shared::
+
+        view = data.lazyFilter().filterStartActivities(["A"]).filterTimeWindow(start="2023-01-01")
+        filtered = view.materialize()  # RawEventData
+    """
+
+    def __init__(self, dataObject, filters: Optional[List[EventFilter]] = None):
+        """
+        Creates a lazy view over the event log
+
+        :param dataObject: event log
+        :type dataObject: RawEventData
+        :param filters: filters to apply, defaults to None
+        :type filters: Optional[List[EventFilter]], optional
+        """
+        self.dataObject = dataObject
+        self.filters = list(filters) if filters is not None else []
+
+    def filter(self, event_filter: EventFilter) -> 'FilteredEventData':
+        """
+        Add the filter to the view
+
+        :param event_filter: filter to add
+        :type event_filter: EventFilter
+        :return: new view containing the filter
+        :rtype: FilteredEventData
+        """
+        return FilteredEventData(self.dataObject, self.filters + [event_filter])
+
+    def filterStartActivities(self, activities: Iterable[str], retain: bool = True) -> 'FilteredEventData':
+        """
+        Filter cases having a start activity in the provided list, see :class:`StartActivitiesFilter`
+        """
+        return self.filter(StartActivitiesFilter(activities, retain))
+
+    def filterEndActivities(self, activities: Iterable[str], retain: bool = True) -> 'FilteredEventData':
+        """
+        Filter cases having an end activity in the provided list, see :class:`EndActivitiesFilter`
+        """
+        return self.filter(EndActivitiesFilter(activities, retain))
+
+    def filterVariants(self, variant_keys: List[str], retain: bool = True) -> 'FilteredEventData':
+        """
+        Filter cases of the provided variants, see :class:`VariantsFilter`
+        """
+        return self.filter(VariantsFilter(variant_keys, retain))
+
+    def filterTimeWindow(self, start=None, end=None, mode: str = "traces_contained") -> 'FilteredEventData':
+        """
+        Filter the event log on a time window, see :class:`TimeWindowFilter`
+        """
+        return self.filter(TimeWindowFilter(start, end, mode))
+
+    def filterCaseAttribute(self, attribute: str, values: Iterable, retain: bool = True) -> 'FilteredEventData':
+        """
+        Filter cases on the values of an attribute, see :class:`CaseAttributeFilter`
+        """
+        return self.filter(CaseAttributeFilter(attribute, values, retain))
+
+    def getMask(self) -> np.ndarray:
+        """
+        Evaluate all the filters of the view into a single boolean mask over the events of the underlying event log
+
+        :return: boolean array with an entry per event
+        :rtype: np.ndarray
+        """
+        mask = np.ones(self.dataObject.getLength(), dtype=bool)
+        for event_filter in self.filters:
+            mask &= event_filter.mask(self.dataObject)
+        return mask
+
+    def materialize(self):
+        """
+        Apply the filters of the view to the event log
+
+        :return: new event log object holding only the filtered events, with the lifecycle transition of the event log
+        :rtype: RawEventData
+        """
+        data = self.dataObject.data
+        return self.dataObject._derive((data[self.getMask()] if self.filters else data).copy())
@@ -0,0 +1,92 @@
+# -----------------------------------------------------------------------------
+# Copyright contributors to the SAX4BPM project
+# -----------------------------------------------------------------------------
+from typing import Tuple
+
+import numpy as np
+import pandas as pd
+
+from ..utils.constants import Constants, LifecycleTypes
+from ..utils.timestamps import to_nanoseconds
+
+
+def _occurrences(keys: np.ndarray) -> np.ndarray:
+    """
+    Given sorted segment keys, return the rank of each element within its segment (0 for the first element of each segment)
+    """
+    positions = np.arange(len(keys))
+    segment_starts = np.r_[True, keys[1:] != keys[:-1]] if len(keys) else np.zeros(0, dtype=bool)
+    return positions - np.maximum.accumulate(np.where(segment_starts, positions, 0))
+
+
+def _instances(keys: np.ndarray, timestamps: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Sort the events by (case, activity) segment and timestamp, and number the events of each segment in the order of occurence
+
+    :return: positions of the events in sorted order, and the instance number of each sorted event within its segment
+    """
+    order = np.lexsort((timestamps, keys))
+    return order, _occurrences(keys[order])
+
+
+def pair_lifecycle_events(data: pd.DataFrame, case_id: str, activity_key: str, timestamp_key: str, type_key: str,
+                          start_event: LifecycleTypes = LifecycleTypes.START, end_event: LifecycleTypes = LifecycleTypes.COMPLETE) -> pd.DataFrame:
+    """
+    Pair the start and the end lifecycle events of every activity instance of the event log, producing an interval table with the service time of each
+    activity instance.
+
+    Events are grouped into segments by (case, activity) and sorted by timestamp with a single sort; the k-th start event of a segment is then matched with
+    the k-th end event of the same segment (so repeated executions of an activity within a case are paired in the order of their occurence). Start events
+    without a matching end event, and end events without a matching start event, are left out of the table.
+
+    :param data: event log dataframe holding all the lifecycle events
+    :type data: pd.DataFrame
+    :param case_id: name of the case id column
+    :type case_id: str
+    :param activity_key: name of the activity column
+    :type activity_key: str
+    :param timestamp_key: name of the timestamp column
+    :type timestamp_key: str
+    :param type_key: name of the lifecycle transition column
+    :type type_key: str
+    :param start_event: lifecycle transition opening an activity instance, defaults to START
+    :type start_event: LifecycleTypes, optional
+    :param end_event: lifecycle transition closing an activity instance, defaults to COMPLETE
+    :type end_event: LifecycleTypes, optional
+    :return: interval table with the case id, activity, start timestamp, end timestamp and duration (in seconds) of each activity instance, using the
+        standard column names (``Constants.CASE_ID_KEY``, ``Constants.ACTIVITY_KEY``, ``Constants.START_TIMESTAMP_KEY``, ``Constants.TIMESTAMP_KEY``
+        and ``Constants.DURATION_KEY``), ordered by case and start timestamp
+    :rtype: pd.DataFrame
+    """
+    transitions = data[type_key].astype("string").str.lower().to_numpy()
+    case_codes, cases = pd.factorize(data[case_id].astype("string"))
+    activity_codes, activities = pd.factorize(data[activity_key].astype("string"))
+    keys = case_codes.astype(np.int64) * max(len(activities), 1) + activity_codes
+    timestamps = to_nanoseconds(data[timestamp_key])
+
+    is_start = transitions == start_event.value.lower()
+    is_end = transitions == end_event.value.lower()
+    start_keys, start_times = keys[is_start], timestamps[is_start]
+    end_keys, end_times = keys[is_end], timestamps[is_end]
+    start_order, start_instances = _instances(start_keys, start_times)
+    end_order, end_instances = _instances(end_keys, end_times)
+
+    # identify each activity instance by its segment and instance number, and match the two sorted sides
+    width = int(max(start_instances.max(initial=0), end_instances.max(initial=0))) + 1
+    start_ids = start_keys[start_order] * width + start_instances
+    end_ids = end_keys[end_order] * width + end_instances
+    instance_ids, start_index, end_index = np.intersect1d(start_ids, end_ids, assume_unique=True, return_indices=True)
+
+    pair_keys = instance_ids // width
+    begin = start_times[start_order][start_index]
+    end = end_times[end_order][end_index]
+    order = np.lexsort((begin, pair_keys // max(len(activities), 1)))
+    pair_keys, begin, end = pair_keys[order], begin[order], end[order]
+
+    return pd.DataFrame({
+        Constants.CASE_ID_KEY: pd.array(cases.to_numpy()[pair_keys // max(len(activities), 1)], dtype="string"),
+        Constants.ACTIVITY_KEY: pd.array(activities.to_numpy()[pair_keys % max(len(activities), 1)], dtype="string"),
+        Constants.START_TIMESTAMP_KEY: pd.to_datetime(begin, utc=True),
+        Constants.TIMESTAMP_KEY: pd.to_datetime(end, utc=True),
+        Constants.DURATION_KEY: (end - begin) / 1e9,
+    })
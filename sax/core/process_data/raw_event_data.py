@@ -1,13 +1,17 @@
 # -----------------------------------------------------------------------------
 # Copyright contributors to the SAX4BPM project
 # -----------------------------------------------------------------------------
-from typing import List, Optional
+from typing import Dict, List, Optional
+import numpy as np
 import pandas as pd
 from pandas import DataFrame
 from pm4py.algo.filtering.log.variants import variants_filter
 from pm4py.objects.conversion.log import converter as log_converter
 
 from .data import BaseProcessDataObject
+from .filters import FilteredEventData
+from .lifecycle import pair_lifecycle_events
+from .sampling import SampleInfo, stratified_sample
 from .tabular_data import TabularEventData
 from ..utils.constants import Constants, LifecycleTypes
 
@@ -21,6 +25,9 @@ class RawEventData(BaseProcessDataObject):
     """    
 
     _permutations = None
+    _variantGroups = None
+    _lifecycleData = None
+    _intervals = None
     def __init__(self,data:DataFrame, mandatory_properties:dict,optional_properties:dict, chosen_lifecycle_event: Optional[LifecycleTypes] = None):           
         """
         Initializes a SAX raw event object.
@@ -46,14 +53,27 @@ class RawEventData(BaseProcessDataObject):
             If any of the input arguments do not have the expected value.
         """               
         super().__init__(data=data,mandatory_properties=mandatory_properties,optional_properties =optional_properties) 
+        self._chosenLifecycle = None
+        self.sampleInfo = None
         if (Constants.TYPE_KEY in mandatory_properties):
             if chosen_lifecycle_event is None:
                 chosen_lifecycle_event = LifecycleTypes.COMPLETE
-            filtered_df = self.data[self.data[self.mandatory_properties[Constants.TYPE_KEY]].str.lower().isin([chosen_lifecycle_event.value.lower()])]            
+            self._chosenLifecycle = chosen_lifecycle_event
+            chosen_events = self.data[self.mandatory_properties[Constants.TYPE_KEY]].str.lower().isin([chosen_lifecycle_event.value.lower()])
+            # keep the events of the other lifecycle transitions for pairing them into activity intervals, with the pairing columns only, as the events
+            # of the chosen transition are kept in the data anyway
+            self._lifecycleData = self.data.loc[~chosen_events, self._lifecycleColumns()]
+            filtered_df = self.data[chosen_events]            
 
             self.data = filtered_df  
         self._initLog() 
 
+    def _lifecycleColumns(self) -> List[str]:
+        """
+        Names of the columns needed to pair the lifecycle events into activity intervals - case id, activity, timestamp and lifecycle transition
+        """
+        return [self.mandatory_properties[key] for key in (Constants.CASE_ID_KEY, Constants.ACTIVITY_KEY, Constants.TIMESTAMP_KEY, Constants.TYPE_KEY)]
+
 
         
     def copy(self):
@@ -71,7 +91,10 @@ class RawEventData(BaseProcessDataObject):
         # Cast the copied object to RawEventData
         copied_object = RawEventData(copied_base_object.data,
                                       copied_base_object.mandatory_properties,
-                                      copied_base_object.optional_properties)      
+                                      copied_base_object.optional_properties,
+                                      self._chosenLifecycle)      
+        if self._lifecycleData is not None:
+            copied_object._lifecycleData = self._lifecycleData.copy()
         return copied_object
 
     def _filter_dataframe(self, original_dataframe, column_dict):
@@ -122,6 +145,70 @@ class RawEventData(BaseProcessDataObject):
         self._permutations = self._getVariants()        
         return self._permutations
     
+    def getVariantGroups(self) -> Dict[str, List[List[str]]]:
+        """
+        Group the variants of the event log by their set of activities (with repetitions). The variants are scanned once and the groups are cached, so
+        that all the analyses of the groups of this event log share a single scan.
+
+        Returns
+        -------
+        A dictionary where each key is the string of the sorted list of the activities of a group, and the corresponding value is the list of the
+        variants of the group (each a list of activities in the order of occurence), from the most frequent to the least frequent one.
+        """
+        if self._variantGroups is None:
+            variant_groups = {}
+            for variant in self.getVariants():
+                variant_list = variant.split(',')
+                variant_groups.setdefault(str(sorted(variant_list)), []).append(variant_list)
+            self._variantGroups = variant_groups
+        return self._variantGroups
+
+    def getCaseVariants(self) -> pd.Series:
+        """
+        Label each case of the event log with the name of its variant, in a single grouping pass over the dataframe (the activities of each case are
+        taken in the order of their timestamps, as in the pm4py event log).
+
+        Returns
+        -------
+        pd.Series
+            Series indexed by case id, holding the variant name (comma-separated list of the activities in the order of occurence) of each case.
+        """
+        mandatory_properties = self.getMandatoryProperties()
+        grouped = self._orderedEvents(self.data).groupby(mandatory_properties[Constants.CASE_ID_KEY], sort=False)[mandatory_properties[Constants.ACTIVITY_KEY]]
+        return grouped.agg(",".join)
+
+    def sample(self, budget: int, min_variant_frequency: float = 0.01, random_state: Optional[int] = None) -> 'RawEventData':
+        """
+        Draw a sample of cases stratified by variant, guaranteeing that every variant holding at least ``min_variant_frequency`` of the cases is covered,
+        see :func:`sax.core.process_data.sampling.stratified_sample`.
+
+        Parameters
+        ----------
+        budget : int
+            number of cases to sample
+        min_variant_frequency : float, optional
+            frequency floor above which variants are guaranteed to be covered by the sample, defaults to 0.01
+        random_state : Optional[int], optional
+            seed of the random number generator, defaults to None
+
+        Returns
+        -------
+        RawEventData
+            New event log object holding the sampled cases, the description of the sample (including edge frequency error bounds) is available through ``getSampleInfo()``.
+        """
+        return stratified_sample(self, budget, min_variant_frequency, random_state)
+
+    def getSampleInfo(self) -> Optional[SampleInfo]:
+        """
+        Get the description of the sample this event log was drawn as, if any
+
+        Returns
+        -------
+        Optional[SampleInfo]
+            Sample description, None if this event log is not a sample.
+        """
+        return self.sampleInfo
+
     def _getVariants(self)->dict:
         """
         Build a dictionary representing all process variants in the event log using process mining techniques
@@ -214,6 +301,14 @@ class RawEventData(BaseProcessDataObject):
 
         self.data = df
    
+    def _orderedEvents(self, data: DataFrame) -> DataFrame:
+        """
+        Order the events of each case by timestamp (events with equal timestamps keep their order), keeping the cases in their order of appearance
+        """
+        case_codes = pd.factorize(data[self.mandatory_properties[Constants.CASE_ID_KEY]])[0]
+        timestamp_ranks = data[self.mandatory_properties[Constants.TIMESTAMP_KEY]].rank(method="first").to_numpy()
+        return data.iloc[np.lexsort((timestamp_ranks, case_codes))]
+
     def getLog(self): 
         """
         Return the pm4py event log representing this dataframe object
@@ -242,6 +337,7 @@ class RawEventData(BaseProcessDataObject):
         if timestamp_key not in df.columns:
             raise Exception(timestamp_key + " column (timestamp) is not in the dataframe!")
    
+        df = self._orderedEvents(df)
    
         # make sure the case ID column is of string type
         df[case_id] = df[case_id].astype("string")
@@ -294,16 +390,74 @@ class RawEventData(BaseProcessDataObject):
         selected_df = self.data[id_columns.isin(all_chosen_ids)]                         
         original_df = selected_df.copy()
 
-        #Check whether the data contains lifecycle event type : in this case the dataframe is already filtered to a particular enum value, pass it to the new object creation
-        #TODO        
-        mandatory_properties = self.getMandatoryProperties()
-        if (Constants.TYPE_KEY in mandatory_properties):
-            lifecycle_event_value = original_df[mandatory_properties[Constants.TYPE_KEY]].iloc[0].lower()            
-            # Get the matching enum
-            matching_enum = LifecycleTypes(lifecycle_event_value)
-            return RawEventData(original_df, self.mandatory_properties, self.optional_properties,matching_enum)
+        return self._derive(original_df)
+
+    def _derive(self, data: DataFrame) -> 'RawEventData':
+        """
+        Create a new RawEventData object from a subset of this event log dataframe, keeping the properties of this object.
+
+        Parameters
+        ----------
+        data : pandas.DataFrame
+            Subset of the rows of this event log dataframe
+
+        Returns
+        -------
+        RawEventData
+            The RawEventData object holding the provided subset.
+        """
+        #Check whether the data contains lifecycle event type : in this case the dataframe is already filtered to the chosen lifecycle transition, pass it to the new object creation
+        if self._chosenLifecycle is not None:
+            derived = RawEventData(data, self.mandatory_properties, self.optional_properties, self._chosenLifecycle)
+            # share the events of the other lifecycle transitions, they are restricted to the cases of the derived object when paired
+            derived._lifecycleData = self._lifecycleData
+            return derived
         # Return the new RawEventData object with the filtered data
-        return RawEventData(original_df, self.mandatory_properties, self.optional_properties)
+        return RawEventData(data, self.mandatory_properties, self.optional_properties)
+
+    def getActivityIntervals(self) -> DataFrame:
+        """
+        Pair the start and complete lifecycle events of each activity instance of the event log into an interval table holding the service time of each
+        activity instance, see :func:`sax.core.process_data.lifecycle.pair_lifecycle_events`. The events of the lifecycle transitions other than the chosen
+        one are kept from the import of the log (with the pairing columns only), so the intervals are computed without importing the log again. The table is
+        computed once and cached.
+
+        Returns
+        -------
+        pandas.DataFrame
+            Interval table with the case id, activity, start timestamp, end timestamp and duration (in seconds) of each activity instance of the cases of
+            this event log, in columns ``Constants.CASE_ID_KEY``, ``Constants.ACTIVITY_KEY``, ``Constants.START_TIMESTAMP_KEY``, ``Constants.TIMESTAMP_KEY``
+            and ``Constants.DURATION_KEY``.
+
+        Raises
+        ------
+        ValueError
+            If the event log has no lifecycle transition column.
+        """
+        if self._intervals is None:
+            mandatory_properties = self.getMandatoryProperties()
+            if (Constants.TYPE_KEY not in mandatory_properties) or (self._lifecycleData is None):
+                raise ValueError("Activity intervals can be computed only for event logs with a lifecycle transition column")
+            case_id = mandatory_properties[Constants.CASE_ID_KEY]
+            lifecycle_data = self._lifecycleData
+            lifecycle_data = lifecycle_data[lifecycle_data[case_id].astype("string").isin(self.data[case_id].unique())]
+            lifecycle_data = pd.concat([self.data[self._lifecycleColumns()], lifecycle_data], ignore_index=True)
+            self._intervals = pair_lifecycle_events(lifecycle_data, case_id, mandatory_properties[Constants.ACTIVITY_KEY],
+                                                    mandatory_properties[Constants.TIMESTAMP_KEY], mandatory_properties[Constants.TYPE_KEY])
+        return self._intervals
+
+    def lazyFilter(self) -> FilteredEventData:
+        """
+        Create a lazy filtered view over this event log. Filters added to the view (start/end activities, variants, time window and case attribute
+        filters) are combined into a single boolean mask which is evaluated only when the view is materialized, returning a new
+        RawEventData object which can be used for further process mining or causal discovery.
+
+        Returns
+        -------
+        FilteredEventData
+            An empty lazy view over this event log.
+        """
+        return FilteredEventData(self)
 
     # def _getVariant(self, variant_key) -> 'RawEventData':   
     #     """
@@ -0,0 +1,207 @@
+# -----------------------------------------------------------------------------
+# Copyright contributors to the SAX4BPM project
+# -----------------------------------------------------------------------------
+import time
+from datetime import timedelta
+from typing import Callable, Dict, Optional, Tuple, Union
+
+import numpy as np
+
+from sax.core.utils.constants import Constants
+
+
+class SampleInfo:
+    """
+    Description of a stratified case sample drawn from an event log: for every variant (stratum), the number of cases of the variant in the
+    full log and the number of cases drawn into the sample. Since all the traces of a variant share the same sequence of activities, the
+    directly-follows frequencies of the sampled variants are estimated exactly by scaling, and the only error in estimated edge frequencies
+    comes from variants which were not drawn at all; this object reports bounds for that error.
+    """
+
+    def __init__(self, strata: Dict[str, Tuple[int, int]], edges: Dict[str, Dict[Tuple[str, str], int]]):
+        """
+        :param strata: mapping of variant names to a tuple of (number of cases in the log, number of sampled cases)
+        :type strata: Dict[str, Tuple[int, int]]
+        :param edges: mapping of variant names to the directly-follows edges of a single case of the variant along with their counts
+        :type edges: Dict[str, Dict[Tuple[str, str], int]]
+        """
+        self.strata = dict(strata)
+        self.edges = dict(edges)
+
+    def getTotalCases(self) -> int:
+        """
+        :return: number of cases in the full event log
+        :rtype: int
+        """
+        return sum(total for total, _ in self.strata.values())
+
+    def getSampledCases(self) -> int:
+        """
+        :return: number of cases in the sample
+        :rtype: int
+        """
+        return sum(sampled for _, sampled in self.strata.values())
+
+    def getCoverage(self) -> float:
+        """
+        :return: fraction of the cases of the full log belonging to variants represented in the sample
+        :rtype: float
+        """
+        total = self.getTotalCases()
+        covered = sum(count for count, sampled in self.strata.values() if sampled > 0)
+        return covered / total if total else 1.0
+
+    def getWeights(self) -> Dict[str, float]:
+        """
+        :return: mapping of each sampled variant to the weight of its sampled cases (number of cases in the log represented by each sampled case)
+        :rtype: Dict[str, float]
+        """
+        return {variant: total / sampled for variant, (total, sampled) in self.strata.items() if sampled > 0}
+
+    def scaleFrequencies(self, dfg: dict) -> dict:
+        """
+        Scale directly-follows frequencies discovered on the sample to estimated frequencies of the full event log
+
+        :param dfg: frequency dfg discovered on the sample
+        :type dfg: dict
+        :return: dfg with estimated full-log frequencies
+        :rtype: dict
+        """
+        estimated = {}
+        for variant, weight in self.getWeights().items():
+            # each of the sampled cases of the variant holds the same edges and stands for ``weight`` cases of the full log
+            sampled = self.strata[variant][1]
+            for edge, count in self.edges[variant].items():
+                estimated[edge] = estimated.get(edge, 0) + weight * sampled * count
+        return {edge: int(round(estimated.get(edge, 0))) for edge in dfg}
+
+    def getEdgeErrorBounds(self) -> Dict[Tuple[str, str], int]:
+        """
+        Upper bounds on the absolute error of the estimated full-log frequency of each edge (see :meth:`scaleFrequencies`). The bound of an edge
+        is the number of its occurences in the variants which were not drawn into the sample. Edges missing from the sample altogether appear
+        with a positive bound as well.
+
+        :return: mapping of edges to the maximal absolute error of their estimated frequency
+        :rtype: Dict[Tuple[str, str], int]
+        """
+        bounds = {}
+        for variant, (total, sampled) in self.strata.items():
+            for edge, count in self.edges[variant].items():
+                bounds[edge] = bounds.get(edge, 0) + (count * total if sampled == 0 else 0)
+        return bounds
+
+    def __str__(self):
+        return f"Sample of {self.getSampledCases()} out of {self.getTotalCases()} cases, variant coverage {self.getCoverage():.3f}"
+
+
+def _variant_edges(dataObject, representatives: Dict[str, object]) -> Dict[str, Dict[Tuple[str, str], int]]:
+    """
+    Count the directly-follows edges of each variant on the events of a single representative case of the variant (all the cases of a variant hold
+    the same edges), with the events of each case ordered by timestamp
+    """
+    mandatory_properties = dataObject.getMandatoryProperties()
+    case_key = mandatory_properties[Constants.CASE_ID_KEY]
+    data = dataObject.data
+    events = data[data[case_key].isin(list(representatives.values()))].sort_values(mandatory_properties[Constants.TIMESTAMP_KEY], kind="stable")
+    variant_of_case = {case: variant for variant, case in representatives.items()}
+    edges = {variant: {} for variant in representatives}
+    for case, activities in events.groupby(case_key, sort=False)[mandatory_properties[Constants.ACTIVITY_KEY]]:
+        variant_edges = edges[variant_of_case[case]]
+        activities = activities.tolist()
+        for edge in zip(activities[:-1], activities[1:]):
+            variant_edges[edge] = variant_edges.get(edge, 0) + 1
+    return edges
+
+
+def _allocate(totals: np.ndarray, budget: int, covered: np.ndarray) -> np.ndarray:
+    """
+    Allocate the sample budget to the strata proportionally to their size (largest remainder method), guaranteeing at least one case to the covered strata
+    """
+    share = budget * totals / totals.sum()
+    allocation = np.floor(share).astype(np.int64)
+    allocation[covered] = np.maximum(allocation[covered], 1)
+    remaining = budget - allocation.sum()
+    if remaining > 0:
+        order = np.argsort(-(share - np.floor(share)), kind="stable")
+        allocation[order[:remaining]] += 1
+    return np.minimum(allocation, totals)
+
+
+def stratified_sample(dataObject, budget: int, min_variant_frequency: float = 0.01, random_state: Optional[int] = None):
+    """
+    Draw a sample of cases from the event log, stratified by variant. The budget is allocated to the variants proportionally to their number of cases,
+    and every variant holding at least ``min_variant_frequency`` of the cases is guaranteed to be represented by at least one case (so the number of
+    sampled cases may exceed the budget when there are many such variants).
+
+    :param dataObject: event log
+    :type dataObject: RawEventData
+    :param budget: number of cases to sample
+    :type budget: int
+    :param min_variant_frequency: frequency floor above which variants are guaranteed to be covered by the sample, defaults to 0.01
+    :type min_variant_frequency: float, optional
+    :param random_state: seed of the random number generator, defaults to None
+    :type random_state: Optional[int], optional
+    :return: new event log holding the sampled cases, with the sample description available through ``getSampleInfo()``
+    :rtype: RawEventData
+    """
+    if budget <= 0:
+        raise ValueError("The sample budget should be a positive number of cases")
+    case_variants = dataObject.getCaseVariants()
+    variant_names, variant_codes = np.unique(case_variants.to_numpy().astype(str), return_inverse=True)
+    totals = np.bincount(variant_codes, minlength=len(variant_names))
+    covered = totals / totals.sum() >= min_variant_frequency
+    allocation = _allocate(totals, budget, covered) if budget < totals.sum() else totals
+
+    rng = np.random.RandomState(random_state)
+    # group the cases by variant with a single sort and draw each stratum without replacement
+    order = np.argsort(variant_codes, kind="stable")
+    strata_cases = np.split(case_variants.index.to_numpy()[order], np.cumsum(totals)[:-1])
+    chosen = [rng.choice(cases, size=size, replace=False) for cases, size in zip(strata_cases, allocation) if size > 0]
+    chosen_ids = np.concatenate(chosen) if chosen else np.array([], dtype=object)
+
+    data = dataObject.data
+    sampled = dataObject._derive(data[data[dataObject.getCaseIdColumnName()].isin(chosen_ids)].copy())
+    edges = _variant_edges(dataObject, {variant: cases[0] for variant, cases in zip(variant_names.tolist(), strata_cases)})
+    sampled.sampleInfo = SampleInfo({variant: (int(total), int(size)) for variant, total, size in zip(variant_names.tolist(), totals, allocation)}, edges)
+    return sampled
+
+
+def apply_with_sample(dataObject, sample: Optional[Union[int, timedelta]], discover: Callable, min_variant_frequency: float = 0.01,
+                      random_state: Optional[int] = None, pilot_cases: int = 50):
+    """
+    Run a discovery function on a stratified sample of the event log, bounded by a number of cases or by a time budget.
+
+    With a time budget, the discovery is first run on a small pilot sample to measure its cost per case, and then on the largest sample that is
+    expected to complete within the remaining budget (or on the full log if it fits).
+
+    :param dataObject: event log
+    :type dataObject: RawEventData
+    :param sample: number of cases, or a time budget, None to run on the full event log
+    :type sample: Optional[Union[int, timedelta]]
+    :param discover: discovery function accepting an event log object
+    :type discover: Callable
+    :return: the result of the discovery function along with the sampled event log it was applied to
+    :rtype: Tuple[Any, RawEventData]
+    """
+    if sample is None:
+        return discover(dataObject), dataObject
+    if not isinstance(sample, timedelta):
+        sampled = stratified_sample(dataObject, int(sample), min_variant_frequency, random_state)
+        return discover(sampled), sampled
+
+    deadline = time.monotonic() + sample.total_seconds()
+    total_cases = dataObject.getData()[dataObject.getCaseIdColumnName()].nunique()
+    if total_cases <= pilot_cases:
+        return discover(dataObject), dataObject
+    pilot = stratified_sample(dataObject, pilot_cases, min_variant_frequency, random_state)
+    started = time.monotonic()
+    result = discover(pilot)
+    cost_per_case = (time.monotonic() - started) / max(pilot.sampleInfo.getSampledCases(), 1)
+    remaining = deadline - time.monotonic()
+    budget = int(remaining / cost_per_case) if cost_per_case > 0 else total_cases
+    if budget >= total_cases:
+        return discover(dataObject), dataObject
+    if budget <= pilot.sampleInfo.getSampledCases():
+        return result, pilot
+    sampled = stratified_sample(dataObject, budget, min_variant_frequency, random_state)
+    return discover(sampled), sampled
@@ -0,0 +1,248 @@
+# -----------------------------------------------------------------------------
+# Copyright contributors to the SAX4BPM project
+# -----------------------------------------------------------------------------
+import math
+from typing import Dict, Iterable, Tuple
+
+import numpy as np
+import pandas as pd
+
+from sax.core.utils.constants import Constants
+from sax.core.utils.timestamps import to_nanoseconds
+
+
+class QuantileSketch:
+    """
+    Mergeable streaming quantile sketch with relative accuracy guarantees (log-bucketed histogram, in the spirit of DDSketch).
+    Each value is assigned to a bucket with logarithmically growing boundaries, so that any quantile is returned with a relative error
+    of at most ``relative_accuracy``, while the memory is bounded by the number of buckets (logarithmic in the range of the values)
+    rather than by the number of values. Count, sum, sum of squares, minimum and maximum are kept exactly.
+    """
+
+    def __init__(self, relative_accuracy: float = 0.01, min_value: float = 1e-3):
+        """
+        Create an empty sketch
+
+        :param relative_accuracy: relative accuracy of the returned quantiles, defaults to 0.01
+        :type relative_accuracy: float, optional
+        :param min_value: values below this threshold (including zero durations) are kept in a dedicated zero bucket, defaults to 1e-3
+        :type min_value: float, optional
+        """
+        if not 0 < relative_accuracy < 1:
+            raise ValueError("relative_accuracy should be between 0 and 1")
+        self.relative_accuracy = relative_accuracy
+        self.min_value = min_value
+        self._gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self._gamma)
+        self._buckets: Dict[int, int] = {}
+        self._zero_count = 0
+        self.count = 0
+        self.sum = 0.0
+        self.sum_squares = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def update(self, values: np.ndarray):
+        """
+        Add a batch of non-negative values to the sketch
+
+        :param values: values to add
+        :type values: np.ndarray
+        """
+        values = np.asarray(values, dtype=np.float64)
+        if values.size == 0:
+            return
+        self.count += values.size
+        self.sum += float(values.sum())
+        self.sum_squares += float(np.dot(values, values))
+        self.min = min(self.min, float(values.min()))
+        self.max = max(self.max, float(values.max()))
+
+        positive = values[values > self.min_value]
+        self._zero_count += values.size - positive.size
+        indexes, counts = np.unique(np.ceil(np.log(positive) / self._log_gamma).astype(np.int64), return_counts=True)
+        for index, count in zip(indexes.tolist(), counts.tolist()):
+            self._buckets[index] = self._buckets.get(index, 0) + count
+
+    def merge(self, other: 'QuantileSketch'):
+        """
+        Merge another sketch, created with the same accuracy parameters, into this one
+
+        :param other: sketch to merge
+        :type other: QuantileSketch
+        """
+        if other.relative_accuracy != self.relative_accuracy or other.min_value != self.min_value:
+            raise ValueError("Cannot merge sketches with different accuracy parameters")
+        for index, count in other._buckets.items():
+            self._buckets[index] = self._buckets.get(index, 0) + count
+        self._zero_count += other._zero_count
+        self.count += other.count
+        self.sum += other.sum
+        self.sum_squares += other.sum_squares
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    def quantile(self, q: float) -> float:
+        """
+        Return an estimate of the given quantile
+
+        :param q: quantile, between 0 and 1
+        :type q: float
+        :return: estimated quantile value, NaN if the sketch is empty
+        :rtype: float
+        """
+        if self.count == 0:
+            return math.nan
+        rank = q * (self.count - 1)
+        if rank < self._zero_count:
+            return max(self.min, 0.0)
+        accumulated = self._zero_count
+        for index in sorted(self._buckets):
+            accumulated += self._buckets[index]
+            if accumulated > rank:
+                # the representative value of the bucket (gamma^(i-1), gamma^i] with the guaranteed relative error
+                value = 2 * self._gamma ** index / (self._gamma + 1)
+                return min(max(value, self.min), self.max)
+        return self.max
+
+    def mean(self) -> float:
+        return self.sum / self.count if self.count else math.nan
+
+    def stdev(self) -> float:
+        if self.count == 0:
+            return math.nan
+        return math.sqrt(max(self.sum_squares / self.count - self.mean() ** 2, 0.0))
+
+
+def _edge_durations(data: pd.DataFrame, case_id: str, activity_key: str, timestamp_key: str) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Compute the directly-follows pairs of the event log together with their durations, with a single shift over the events sorted by case and timestamp.
+
+    :return: source activity codes, target activity codes and durations in seconds of all directly-follows pairs, followed by the activity codes of the
+        first and of the last event of each case
+    """
+    case_codes = pd.factorize(data[case_id])[0]
+    activity_codes = data[activity_key].to_numpy()
+    timestamps = to_nanoseconds(data[timestamp_key])
+
+    order = np.lexsort((timestamps, case_codes))
+    case_codes = case_codes[order]
+    activity_codes = activity_codes[order]
+    timestamps = timestamps[order]
+
+    same_case = case_codes[1:] == case_codes[:-1]
+    durations = (timestamps[1:] - timestamps[:-1])[same_case] / 1e9
+    sources = activity_codes[:-1][same_case]
+    targets = activity_codes[1:][same_case]
+
+    case_starts = np.r_[True, ~same_case] if len(order) else np.zeros(0, dtype=bool)
+    case_ends = np.r_[~same_case, True] if len(order) else np.zeros(0, dtype=bool)
+    return sources, targets, durations, activity_codes[case_starts], activity_codes[case_ends]
+
+
+def _group_by_edge(sources: np.ndarray, targets: np.ndarray, durations: np.ndarray) -> Iterable[Tuple[Tuple[str, str], np.ndarray]]:
+    """
+    Group the durations of the directly-follows pairs by edge with a single sort, yielding each edge along with its durations array
+    """
+    if durations.size == 0:
+        return
+    edges, edge_codes = np.unique(np.stack([sources.astype(str), targets.astype(str)]), axis=1, return_inverse=True)
+    edge_codes = edge_codes.reshape(-1)
+    order = np.argsort(edge_codes, kind="stable")
+    splits = np.cumsum(np.bincount(edge_codes, minlength=edges.shape[1]))[:-1]
+    for (source, target), edge_durations in zip(edges.T.tolist(), np.split(durations[order], splits)):
+        yield (source, target), edge_durations
+
+
+def _statistics(durations: np.ndarray) -> Dict[str, float]:
+    return {
+        "mean": float(np.mean(durations)),
+        "median": float(np.median(durations)),
+        "p95": float(np.percentile(durations, 95)),
+        "min": float(np.min(durations)),
+        "max": float(np.max(durations)),
+        "stdev": float(np.std(durations)),
+        "sum": float(np.sum(durations)),
+        "count": int(durations.size),
+    }
+
+
+def _sketch_statistics(sketch: QuantileSketch) -> Dict[str, float]:
+    return {
+        "mean": sketch.mean(),
+        "median": sketch.quantile(0.5),
+        "p95": sketch.quantile(0.95),
+        "min": sketch.min,
+        "max": sketch.max,
+        "stdev": sketch.stdev(),
+        "sum": sketch.sum,
+        "count": sketch.count,
+    }
+
+
+def _chunks(data: pd.DataFrame, case_id: str, chunk_size: int) -> Iterable[pd.DataFrame]:
+    """
+    Split the event log into chunks of whole cases, each holding at most ``chunk_size`` cases. The events are ordered by case once, and each chunk
+    is a contiguous range of that order, so that splitting the whole log is linear in its number of events.
+    """
+    case_codes = pd.factorize(data[case_id])[0]
+    if len(case_codes) == 0:
+        return
+    order = np.argsort(case_codes, kind="stable")
+    bounds = np.searchsorted(case_codes[order], np.arange(0, case_codes.max() + 1 + chunk_size, chunk_size))
+    for start, end in zip(bounds[:-1], bounds[1:]):
+        if end > start:
+            yield data.iloc[order[start:end]]
+
+
+def compute_performance_dfg(data: pd.DataFrame, case_id: str = Constants.CASE_ID_KEY, activity_key: str = Constants.ACTIVITY_KEY, timestamp_key: str = Constants.TIMESTAMP_KEY,
+                            streaming: bool = False, chunk_size: int = 100000, relative_accuracy: float = 0.01) -> Tuple[dict, dict, dict]:
+    """
+    Compute a performance-annotated directly-follows graph of the event log. For every edge (a, b) the durations between the completion of ``a``
+    and the directly following ``b`` are summarized by their mean, median, 95th percentile, minimum, maximum, standard deviation, sum and count
+    (durations in seconds).
+
+    In the default (exact) mode all the edge durations are computed at once and summarized exactly. In streaming mode the cases are processed in
+    chunks of ``chunk_size`` cases and the durations of each edge are accumulated into a :class:`QuantileSketch`, so that memory stays bounded
+    regardless of the size of the log; median and 95th percentile are then approximate within ``relative_accuracy``.
+
+    :param data: event log dataframe
+    :type data: pd.DataFrame
+    :param case_id: name of the case id column
+    :type case_id: str
+    :param activity_key: name of the activity column
+    :type activity_key: str
+    :param timestamp_key: name of the timestamp column
+    :type timestamp_key: str
+    :param streaming: whether to use streaming quantile sketches, defaults to False
+    :type streaming: bool, optional
+    :param chunk_size: number of cases processed at once in streaming mode, defaults to 100000
+    :type chunk_size: int, optional
+    :param relative_accuracy: relative accuracy of the sketch quantiles in streaming mode, defaults to 0.01
+    :type relative_accuracy: float, optional
+    :return: performance dfg (mapping of edges to dictionaries of statistics), start activities and end activities along with their counts
+    :rtype: Tuple[dict, dict, dict]
+    """
+    start_activities = {}
+    end_activities = {}
+
+    def count_boundaries(starts, ends):
+        for target, values in ((start_activities, starts), (end_activities, ends)):
+            activities, counts = np.unique(values, return_counts=True)
+            for activity, count in zip(activities.tolist(), counts.tolist()):
+                target[activity] = target.get(activity, 0) + count
+
+    if not streaming:
+        sources, targets, durations, starts, ends = _edge_durations(data, case_id, activity_key, timestamp_key)
+        count_boundaries(starts, ends)
+        dfg = {edge: _statistics(edge_durations) for edge, edge_durations in _group_by_edge(sources, targets, durations)}
+        return dfg, start_activities, end_activities
+
+    sketches: Dict[Tuple[str, str], QuantileSketch] = {}
+    for chunk in _chunks(data, case_id, chunk_size):
+        sources, targets, durations, starts, ends = _edge_durations(chunk, case_id, activity_key, timestamp_key)
+        count_boundaries(starts, ends)
+        for edge, edge_durations in _group_by_edge(sources, targets, durations):
+            sketches.setdefault(edge, QuantileSketch(relative_accuracy)).update(edge_durations)
+    dfg = {edge: _sketch_statistics(sketch) for edge, sketch in sketches.items()}
+    return dfg, start_activities, end_activities
@@ -1,7 +1,9 @@
 # -----------------------------------------------------------------------------
 # Copyright contributors to the SAX4BPM project
 # -----------------------------------------------------------------------------
-from typing import List, Optional, Tuple
+from concurrent.futures import Future
+from datetime import timedelta
+from typing import List, Optional, Tuple, Union
 
 import pandas as pd
 import pm4py
@@ -9,13 +11,19 @@ from pm4py.algo.discovery.dfg import algorithm as dfg_discovery
 from pm4py.objects.bpmn.obj import BPMN
 from pm4py.objects.heuristics_net.obj import HeuristicsNet
 from pm4py.objects.process_tree.obj import ProcessTree
+from pm4py.visualization.bpmn import visualizer as bpmn_visualizer
 from pm4py.visualization.dfg import visualizer as dfg_visualization
+from pm4py.visualization.heuristics_net import visualizer as hn_visualizer
+from pm4py.visualization.process_tree import visualizer as pt_visualizer
 
 from sax.core.process_data.formatters.csv_formatter import CSVFormatter
 from sax.core.process_data.formatters.mxml_formatter import MXMLConstants, MXMLFormatter
 from sax.core.process_data.formatters.xes_formatter import XESFormatter
 from sax.core.process_data.raw_event_data import RawEventData
+from sax.core.process_data.sampling import apply_with_sample
+from sax.core.process_mining.performance import compute_performance_dfg
 from sax.core.utils.constants import Constants, LifecycleTypes
+from sax.core.utils.rendering import get_render_service, model_content
 
 import xml.etree.ElementTree as Xet
 
@@ -219,7 +227,7 @@ def import_mxml(eventlog, kloop_unroling: bool=False, case_id: str=MXMLFormatter
 
 
 
-def discover_heuristics_net(dataframe: RawEventData,variants: Optional[List[str]] = None) -> HeuristicsNet:        
+def discover_heuristics_net(dataframe: RawEventData,variants: Optional[List[str]] = None, sample: Optional[Union[int, timedelta]] = None) -> HeuristicsNet:        
         """
         Apply heuristic mining algorithm on the RawEventData event log object to discover heuristic net
 
@@ -227,8 +235,8 @@ def discover_heuristics_net(dataframe: RawEventData,variants: Optional[List[str]
         :type dataframe: RawEventData
         :param variants: a list of variant names to perform discovery on
         :type variants: List[str]
-        :param lifecycleTypes: lifecycle event types to filter, defaults to None
-        :type lifecycleTypes: List, optional
+        :param sample: if provided, discover the net on a variant-stratified sample of the event log, bounded either by a number of cases or by a time budget, defaults to None
+        :type sample: Optional[Union[int, timedelta]], optional
         :return: heuristic net
         :rtype: HeuristicsNet
         """
@@ -237,8 +245,7 @@ def discover_heuristics_net(dataframe: RawEventData,variants: Optional[List[str]
         else:
            event_log = dataframe     
               
-        formatted_log = event_log.getLog()        
-        map =  pm4py.discover_heuristics_net(formatted_log)
+        map, _ = apply_with_sample(event_log, sample, lambda log: pm4py.discover_heuristics_net(log.getLog()))
 
         return map
 
@@ -253,7 +260,7 @@ def view_heuristics_net(map: HeuristicsNet):
         """        
         pm4py.view_heuristics_net(map)
 
-def discover_dfg(dataframe: RawEventData,variants: Optional[List[str]] = None):        
+def discover_dfg(dataframe: RawEventData,variants: Optional[List[str]] = None, performance: bool = False, streaming: bool = False, sample: Optional[Union[int, timedelta]] = None):        
         """
         Apply dfg mining algorithm on the RawEventData event log object to discover heuristic net
 
@@ -261,28 +268,169 @@ def discover_dfg(dataframe: RawEventData,variants: Optional[List[str]] = None):
         :type dataframe: RawEventData
         :param variants: a list of variant names to perform discovery on
         :type variants: List[str]        
-        :param lifecycleTypes: lifecycle event types to filter, defaults to None
-        :type lifecycleTypes: List, optional
-        :return: dfg
-        :rtype: 
+        :param performance: if True, discover a performance dfg where each edge holds the statistics (mean, median, p95, min, max, stdev, sum, count) of the durations in seconds between the two activities, instead of the edge frequency, defaults to False
+        :type performance: bool, optional
+        :param streaming: in performance mode, whether to summarize the durations with bounded-memory streaming quantile sketches (approximate median and p95), defaults to False
+        :type streaming: bool, optional
+        :param sample: if provided, discover the dfg on a variant-stratified sample of the event log, bounded either by a number of cases or by a time budget. Edge frequencies are then scaled to estimated frequencies of the whole event log, defaults to None
+        :type sample: Optional[Union[int, timedelta]], optional
+        :return: dfg and the pm4py event log it was discovered from (in performance mode the dfg is computed directly on the dataframe and no event log is returned)
+        :rtype: Tuple[dict, EventLog]
         """
         if variants is not None:
            event_log = dataframe.filterVariants(variants)    
         else:
            event_log = dataframe    
         
-                                   
-        formatted_log = event_log.getLog()
-        dfg =  dfg_discovery.apply(formatted_log, variant=dfg_discovery.Variants.FREQUENCY)
+        if performance:
+           (dfg, _, _), _ = apply_with_sample(event_log, sample, lambda log: _discover_performance_dfg(log, streaming))
+           return dfg, None
+
+        def _discover(log: RawEventData):
+           formatted_log = log.getLog()
+           return dfg_discovery.apply(formatted_log, variant=dfg_discovery.Variants.FREQUENCY), formatted_log
+
+        (dfg, formatted_log), sampled_log = apply_with_sample(event_log, sample, _discover)
+        if sampled_log.getSampleInfo() is not None:
+           dfg = sampled_log.getSampleInfo().scaleFrequencies(dfg)
         return dfg, formatted_log
 
-def view_dfg(dfg: dict, formatted_log):
+def _discover_performance_dfg(event_log: RawEventData, streaming: bool = False) -> Tuple[dict,dict,dict]:
+        """
+        Compute the performance dfg of the event log directly on its dataframe, see :func:`sax.core.process_mining.performance.compute_performance_dfg`
+        """
+        mandatory_properties = event_log.getMandatoryProperties()
+        return compute_performance_dfg(event_log.getData(), case_id=mandatory_properties[Constants.CASE_ID_KEY], activity_key=mandatory_properties[Constants.ACTIVITY_KEY],
+                                       timestamp_key=mandatory_properties[Constants.TIMESTAMP_KEY], streaming=streaming)
+
+def _is_performance_dfg(dfg: dict) -> bool:
+        return any(isinstance(value, dict) for value in dfg.values())
+
+def view_dfg(dfg: dict, formatted_log, aggregation_measure: str = "mean"):
         """
         Create view of the dfg
+
+        :param dfg: frequency or performance dfg
+        :type dfg: dict
+        :param formatted_log: the pm4py event log the dfg was discovered from, may be None for a performance dfg
+        :type formatted_log: EventLog
+        :param aggregation_measure: for a performance dfg, the statistic to display on the edges (mean, median, p95, min, max, stdev, sum), defaults to mean
+        :type aggregation_measure: str, optional
         """
-        gviz = dfg_visualization.apply(dfg, log=formatted_log, variant=dfg_visualization.Variants.FREQUENCY)
+        gviz = _build_dfg_graph(dfg, "png", aggregation_measure, formatted_log)
         dfg_visualization.view(gviz)
 
+def _performance_activities_count(dfg: dict) -> dict:
+        """
+        Count the occurrences of every activity of a performance dfg from its edge counts. An activity occurs as many times as it is entered plus the
+        number of cases it starts, or left plus the number of cases it ends, so the larger of its incoming and outgoing counts is taken: start activities
+        are counted from their outgoing edges and end activities from their incoming edges.
+        """
+        incoming = {}
+        outgoing = {}
+        for (source, target), statistics in dfg.items():
+           outgoing[source] = outgoing.get(source, 0) + statistics["count"]
+           incoming[target] = incoming.get(target, 0) + statistics["count"]
+        return {activity: max(incoming.get(activity, 0), outgoing.get(activity, 0)) for activity in incoming.keys() | outgoing.keys()}
+
+def _build_dfg_graph(dfg: dict, format: str, aggregation_measure: str = "mean", formatted_log=None):
+        if _is_performance_dfg(dfg):
+           activities_count = _performance_activities_count(dfg)
+           performance_parameters = dfg_visualization.Variants.PERFORMANCE.value.Parameters
+           parameters = {performance_parameters.AGGREGATION_MEASURE: aggregation_measure, performance_parameters.FORMAT: format}
+           return dfg_visualization.apply(dfg, log=formatted_log, variant=dfg_visualization.Variants.PERFORMANCE, parameters=parameters, activities_count=activities_count)
+        parameters = {dfg_visualization.Variants.FREQUENCY.value.Parameters.FORMAT: format}
+        return dfg_visualization.apply(dfg, log=formatted_log, variant=dfg_visualization.Variants.FREQUENCY, parameters=parameters)
+
+def _build_heuristics_net_graph(map: HeuristicsNet, format: str, bgcolor: str = "white"):
+        parameters = hn_visualizer.Variants.PYDOTPLUS.value.Parameters
+        return hn_visualizer.apply(map, parameters={parameters.FORMAT: format, "bgcolor": bgcolor})
+
+def _build_bpmn_graph(bpmn_model: BPMN, format: str, bgcolor: str = "white"):
+        parameters = bpmn_visualizer.Variants.CLASSIC.value.Parameters
+        return bpmn_visualizer.apply(bpmn_model, parameters={parameters.FORMAT: format, "bgcolor": bgcolor})
+
+def _build_process_tree_graph(process_tree: ProcessTree, format: str, bgcolor: str = "white"):
+        parameters = pt_visualizer.Variants.WO_DECORATION.value.Parameters
+        return pt_visualizer.apply(process_tree, parameters={parameters.FORMAT: format, "bgcolor": bgcolor})
+
+@model_content.register
+def _heuristics_net_content(map: HeuristicsNet):
+        nodes = sorted(((name, node.node_occ, node.is_start_activity, node.is_end_activity) for name, node in map.nodes.items()), key=repr)
+        edges = sorted(((name, target.node_name, edge.dependency_value, edge.dfg_value, edge.repr_value, edge.label, edge.edge_type)
+                        for name, node in map.nodes.items() for target, node_edges in node.output_connections.items() for edge in node_edges), key=repr)
+        return ("HeuristicsNet", map.node_type, tuple(nodes), tuple(edges), model_content(map.start_activities), model_content(map.end_activities))
+
+@model_content.register
+def _bpmn_content(bpmn_model: BPMN):
+        nodes = sorted(((type(node).__name__, node.get_id(), node.get_name(), str(getattr(node, "gateway_direction", ""))) for node in bpmn_model.get_nodes()), key=repr)
+        flows = sorted(((type(flow).__name__, flow.get_source().get_id(), flow.get_target().get_id(), flow.get_name()) for flow in bpmn_model.get_flows()), key=repr)
+        return ("BPMN", tuple(nodes), tuple(flows))
+
+@model_content.register
+def _process_tree_content(process_tree: ProcessTree):
+        return ("ProcessTree", repr(process_tree))
+
+def render_heuristics_net(map: HeuristicsNet, format: str = "svg", bgcolor: str = "white") -> Future:
+        """
+        Render the heuristic net to image bytes in the background, without opening a viewer. Images are cached by the content of the net and the render options.
+
+        :param map: Heuristic net
+        :type map: HeuristicsNet
+        :param format: image format (svg, png...), defaults to svg
+        :type format: str, optional
+        :param bgcolor: background color, defaults to white
+        :type bgcolor: str, optional
+        :return: future holding the image bytes
+        :rtype: Future
+        """
+        return get_render_service().render(map, _build_heuristics_net_graph, format, bgcolor=bgcolor)
+
+def render_dfg(dfg: dict, format: str = "svg", aggregation_measure: str = "mean") -> Future:
+        """
+        Render the frequency or performance dfg to image bytes in the background, without opening a viewer. Images are cached by the content of the dfg and the render options.
+
+        :param dfg: frequency or performance dfg
+        :type dfg: dict
+        :param format: image format (svg, png...), defaults to svg
+        :type format: str, optional
+        :param aggregation_measure: for a performance dfg, the statistic to display on the edges, defaults to mean
+        :type aggregation_measure: str, optional
+        :return: future holding the image bytes
+        :rtype: Future
+        """
+        return get_render_service().render(dict(dfg), _build_dfg_graph, format, aggregation_measure=aggregation_measure)
+
+def render_bpmn_model(bpmn_model: BPMN, format: str = "svg", bgcolor: str = "white") -> Future:
+        """
+        Render the BPMN model to image bytes in the background, without opening a viewer. Images are cached by the content of the model and the render options.
+
+        :param bpmn_model: BPMN
+        :type bpmn_model: BPMN
+        :param format: image format (svg, png...), defaults to svg
+        :type format: str, optional
+        :param bgcolor: background color, defaults to white
+        :type bgcolor: str, optional
+        :return: future holding the image bytes
+        :rtype: Future
+        """
+        return get_render_service().render(bpmn_model, _build_bpmn_graph, format, bgcolor=bgcolor)
+
+def render_process_tree(process_tree: ProcessTree, format: str = "svg", bgcolor: str = "white") -> Future:
+        """
+        Render the process tree to image bytes in the background, without opening a viewer. Images are cached by the content of the tree and the render options.
+
+        :param process_tree: process tree
+        :type process_tree: ProcessTree
+        :param format: image format (svg, png...), defaults to svg
+        :type format: str, optional
+        :param bgcolor: background color, defaults to white
+        :type bgcolor: str, optional
+        :return: future holding the image bytes
+        :rtype: Future
+        """
+        return get_render_service().render(process_tree, _build_process_tree_graph, format, bgcolor=bgcolor)
+
     
 def discover_bpmn_model( dataframe: RawEventData,variants: Optional[List[str]] = None) -> BPMN:    
         """
@@ -347,7 +495,7 @@ def view_process_tree(process_tree: ProcessTree):
 
 
    
-def discover_process_map( dataframe: RawEventData,variants: Optional[List[str]] = None) -> Tuple[dict,dict,dict]:
+def discover_process_map( dataframe: RawEventData,variants: Optional[List[str]] = None, performance: bool = False, streaming: bool = False) -> Tuple[dict,dict,dict]:
         """
         Discover process map
 
@@ -355,8 +503,10 @@ def discover_process_map( dataframe: RawEventData,variants: Optional[List[str]]
         :type dataframe: RawEventData
         :param variants: a list of variant names to perform discovery on
         :type variants: List[str]        
-        :param lifecycleTypes: event lifecycle types to filter, defaults to None
-        :type lifecycleTypes: List, optional
+        :param performance: if True, discover a performance process map where each edge holds duration statistics in seconds, see :func:`discover_dfg`, defaults to False
+        :type performance: bool, optional
+        :param streaming: in performance mode, whether to use bounded-memory streaming quantile sketches, defaults to False
+        :type streaming: bool, optional
         :return: process map
         :rtype: Tuple[dict,dict,dict]
         """        
@@ -365,6 +515,9 @@ def discover_process_map( dataframe: RawEventData,variants: Optional[List[str]]
         else:
            event_log = dataframe        
         
+        if performance:
+           return _discover_performance_dfg(event_log, streaming)
+
           
         formatted_log = event_log.getLog()
 
@@ -385,7 +538,10 @@ def view_process_map(dfg, start_activities, end_activities):
         :param end_activities: list of end activities
         :type end_activities: List
         """        
-        pm4py.view_dfg(dfg, start_activities, end_activities)
+        if _is_performance_dfg(dfg):
+           pm4py.view_performance_dfg(dfg, start_activities, end_activities)
+        else:
+           pm4py.view_dfg(dfg, start_activities, end_activities)
           
 
 def filter_start_activities(dataframe: RawEventData, activities,variants: Optional[List[str]] = None, retain=True):
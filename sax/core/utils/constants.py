@@ -25,4 +25,6 @@ class Constants(metaclass=ConstantsMeta):
     RESOURCE_KEY = "org:resource"
     STARTTIME_COLUMN="start:timestamp"
     START_BASE_COLUMN="start"
+    START_TIMESTAMP_KEY = "start_timestamp"
+    DURATION_KEY = "duration"
     CSV_SEPARATOR="separator"    
@@ -1,7 +1,10 @@
 # -----------------------------------------------------------------------------
 # Copyright contributors to the SAX4BPM project
 # -----------------------------------------------------------------------------
+import hashlib
+from collections import OrderedDict
 from enum import Enum
+from threading import Lock
 from typing import Optional
 
 import numpy as np
@@ -117,14 +120,75 @@ def add_start_time(df,timestamp_column_name,id_column_name, start_column_name):
     return result_df
 
 
+_PRECEDENCE_CACHE_SIZE = 64
+_precedence_cache: "OrderedDict[tuple, np.ndarray]" = OrderedDict()
+_precedence_cache_lock = Lock()
+
+
+def _frame_fingerprint(values: np.ndarray, columns: list) -> tuple:
+    return (tuple(columns), values.shape, hashlib.sha1(np.ascontiguousarray(values).tobytes()).hexdigest())
+
+
+def precedence_counts(values: np.ndarray, max_block_bytes: int = 2 ** 26) -> np.ndarray:
+    """
+    Count for every ordered pair of columns of the matrix the rows in which the value of one column is greater or equal than the value of the other. Rows
+    with missing values count as not greater or equal. The counts of several blocks of rows add up, so they can be accumulated as rows are appended.
+
+    :param values: matrix with a row per trace and a column per activity
+    :type values: np.ndarray
+    :param max_block_bytes: maximal size of the boolean comparison block, defaults to 64MB
+    :type max_block_bytes: int, optional
+    :return: matrix C where C[j, i] is the number of rows in which column i is greater or equal than column j
+    :rtype: np.ndarray
+    """
+    n_rows, n_columns = values.shape
+    counts = np.zeros((n_columns, n_columns), dtype=np.int64)
+    block = max(1, max_block_bytes // max(n_rows * n_columns, 1))
+    for start in range(0, n_columns, block):
+        stop = min(start + block, n_columns)
+        # (rows, block, columns) comparisons of the block columns against all the columns
+        greater_equal = values[:, start:stop, None] >= values[:, None, :]
+        counts[:, start:stop] = greater_equal.sum(axis=0).T
+    return counts
+
+
+def precedence_fractions(df: pd.DataFrame, max_block_bytes: int = 2 ** 26) -> np.ndarray:
+    """
+    Compute for every ordered pair of columns of the dataframe the fraction of rows in which the value of one column is greater or equal than the value of the
+    other (for timestamps or durations: the fraction of traces in which one activity does not precede the other). Rows with missing values count as not
+    greater or equal.
+
+    The comparisons are broadcast over blocks of columns, so that the memory of each block is bounded by ``max_block_bytes``. The matrix is cached by the
+    content of the dataframe, so repeated assessments of the same frame are not recomputed.
+
+    :param df: dataframe with numeric columns
+    :type df: pd.DataFrame
+    :param max_block_bytes: maximal size of the boolean comparison block, defaults to 64MB
+    :type max_block_bytes: int, optional
+    :return: matrix F where F[j, i] is the fraction of rows in which column i is greater or equal than column j
+    :rtype: np.ndarray
+    """
+    values = df.to_numpy(dtype=np.float64)
+    key = _frame_fingerprint(values, list(df.columns))
+    with _precedence_cache_lock:
+        if key in _precedence_cache:
+            _precedence_cache.move_to_end(key)
+            return _precedence_cache[key].copy()
+
+    n_rows = values.shape[0]
+    fractions = precedence_counts(values, max_block_bytes) / n_rows if n_rows else np.zeros((values.shape[1], values.shape[1]))
+
+    with _precedence_cache_lock:
+        _precedence_cache[key] = fractions
+        while len(_precedence_cache) > _PRECEDENCE_CACHE_SIZE:
+            _precedence_cache.popitem(last=False)
+    return fractions.copy()
+
+
 def get_uniformity(df):
     uniformity = np.eye(len(df.columns)) -1
-    for ind1, column1 in enumerate(df.columns):
-        for ind2, column2 in enumerate(df.columns):
-            if column1!=column2 :
-                residuals = df[column1] - df[column2]
-                if (residuals >= 0).all():                        
-                    uniformity[ind2][ind1] = 0
-                else:
-                    uniformity[ind2][ind1] = (residuals >= 0).sum()/ len(residuals)
-    return uniformity
\ No newline at end of file
+    fractions = precedence_fractions(df)
+    #pairs of distinct columns, where column1 always follows column2 get 0, otherwise the fraction of traces where it follows
+    distinct = np.not_equal.outer(np.asarray(df.columns, dtype=object), np.asarray(df.columns, dtype=object))
+    uniformity[distinct] = np.where(fractions == 1, 0, fractions)[distinct]
+    return uniformity
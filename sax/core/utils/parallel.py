@@ -0,0 +1,37 @@
+# -----------------------------------------------------------------------------
+# Copyright contributors to the SAX4BPM project
+# -----------------------------------------------------------------------------
+from typing import Callable, Iterable, List, Optional, Tuple, Union
+
+from joblib import Parallel, delayed
+
+
+def parallel_map(function: Callable, items: Iterable, n_jobs: Optional[int] = None, prefer: str = "threads", batch_size: Union[int, str] = "auto",
+                 arguments: Tuple = ()) -> List:
+    """
+    Apply the function to each of the items, spreading the calls over a pool of workers. The results are returned in the order of the items regardless of
+    the number of workers, so that the outcome is deterministic.
+
+    With the default thread pool the workers share the memory of the caller, so large arrays passed to the function are not copied; this suits NumPy-bound
+    work which releases the GIL.
+
+    :param function: function to apply
+    :type function: Callable
+    :param items: items to apply the function on
+    :type items: Iterable
+    :param n_jobs: number of workers, None or 1 to run sequentially in the calling thread, -1 to use all the CPUs, defaults to None
+    :type n_jobs: Optional[int], optional
+    :param prefer: kind of workers, "threads" or "processes", defaults to "threads"
+    :type prefer: str, optional
+    :param batch_size: number of items dispatched to a worker at once, to amortize the dispatch overhead of short calls, "auto" to adapt it to the duration of the calls, defaults to "auto"
+    :type batch_size: Union[int, str], optional
+    :param arguments: arguments passed to every call after the item. With process workers, large arrays passed here are memory mapped by joblib and
+        shared by the workers, whereas arrays captured by the function would be pickled along with every batch of calls, defaults to ()
+    :type arguments: Tuple, optional
+    :return: results of the function for each of the items
+    :rtype: List
+    """
+    items = list(items)
+    if n_jobs in (None, 1) or len(items) <= 1:
+        return [function(item, *arguments) for item in items]
+    return Parallel(n_jobs=n_jobs, prefer=prefer, batch_size=batch_size)(delayed(function)(item, *arguments) for item in items)
@@ -0,0 +1,163 @@
+# -----------------------------------------------------------------------------
+# Copyright contributors to the SAX4BPM project
+# -----------------------------------------------------------------------------
+import hashlib
+import os
+from collections import OrderedDict
+from collections.abc import Mapping
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import partial, singledispatch
+from threading import Lock
+from typing import Any, Callable, Optional
+
+import graphviz
+import numpy as np
+import pandas as pd
+
+
+@singledispatch
+def model_content(model: Any) -> Any:
+    """
+    Convert a model into its canonical content - nested tuples of plain values, with the entries of mappings and sets sorted, so that two models with
+    the same content (edges, weights, labels...) have the same content regardless of how they were built. Plain objects are converted from their
+    attributes; models holding cyclic references (process models) register a content function of their own with ``model_content.register``.
+
+    :param model: model to convert
+    :type model: Any
+    :raises TypeError: if the model has no canonical content
+    :return: canonical content of the model
+    :rtype: Any
+    """
+    if model is None or isinstance(model, (str, bytes, bool, int, float)):
+        return model
+    if isinstance(model, np.generic):
+        return model.item()
+    if isinstance(model, Mapping):
+        return ("mapping", tuple(sorted(((model_content(key), model_content(value)) for key, value in model.items()), key=repr)))
+    if isinstance(model, (set, frozenset)):
+        return ("set", tuple(sorted((model_content(value) for value in model), key=repr)))
+    if isinstance(model, (list, tuple)):
+        return tuple(model_content(value) for value in model)
+    if isinstance(model, np.ndarray):
+        return ("ndarray", model.shape, model_content(model.tolist()))
+    if isinstance(model, pd.DataFrame):
+        return ("DataFrame", model_content(model.columns.tolist()), model_content(model.index.tolist()), model_content(model.to_numpy()))
+    if hasattr(model, "__dict__"):
+        return (type(model).__qualname__, model_content(vars(model)))
+    raise TypeError(f"No canonical content for models of type {type(model).__qualname__}")
+
+
+def model_hash(model: Any) -> str:
+    """
+    Compute a content hash of a model (process model, causal result etc.) to be used as a cache key, from its canonical content (see :func:`model_content`)
+
+    :param model: model object
+    :type model: Any
+    :return: hex digest of the model content
+    :rtype: str
+    """
+    return hashlib.sha256(repr(model_content(model)).encode("utf-8")).hexdigest()
+
+
+def graph_to_bytes(graph: Any, format: str) -> bytes:
+    """
+    Render a graph object produced by one of the visualizers into image bytes, without opening any viewer
+
+    :param graph: graphviz graph, or a file object (or path) of an already rendered image as returned by some pm4py visualizers
+    :type graph: Any
+    :param format: image format (svg, png...)
+    :type format: str
+    :return: image content
+    :rtype: bytes
+    """
+    if isinstance(graph, (graphviz.Digraph, graphviz.Graph, graphviz.Source)):
+        return graph.pipe(format=format)
+    path = graph.name if hasattr(graph, "name") else graph
+    with open(path, "rb") as image_file:
+        return image_file.read()
+
+
+class RenderService:
+    """
+    Headless renderer of process and causal views. Images are rendered to bytes in a background pool of workers (rendering is dominated by the
+    graphviz subprocess, so threads render in parallel), and cached by the hash of the model together with the render options, so that repeated
+    views of the same model are served from the cache. Concurrent requests for an image already being rendered share the same pending result.
+    """
+
+    def __init__(self, max_workers: Optional[int] = None, max_entries: int = 256):
+        """
+        Create a render service
+
+        :param max_workers: number of render workers, defaults to the number of CPUs
+        :type max_workers: Optional[int], optional
+        :param max_entries: maximal number of images kept in the cache, least recently used images are evicted first, defaults to 256
+        :type max_entries: int, optional
+        """
+        self._executor = ThreadPoolExecutor(max_workers=max_workers or os.cpu_count(), thread_name_prefix="sax-render")
+        self._max_entries = max_entries
+        self._cache: "OrderedDict[tuple, Future]" = OrderedDict()
+        self._lock = Lock()
+
+    def render(self, model: Any, build: Callable[[Any, str], Any], format: str = "svg", **options) -> Future:
+        """
+        Render the model to image bytes in the background
+
+        :param model: model to render
+        :type model: Any
+        :param build: function building the graph object of the model, called with the model, the format and the render options
+        :type build: Callable
+        :param format: image format, defaults to svg
+        :type format: str, optional
+        :return: future holding the image bytes
+        :rtype: Future
+        """
+        key = (getattr(build, "__module__", None), getattr(build, "__qualname__", repr(build)), model_hash(model), format, tuple(sorted(options.items())))
+        with self._lock:
+            future = self._cache.get(key)
+            if future is not None:
+                self._cache.move_to_end(key)
+                return future
+            future = self._executor.submit(lambda: graph_to_bytes(build(model, format, **options), format))
+            self._cache[key] = future
+            while len(self._cache) > self._max_entries:
+                self._cache.popitem(last=False)
+        future.add_done_callback(partial(self._discard_failed, key))
+        return future
+
+    def _discard_failed(self, key: tuple, future: Future):
+        """
+        Remove a failed render from the cache, so that the next request renders the model again
+        """
+        if future.exception() is None:
+            return
+        with self._lock:
+            if self._cache.get(key) is future:
+                del self._cache[key]
+
+    def clear(self):
+        """
+        Remove all the images from the cache
+        """
+        with self._lock:
+            self._cache.clear()
+
+    def __len__(self):
+        return len(self._cache)
+
+
+_default_service = None
+_default_service_lock = Lock()
+
+
+def get_render_service() -> RenderService:
+    """
+    Get the process-wide render service shared by all the render functions
+
+    :return: the default render service
+    :rtype: RenderService
+    """
+    global _default_service
+    with _default_service_lock:
+        if _default_service is None:
+            _default_service = RenderService()
+        return _default_service
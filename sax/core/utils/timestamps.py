@@ -0,0 +1,20 @@
+# -----------------------------------------------------------------------------
+# Copyright contributors to the SAX4BPM project
+# -----------------------------------------------------------------------------
+import numpy as np
+import pandas as pd
+
+
+def to_nanoseconds(column: pd.Series) -> np.ndarray:
+    """
+    Timestamps of the column as int64 nanoseconds since the epoch (UTC), NaT for missing timestamps. Datetime columns, timezone aware or not, are viewed
+    as integers without going through Python objects; columns which are not of a datetime type are parsed first, as pd.to_datetime(utc=True) does.
+
+    :param column: timestamp column
+    :type column: pd.Series
+    :return: nanoseconds since the epoch of each timestamp
+    :rtype: np.ndarray
+    """
+    if not pd.api.types.is_datetime64_any_dtype(column.dtype):
+        column = pd.to_datetime(column, utc=True)
+    return pd.DatetimeIndex(column).as_unit("ns").asi8
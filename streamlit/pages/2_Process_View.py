@@ -1,10 +1,12 @@
 # -----------------------------------------------------------------------------
 # Copyright contributors to the SAX4BPM project
 # -----------------------------------------------------------------------------
+import io
+from concurrent.futures import Future
+
 import pandas as pd
 import streamlit as st
 from PIL import Image
-from pm4py.objects.heuristics_net.obj import HeuristicsNet
 
 import sax.core.process_mining.process_mining as pm
 
@@ -30,17 +32,8 @@ def get_key_for_value(df, value):
     else:
         return None
     
-def view_heuristic_net(heu_net: HeuristicsNet, format: str = "png", bgcolor: str = "white"):
-    format = str(format).lower()
-    from pm4py.visualization.heuristics_net import visualizer as hn_visualizer
-    parameters = hn_visualizer.Variants.PYDOTPLUS.value.Parameters
-    gviz = hn_visualizer.apply(heu_net, parameters={parameters.FORMAT: format, "bgcolor": bgcolor}) 
-              
-    return gviz
-
-def getProcessModelImage(net: HeuristicsNet) -> Image:
-    file = view_heuristic_net(net)      
-    full_pm_image = Image.open(file.name)
+def getProcessModelImage(render: Future) -> Image:
+    full_pm_image = Image.open(io.BytesIO(render.result()))
     return full_pm_image
 
 def getProcessModelAndVariants(dataframe):
@@ -72,10 +65,12 @@ if (session_state is not None) and hasattr(session_state, "data") and (session_s
             session_state.net = net
 
 if dataframe is not None:  
+    #submit all the renders first, images are collected once the page is laid out
+    process_image_slot = st.empty()
+    full_pm_render = None
+    variant_render = None
     if session_state.processImage is  None:          
-        full_pm_image = getProcessModelImage(session_state.net)
-        session_state.processImage=full_pm_image
-    st.image(session_state.processImage)
+        full_pm_render = pm.render_heuristics_net(session_state.net, format="png")
 
     df = pd.DataFrame(list(session_state.variants.items()), columns=['Variant', 'Num. Traces'])
     df
@@ -92,10 +87,15 @@ if dataframe is not None:
             variant_name= get_key_for_value(df,option)            
             print("Selected variant:",variant_name)                        
             net = pm.discover_heuristics_net(dataframe,[variant_name])            
-            variant_image_file = view_heuristic_net(net)           
-            variant_image = Image.open(variant_image_file.name)
-            st.image(variant_image)                        
+            variant_render = pm.render_heuristics_net(net, format="png")
+            variant_image_slot = st.empty()
             session_state.variant = variant_name
+
+    if full_pm_render is not None:
+        session_state.processImage=getProcessModelImage(full_pm_render)
+    process_image_slot.image(session_state.processImage)
+    if variant_render is not None:
+        variant_image_slot.image(getProcessModelImage(variant_render))
  
        
 
@@ -1,17 +1,19 @@
 # -----------------------------------------------------------------------------
 # Copyright contributors to the SAX4BPM project
 # -----------------------------------------------------------------------------
+import io
+
 import graphviz
 import numpy as np
 import streamlit as st
 from PIL import Image
 from lingam.utils import make_dot
-from pm4py.objects.heuristics_net.obj import HeuristicsNet
 from sax.core.causal_process_discovery.algorithms.base_causal_alg import CausalResultInfo
 
 import sax.core.causal_process_discovery.causal_discovery as cd
 import sax.core.process_mining.process_mining as pm
 import sax.core.synthesis.sax_explainability as ex
+from sax.core.utils.rendering import get_render_service
 
 from PIL import Image
 im = Image.open('./images/sax4bpm_logo6_t.png')
@@ -25,20 +27,14 @@ st.html("""
 #st.logo(im, size="large", link=None)
 st.logo(im,  link=None)
 
-def view_heuristic_net(heu_net: HeuristicsNet, format: str = "png", bgcolor: str = "white"):
-    format = str(format).lower()
-    from pm4py.visualization.heuristics_net import visualizer as hn_visualizer
-    parameters = hn_visualizer.Variants.PYDOTPLUS.value.Parameters
-    gviz = hn_visualizer.apply(heu_net, parameters={parameters.FORMAT: format, "bgcolor": bgcolor}) 
-              
-    return gviz
-
-def view_causal_dependencies(dependencies: CausalResultInfo, p_value_threshold: float=0.3):
+def view_causal_dependencies(dependencies: CausalResultInfo, format: str, p_value_threshold: float=0.3) -> graphviz.Digraph:
     """
     View the causal dependency model graph
 
     :param dependencies: causal dependency model representation
     :type dependencies: CausalResultInfo
+    :param format: image format
+    :type format: str
     :param p_value_threshold: threshold for displaying causal relationships, no edges with coefficients less than specified will be displayed, defaults to None
     :type p_value_threshold: float, optional
     :return: graph
@@ -56,6 +52,7 @@ def view_causal_dependencies(dependencies: CausalResultInfo, p_value_threshold:
         np_matrix[mask] = 0
         
     dot= make_dot(np_matrix, labels = dependencies.getColumns())    
+    dot.format = format
     return dot
 
 st.title('Analysis view')
@@ -73,8 +70,9 @@ if (session_state is not None) and hasattr(session_state, "variant") and (sessio
         data = session_state.data
         net = pm.discover_heuristics_net(data,[variant])
         dfg, event_log = pm.discover_dfg(data,[variant])
-        variant_image_file = view_heuristic_net(net)
-        variant_image = Image.open(variant_image_file.name)
+        #submit all the renders first and collect the images afterwards
+        variant_image_render = pm.render_heuristics_net(net, format="png")
+        causal_graph_render = None
         session_state.processModel=dfg
         print("Process Model:",session_state.processModel)
         
@@ -86,10 +84,7 @@ if (session_state is not None) and hasattr(session_state, "variant") and (sessio
             print(causal_model.columns)
             if causal_model.columns:
                 session_state.causalModel=causal_model
-                causal_image_grapth = view_causal_dependencies(causal_model)
-                causal_image_grapth.format = 'png'
-                causal_image_grapth.render('causal_image', cleanup=True)  # Save the PNG image            
-                causal_graph_image = Image.open('causal_image.png')
+                causal_graph_render = get_render_service().render(causal_model, view_causal_dependencies, "png", p_value_threshold=0.3)
             else:
                 session_state.causalModel=None
                 st.error("Causal model is empty: mostly likely due to the fact that you chose variant with too few instances to analyze")            
@@ -97,7 +92,14 @@ if (session_state is not None) and hasattr(session_state, "variant") and (sessio
             st.error("An error occurred: {}".format(str(e)))
             print(e)
             session_state.causalModel=None
-        
+        variant_image = Image.open(io.BytesIO(variant_image_render.result()))
+        if causal_graph_render is not None:
+            try:
+                causal_graph_image = Image.open(io.BytesIO(causal_graph_render.result()))
+            except Exception as e:
+                st.error("An error occurred: {}".format(str(e)))
+                print(e)
+                session_state.causalModel=None
 
 
     #display the process model alongside the causal model
@@ -0,0 +1,38 @@
+# -----------------------------------------------------------------------------
+# Copyright contributors to the SAX4BPM project
+# -----------------------------------------------------------------------------
+import numpy as np
+import pandas as pd
+import pytest
+
+
+def make_log(n_cases: int = 300, seed: int = 0, lifecycle: bool = False) -> pd.DataFrame:
+    """
+    Synthetic event log of four variants over the activities A to E, where the duration of each activity depends on the duration of the previous one
+    """
+    rng = np.random.RandomState(seed)
+    rows = []
+    base = pd.Timestamp("2023-03-01", tz="UTC")
+    variants = [["A", "B", "C", "D"], ["A", "C", "B", "D"], ["A", "B", "E", "D"], ["A", "B", "C", "E", "D"]]
+    for case in range(n_cases):
+        variant = variants[rng.choice(len(variants), p=[0.5, 0.2, 0.2, 0.1])]
+        timestamp = base + pd.Timedelta(hours=rng.randint(0, 24 * 200))
+        previous = 0.0
+        for activity in variant:
+            start = timestamp
+            duration = rng.exponential(30) + 0.8 * previous
+            previous = duration
+            timestamp = timestamp + pd.Timedelta(minutes=float(duration))
+            if lifecycle:
+                rows.append((f"c{case}", activity, "start", start, "x%d" % rng.randint(3)))
+            rows.append((f"c{case}", activity, "complete", timestamp, "x%d" % rng.randint(3)))
+    df = pd.DataFrame(rows, columns=["Id", "Source", "Type", "Timestamp", "Resource"])
+    if not lifecycle:
+        df = df.drop(columns=["Type"])
+    return df
+
+
+@pytest.fixture
+def event_log():
+    from sax.core.process_mining import process_mining as pm
+    return pm.create_from_dataframe(make_log(400, seed=1), False)
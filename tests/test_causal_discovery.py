@@ -0,0 +1,63 @@
+# -----------------------------------------------------------------------------
+# Copyright contributors to the SAX4BPM project
+# -----------------------------------------------------------------------------
+import logging
+
+import numpy as np
+
+from conftest import make_log
+from sax.core.causal_process_discovery import causal_discovery as cd
+from sax.core.causal_process_discovery.modalities.chain_anchor import ChainAnchorTransformer
+from sax.core.process_mining import process_mining as pm
+
+
+def _edges(result):
+    columns = result.getColumns()
+    adjacency_matrix = np.asarray(result.getAdjacencyMatrix())
+    return {(columns[j], columns[i]): round(float(adjacency_matrix[i, j]), 6) for i, j in zip(*np.nonzero(adjacency_matrix))}
+
+
+def test_failed_group_is_logged(event_log, monkeypatch, caplog):
+    discover = cd._discover_causal_dependencies
+    calls = []
+
+    def fail_first_group(*args, **kwargs):
+        calls.append(args)
+        if len(calls) == 1:
+            raise ValueError("singular group")
+        return discover(*args, **kwargs)
+
+    monkeypatch.setattr(cd, "_discover_causal_dependencies", fail_first_group)
+    with caplog.at_level(logging.WARNING, logger=cd.__name__):
+        result = cd.discover_causal_dependencies(event_log, cache=False)
+    failures = [record for record in caplog.records if record.exc_info is not None]
+    assert len(failures) == 1
+    assert "singular group" in str(failures[0].exc_info[1])
+    assert len(calls) > 1 and result.getColumns()
+
+
+def test_incremental_discovery_matches_batch_discovery():
+    data = make_log(1200, seed=0)
+    cases = data["Id"].unique()
+    first_half = data["Id"].isin(cases[:len(cases) // 2])
+    batch = cd.discover_causal_dependencies(pm.create_from_dataframe(data, False), cache=False)
+    first = pm.create_from_dataframe(data[first_half].reset_index(drop=True), False)
+    second = pm.create_from_dataframe(data[~first_half].reset_index(drop=True), False)
+    incremental = cd.IncrementalChainDiscovery(random_state=0).update(first).update(second)
+    merged = cd.IncrementalChainDiscovery(random_state=0).update(first).merge(cd.IncrementalChainDiscovery(random_state=1).update(second))
+    assert _edges(batch)
+    assert _edges(incremental.getResult()) == _edges(batch)
+    assert _edges(merged.getResult()).keys() == _edges(batch).keys()
+
+
+def test_failed_incremental_group_is_logged(event_log, monkeypatch, caplog):
+    discovery = cd.IncrementalChainDiscovery(random_state=0).update(event_log)
+
+    def fail(*args, **kwargs):
+        raise ValueError("singular statistics")
+
+    monkeypatch.setattr(ChainAnchorTransformer, "apply_statistics", fail)
+    with caplog.at_level(logging.WARNING, logger=cd.__name__):
+        discovery.getResult()
+    logged_keys = {record.args[0] for record in caplog.records if record.exc_info is not None}
+    assert logged_keys == set(discovery.getStatistics())
@@ -0,0 +1,54 @@
+# -----------------------------------------------------------------------------
+# Copyright contributors to the SAX4BPM project
+# -----------------------------------------------------------------------------
+import pandas as pd
+import pytest
+
+from conftest import make_log
+from sax.core.causal_process_discovery import causal_discovery as cd
+from sax.core.process_mining import process_mining as pm
+from sax.core.utils.constants import Constants
+
+
+@pytest.fixture
+def lifecycle_log():
+    return pm.create_from_dataframe(make_log(200, seed=2, lifecycle=True), False)
+
+
+def test_intervals_pair_start_and_complete_events(lifecycle_log):
+    intervals = lifecycle_log.getActivityIntervals()
+    assert len(intervals) == len(lifecycle_log.getData())
+    assert (intervals[Constants.DURATION_KEY] >= 0).all()
+
+
+def test_copy_keeps_lifecycle_events(lifecycle_log):
+    copied = lifecycle_log.copy()
+    pd.testing.assert_frame_equal(copied.getActivityIntervals(), lifecycle_log.getActivityIntervals())
+    result = cd.discover_causal_dependencies(copied, service_times=True, cache=False)
+    assert {"A", "B", "C", "D", "E"} <= set(result.getColumns())
+
+
+def test_derived_log_intervals_are_restricted_to_its_cases(lifecycle_log):
+    variant = next(iter(lifecycle_log.getVariants()))
+    derived = lifecycle_log.filterVariants([variant])
+    intervals = derived.getActivityIntervals()
+    cases = set(derived.getData()[derived.getCaseIdColumnName()].astype("string"))
+    assert len(intervals) == len(derived.getData())
+    assert set(intervals[Constants.CASE_ID_KEY]) == cases
+
+
+def test_materialized_views_keep_lifecycle_events(lifecycle_log):
+    pd.testing.assert_frame_equal(lifecycle_log.lazyFilter().materialize().getActivityIntervals(), lifecycle_log.getActivityIntervals())
+    filtered = lifecycle_log.lazyFilter().filterVariants([next(iter(lifecycle_log.getVariants()))]).materialize()
+    intervals = filtered.getActivityIntervals()
+    assert len(intervals) == len(filtered.getData())
+    assert intervals[Constants.DURATION_KEY].notna().all()
+
+
+@pytest.mark.filterwarnings("error::DeprecationWarning")
+def test_intervals_of_timezone_aware_events(lifecycle_log):
+    events = lifecycle_log.getData()
+    assert str(events["Timestamp"].dtype) == "datetime64[ns, UTC]"
+    intervals = lifecycle_log.getActivityIntervals()
+    pd.testing.assert_series_equal(intervals[Constants.TIMESTAMP_KEY].sort_values(ignore_index=True),
+                                   events["Timestamp"].sort_values(ignore_index=True), check_names=False)
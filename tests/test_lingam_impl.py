@@ -0,0 +1,36 @@
+# -----------------------------------------------------------------------------
+# Copyright contributors to the SAX4BPM project
+# -----------------------------------------------------------------------------
+import numpy as np
+import pandas as pd
+import pytest
+
+from sax.core.causal_process_discovery.algorithms.lingam import LingamImpl
+from sax.core.causal_process_discovery.algorithms.positive_lingam import PositiveLingamImpl
+
+
+@pytest.mark.parametrize("algorithm", [LingamImpl, PositiveLingamImpl])
+def test_kernel_measure_reaches_the_model(algorithm):
+    rng = np.random.RandomState(0)
+    X = rng.exponential(size=(300, 4))
+    for j in range(1, 4):
+        X[:, j] += X[:, j - 1]
+    data = pd.DataFrame(X, columns=list("ABCD"))
+    implementation = algorithm(data, measure="kernel", kernel_rank=20, kernel_subsample=100)
+    model = implementation._create_model()
+    assert (model._measure, model._kernel_rank, model._kernel_subsample) == ("kernel", 20, 100)
+    adjacency_matrix = np.array(implementation.run().getAdjacencyMatrix())
+    assert all(adjacency_matrix[j, j - 1] > 0.5 for j in range(1, 4))
+
+
+def test_bootstrap_does_not_depend_on_the_number_of_processes():
+    rng = np.random.RandomState(1)
+    X = rng.exponential(size=(200, 3))
+    for j in range(1, 3):
+        X[:, j] += X[:, j - 1]
+    data = pd.DataFrame(X, columns=list("ABC"))
+    sequential = PositiveLingamImpl(data).run_bootstrap(6, batch_size=3, tolerance=None, random_state=0)
+    parallel = PositiveLingamImpl(data).run_bootstrap(6, n_jobs=2, batch_size=3, tolerance=None, random_state=0)
+    assert sequential.getBootstrapSamples() == parallel.getBootstrapSamples() == 6
+    assert sequential.getEdgeProbabilities() == parallel.getEdgeProbabilities()
+    assert sequential.getCoefficientIntervals() == parallel.getCoefficientIntervals()
@@ -0,0 +1,31 @@
+# -----------------------------------------------------------------------------
+# Copyright contributors to the SAX4BPM project
+# -----------------------------------------------------------------------------
+import logging
+
+import pytest
+
+from sax.core.causal_process_discovery import causal_discovery as cd
+from sax.core.causal_process_discovery.causal_constants import Algorithm, Modality
+from sax.core.causal_process_discovery.modalities import parent_anchor
+
+
+@pytest.mark.parametrize("algorithm", [Algorithm.POSITIVE_LINGAM, Algorithm.LINGAM])
+def test_parent_modality_fits_pair_coefficients(event_log, monkeypatch, caplog, algorithm):
+    coefficients = {}
+    fit_pair = parent_anchor._fit_pair
+
+    def recording_fit_pair(task):
+        coefficient, stats = fit_pair(task)
+        coefficients[task[2]] = coefficient
+        return coefficient, stats
+
+    monkeypatch.setattr(parent_anchor, "_fit_pair", recording_fit_pair)
+    parent_anchor._pair_cache.clear()
+    with caplog.at_level(logging.WARNING, logger=parent_anchor.__name__):
+        cd.discover_causal_dependencies(event_log, algorithm=algorithm, modality=Modality.PARENT, cache=False)
+
+    assert not caplog.records
+    # the durations of the synthetic log are chained, so the consecutive activities after A depend on each other
+    assert coefficients[("B", "C")] > 0
+    assert coefficients[("C", "D")] > 0
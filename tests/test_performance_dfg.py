@@ -0,0 +1,33 @@
+# -----------------------------------------------------------------------------
+# Copyright contributors to the SAX4BPM project
+# -----------------------------------------------------------------------------
+import re
+
+import pytest
+
+from sax.core.process_mining import process_mining as pm
+from sax.core.process_mining.performance import compute_performance_dfg
+
+
+def test_every_activity_is_labeled(event_log):
+    dfg, _ = pm.discover_dfg(event_log, performance=True)
+    assert pm._performance_activities_count(dfg) == event_log.getData()["Source"].value_counts().to_dict()
+    labels = set(re.findall(r"\[label=(\w+) ", pm._build_dfg_graph(dfg, "svg").source))
+    assert labels == {"A", "B", "C", "D", "E"}
+
+
+def test_streaming_matches_exact_counts(event_log):
+    exact_dfg, exact_starts, exact_ends = compute_performance_dfg(event_log.getData(), "Id", "Source", "Timestamp")
+    dfg, starts, ends = compute_performance_dfg(event_log.getData(), "Id", "Source", "Timestamp", streaming=True, chunk_size=7)
+    assert (starts, ends) == (exact_starts, exact_ends)
+    assert {edge: statistics["count"] for edge, statistics in dfg.items()} == {edge: statistics["count"] for edge, statistics in exact_dfg.items()}
+    for edge, statistics in dfg.items():
+        assert abs(statistics["mean"] - exact_dfg[edge]["mean"]) <= 1e-6 * exact_dfg[edge]["mean"]
+
+
+@pytest.mark.filterwarnings("error::DeprecationWarning")
+def test_timezone_aware_timestamps_are_not_parsed(event_log):
+    data = event_log.getData()
+    assert str(data["Timestamp"].dtype) == "datetime64[ns, UTC]"
+    dfg, starts, ends = compute_performance_dfg(data, "Id", "Source", "Timestamp")
+    assert sum(statistics["count"] for statistics in dfg.values()) == len(data) - sum(starts.values())
@@ -0,0 +1,73 @@
+# -----------------------------------------------------------------------------
+# Copyright contributors to the SAX4BPM project
+# -----------------------------------------------------------------------------
+import numpy as np
+import pytest
+
+from sax.core.causal_process_discovery.algorithms.positive_lingam_impl.base_positive_lingam import _rff_features, hsic_test_rff, predict_adaptive_lasso
+from sax.core.causal_process_discovery.algorithms.positive_lingam_impl.positive_direct_lingam import PositiveDirectLiNGAM
+
+
+def _chained(n_samples, n_features, seed):
+    rng = np.random.RandomState(seed)
+    X = rng.exponential(size=(n_samples, n_features))
+    for j in range(1, n_features):
+        X[:, j] += 0.7 * X[:, j - 1]
+    return X
+
+
+@pytest.mark.parametrize("n_features", [3, 4, 5])
+@pytest.mark.parametrize("constant", [0, -1])
+def test_fit_with_constant_column(n_features, constant):
+    X = _chained(500, n_features, seed=n_features)
+    X[:, constant] = 0
+    model = PositiveDirectLiNGAM().fit(X)
+    B = model.adjacency_matrix_
+    assert np.isfinite(B).all()
+    # a constant feature neither causes nor is caused by any other feature
+    assert not B[:, constant].any() and not B[constant].any()
+
+
+def test_adaptive_lasso_ignores_constant_predictor():
+    rng = np.random.RandomState(0)
+    X = rng.exponential(size=(300, 3))
+    X[:, 2] += 0.7 * X[:, 0]
+    X[:, 1] = 5.0
+    coef = predict_adaptive_lasso(X, [0, 1], 2)
+    assert coef[1] == 0
+    assert coef[0] == pytest.approx(0.7, abs=0.1)
+
+
+def test_adaptive_lasso_collinear_predictors():
+    X = _chained(300, 3, seed=1)
+    X[:, 1] = 2 * X[:, 0]
+    coef = predict_adaptive_lasso(X, [0, 1], 2)
+    assert np.isfinite(coef).all() and (coef >= 0).all()
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_small_system_matches_general_fit(seed):
+    rng = np.random.RandomState(seed)
+    n_features = 2 + seed % 2
+    X = _chained(rng.randint(20, 400), n_features, seed)
+    if seed % 3 == 0:
+        X[:, rng.randint(n_features)] = 0
+    if seed % 4 == 0:
+        X *= 1000
+    general = PositiveDirectLiNGAM()
+    general._SMALL_SYSTEM_SIZE = 0
+    expected = general.fit(X)
+    fast = PositiveDirectLiNGAM().fit(X)
+    assert fast.causal_order_ == expected.causal_order_
+    np.testing.assert_allclose(fast.adjacency_matrix_, expected.adjacency_matrix_, rtol=1e-9, atol=1e-12)
+
+
+def test_rff_hsic_does_not_depend_on_feature_scale():
+    # scaling the features scales the statistic, its mean and its deviation alike, whatever the norms of the features
+    rng = np.random.RandomState(0)
+    Z = _rff_features(rng.randn(300, 1), 50, rng)
+    W = _rff_features(rng.randn(300, 1), 50, rng)
+    statistic, p = hsic_test_rff(Z, W)
+    scaled_statistic, scaled_p = hsic_test_rff(2 * Z, W)
+    assert scaled_statistic == pytest.approx(4 * statistic)
+    assert scaled_p == pytest.approx(p)
@@ -0,0 +1,15 @@
+# -----------------------------------------------------------------------------
+# Copyright contributors to the SAX4BPM project
+# -----------------------------------------------------------------------------
+import numpy as np
+
+from sax.core.utils.helper_utils import precedence_counts
+
+
+def test_blocked_counts_match_pairwise_comparisons():
+    rng = np.random.RandomState(0)
+    values = rng.randint(0, 5, size=(200, 7)).astype(np.float64)
+    values[rng.rand(*values.shape) < 0.05] = np.nan
+    expected = np.array([[np.sum(values[:, i] >= values[:, j]) for i in range(7)] for j in range(7)])
+    for max_block_bytes in (1, 200 * 7 * 3, 2 ** 26):
+        np.testing.assert_array_equal(precedence_counts(values, max_block_bytes), expected)
@@ -0,0 +1,28 @@
+# -----------------------------------------------------------------------------
+# Copyright contributors to the SAX4BPM project
+# -----------------------------------------------------------------------------
+import pytest
+
+from sax.core.process_mining import process_mining as pm
+from sax.core.utils.rendering import RenderService, model_hash
+
+
+def test_hash_depends_on_content_only(event_log):
+    dfg, _ = pm.discover_dfg(event_log)
+    assert model_hash(dict(dfg)) == model_hash(dict(reversed(list(dfg.items()))))
+    assert model_hash(pm.discover_heuristics_net(event_log)) == model_hash(pm.discover_heuristics_net(event_log.copy()))
+    changed = dict(dfg)
+    changed[next(iter(changed))] += 1
+    assert model_hash(changed) != model_hash(dict(dfg))
+
+
+def test_failed_render_is_not_cached():
+    def build(model, format):
+        raise ValueError(model)
+
+    service = RenderService(max_workers=1)
+    with pytest.raises(ValueError):
+        service.render({"model": 1}, build).result()
+    # the done callbacks run in the worker once the result is set
+    service._executor.shutdown(wait=True)
+    assert len(service) == 0
@@ -0,0 +1,31 @@
+# -----------------------------------------------------------------------------
+# Copyright contributors to the SAX4BPM project
+# -----------------------------------------------------------------------------
+import os
+
+import numpy as np
+
+from sax.core.causal_process_discovery import result_cache
+from sax.core.causal_process_discovery.algorithms.base_causal_alg import CausalResultInfo
+from sax.core.causal_process_discovery.result_cache import CausalResultCache, result_key
+
+
+def _result(weight):
+    return CausalResultInfo(np.array([[0.0, 0.0], [weight, 0.0]]), ["A", "B"])
+
+
+def test_key_depends_on_algorithm_version(monkeypatch):
+    key = result_key("fingerprint", algorithm="LINGAM")
+    monkeypatch.setattr(result_cache, "_ALGORITHM_VERSION", result_cache._ALGORITHM_VERSION + 1)
+    assert result_key("fingerprint", algorithm="LINGAM") != key
+
+
+def test_directory_keeps_recently_used_archives(tmp_path):
+    cache = CausalResultCache(directory=str(tmp_path), max_disk_entries=2)
+    for age, key in enumerate(["first", "second"]):
+        cache.put(key, _result(age + 1.0))
+        os.utime(tmp_path / f"{key}.npz", (age, age))
+    # reading an archive marks it as recently used
+    assert CausalResultCache(directory=str(tmp_path)).get("first") is not None
+    cache.put("third", _result(3.0))
+    assert sorted(os.listdir(tmp_path)) == ["first.npz", "third.npz"]
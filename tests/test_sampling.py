@@ -0,0 +1,30 @@
+# -----------------------------------------------------------------------------
+# Copyright contributors to the SAX4BPM project
+# -----------------------------------------------------------------------------
+from conftest import make_log
+from sax.core.process_mining import process_mining as pm
+
+
+def test_scaled_frequencies_with_commas_in_activity_names():
+    data = make_log(300, seed=3)
+    data["Source"] = data["Source"].replace({"B": "Check, then approve"})
+    # events out of timestamp order within their cases
+    event_log = pm.create_from_dataframe(data.sample(frac=1, random_state=0), False)
+    full_dfg, _ = pm.discover_dfg(event_log)
+    sampled_dfg, _ = pm.discover_dfg(event_log, sample=40)
+    assert dict(sampled_dfg).keys() <= dict(full_dfg).keys()
+    # every variant is covered, so the scaled frequencies are exact
+    assert all(sampled_dfg[edge] == full_dfg[edge] for edge in sampled_dfg)
+
+
+def test_case_variants_follow_timestamps():
+    data = make_log(50, seed=4)
+    event_log = pm.create_from_dataframe(data.iloc[::-1], False)
+    assert set(event_log.getCaseVariants()) <= set(event_log.getVariants())
+
+
+def test_sample_info_is_per_event_log(event_log):
+    sampled = event_log.sample(40, random_state=0)
+    assert sampled.getSampleInfo() is not None
+    assert event_log.getSampleInfo() is None
+    assert event_log.copy().getSampleInfo() is None
@@ -0,0 +1,19 @@
+# -----------------------------------------------------------------------------
+# Copyright contributors to the SAX4BPM project
+# -----------------------------------------------------------------------------
+import numpy as np
+import pandas as pd
+import pytest
+
+from sax.core.utils.timestamps import to_nanoseconds
+
+
+@pytest.mark.filterwarnings("error::DeprecationWarning")
+def test_nanoseconds_of_timestamp_columns():
+    utc = pd.Series(pd.to_datetime(["2023-03-01 10:00:00", None, "2023-03-02 00:00:01"], utc=True))
+    expected = np.array([pd.Timestamp("2023-03-01 10:00:00", tz="UTC").value, np.datetime64("NaT").view(np.int64),
+                         pd.Timestamp("2023-03-02 00:00:01", tz="UTC").value])
+    np.testing.assert_array_equal(to_nanoseconds(utc), expected)
+    np.testing.assert_array_equal(to_nanoseconds(utc.dt.tz_convert("Asia/Jerusalem")), expected)
+    np.testing.assert_array_equal(to_nanoseconds(utc.dt.tz_localize(None)), expected)
+    np.testing.assert_array_equal(to_nanoseconds(utc.astype(str).replace("NaT", None)), expected)